@@ -0,0 +1,103 @@
+"""
+Benchmark results reporting
+
+Results are recorded as flat JSON entries, keyed by benchmark name and
+parameters, and can be compared against a saved baseline.
+"""
+
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+class Report:
+    """
+    Collection of benchmark results
+
+    Attributes:
+        suite (str): the name of the benchmark suite
+    """
+
+    def __init__(self, suite: str):
+        self.suite = suite
+        self.results: List[Dict[str, Any]] = []
+
+    def record(self, name: str, value: float, unit: str, higher_is_better: bool, **params: Any):
+        """
+        Record a result and echo it to stderr
+
+        Attributes:
+            name (str): the benchmark name e.g. add
+            value (float): the measured value
+            unit (str): the unit of the value e.g. trades/s
+            higher_is_better (bool): direction of improvement, used on comparison
+            **params (Any): the parameters of the run e.g. trades and symbols
+        """
+        self.results.append({
+            'name': name,
+            'params': params,
+            'value': value,
+            'unit': unit,
+            'higher_is_better': higher_is_better,
+        })
+        print(
+            f'{name:<36} {" ".join(f"{k}={v}" for k, v in params.items()):<28}'
+            f' {value:>16.3f} {unit}',
+            file=sys.stderr
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        "Machine readable form of the report"
+        return {
+            'suite': self.suite,
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': self.results,
+        }
+
+    def dump(self, path: Path | str | None = None):
+        """
+        Write the report as JSON
+
+        Attributes:
+            path (Path | str | None): the file to write to, stdout if not given
+        """
+        payload = json.dumps(self.to_dict(), indent=2)
+        if path is None:
+            print(payload)
+        else:
+            Path(path).write_text(payload + '\n', encoding='utf-8')
+
+    def compare(self, baseline_path: Path | str, tolerance: float) -> List[Tuple[str, float]]:
+        """
+        Compare against a saved baseline report
+
+        Attributes:
+            baseline_path (Path | str): the baseline JSON report
+            tolerance (float): the allowed relative slowdown e.g. 0.2 for 20%
+
+        Returns:
+            the key and relative change of every regressed result (List[Tuple[str, float]])
+        """
+        def key(result: Dict[str, Any]) -> str:
+            params = ','.join(f'{k}={v}' for k, v in sorted(result['params'].items()))
+            return f"{result['name']}[{params}]"
+
+        baseline = {
+            key(result): result
+            for result in json.loads(Path(baseline_path).read_text(encoding='utf-8'))['results']
+        }
+
+        regressions = []
+        for result in self.results:
+            if (previous := baseline.get(key(result))) is None or not previous['value']:
+                continue
+            change = result['value'] / previous['value'] - 1
+            slowdown = -change if result['higher_is_better'] else change
+            if slowdown > tolerance:
+                regressions.append((key(result), change))
+        return regressions
@@ -0,0 +1,138 @@
+"""
+Query service load benchmark
+
+Drives the HTTP/JSON query service over keep-alive connections, sending
+pipelined batches of requests, and reports requests per second and
+latency percentiles. A service is started in process on a free port
+unless `--port` points to a running one.
+
+Example:
+    python -m benchmarks.service --connections 16 --pipeline 8 --requests 50000
+"""
+
+import argparse
+import asyncio
+import sys
+from itertools import cycle
+from time import perf_counter, perf_counter_ns
+from typing import List
+
+from benchmarks.report import Report
+from src.metrics import Histogram
+
+DEFAULT_PATHS: List[str] = [
+    '/index',
+    '/vwsp/TEA',
+    '/vwsp',
+    '/stocks/GIN/dividend_yield?prices=10,20,30',
+    '/stocks/GIN/pe_ratio?prices=10,20,30',
+]
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    "Read a response, returns its status"
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(
+    host: str,
+    port: int,
+    paths: List[str],
+    n_requests: int,
+    pipeline: int,
+    latencies: Histogram
+) -> int:
+    """
+    Send requests over a single connection, `pipeline` at a time
+
+    Returns:
+        the number of non 200 responses (int)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    requests, errors = cycle(
+        f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode() for path in paths
+    ), 0
+    for sent in range(0, n_requests, pipeline):
+        depth = min(pipeline, n_requests - sent)
+        start = perf_counter_ns()
+        writer.write(b''.join(next(requests) for _ in range(depth)))
+        for _ in range(depth):
+            errors += await read_response(reader) != 200
+            latencies.record(perf_counter_ns() - start)
+    writer.close()
+    return errors
+
+
+async def run(args: argparse.Namespace, report: Report):
+    "Start the service if needed and load it"
+    # pylint: disable=C0415
+    from src.db.trade_db import TradeDB
+    from src.service import QueryService
+    from src.utilities import gen_trade_batches
+
+    host, port, server = args.host, args.port, None
+    if port is None:
+        for batch in gen_trade_batches(args.trades, seed=0):
+            TradeDB().add_batch(batch, validate=False)  # pylint: disable=E1101
+        server = await QueryService(max_connections=args.connections).start(host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    latencies = Histogram()
+    per_connection = args.requests // args.connections
+    params = {'connections': args.connections, 'pipeline': args.pipeline}
+    start = perf_counter()
+    errors = await asyncio.gather(*(
+        client(host, port, args.paths, per_connection, args.pipeline, latencies)
+        for _ in range(args.connections)
+    ))
+    elapsed = perf_counter() - start
+
+    report.record('requests', latencies.count / elapsed, 'requests/s', True, **params)
+    report.record('p50_latency', latencies.percentile(50) / 1e6, 'ms', False, **params)
+    report.record('p99_latency', latencies.percentile(99) / 1e6, 'ms', False, **params)
+    if sum(errors):
+        print(f'{sum(errors)} non 200 responses', file=sys.stderr)
+
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+
+def main(argv: List[str] | None = None) -> int:
+    "Run the load, returns a non zero exit code on regressions"
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--host', default='127.0.0.1', help='service host')
+    parser.add_argument('--port', type=int, help='port of a running service, started in process if not given')
+    parser.add_argument('--trades', type=int, default=10_000,
+                        help='random trades loaded in the in process service')
+    parser.add_argument('--connections', type=int, default=16, help='concurrent connections')
+    parser.add_argument('--pipeline', type=int, default=1, help='requests in flight per connection')
+    parser.add_argument('--requests', type=int, default=20_000, help='total number of requests')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help='request targets to cycle')
+    parser.add_argument('--output', help='write the JSON report to a file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='relative slowdown allowed against the baseline')
+    args = parser.parse_args(argv)
+
+    report = Report('service')
+    asyncio.run(run(args, report))
+    report.dump(args.output)
+
+    if args.baseline:
+        regressions = report.compare(args.baseline, args.tolerance)
+        for key, change in regressions:
+            print(f'REGRESSION {key}: {change:+.1%}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Sustained load soak test
+
+Drives ingestion at a target rate of trades per second while issuing
+VWSP, index and dividend yield queries at another rate, for as long as
+asked e.g. an hour, through the public `TradeDB` API only. Both streams
+are scheduled open loop on a single thread: every ingest batch and query
+has a due time and its latency is measured from it, so a stall delays
+and is charged to every operation behind it instead of silently lowering
+the load.
+
+Every interval a row with the achieved throughput, p50/p99/p999
+latencies and the resident set size is appended to a NDJSON series
+file, a summary is reported at the end.
+
+Example:
+    python -m benchmarks.soak --duration 3600 --ingest-rate 50000 --query-rate 1000 \\
+        --series soak.ndjson --output soak.json
+"""
+
+import argparse
+import json
+import resource
+import sys
+from datetime import datetime
+from itertools import cycle
+from pathlib import Path
+from time import perf_counter_ns, sleep
+from typing import IO, Any, Callable, Dict, Iterator, List, Tuple
+
+from benchmarks.report import Report
+from src.clock import NS_PER_SECOND
+from src.metrics import Histogram
+
+PERCENTILES: Tuple[float, ...] = (50, 99, 99.9)
+
+
+def rss_bytes() -> int:
+    "Current resident set size, the peak one where /proc is not available"
+    try:
+        with open('/proc/self/statm', encoding='ascii') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def make_queries(db, symbols: List[str]) -> Iterator[Tuple[str, Callable[[], Any]]]:
+    """
+    Endless round robin of the formulas queried during the soak
+
+    Attributes:
+        db (TradeDB): the trade db under load
+        symbols (List[str]): the symbols to query
+
+    Yields:
+        the query name and a call running it (Iterator[Tuple[str, Callable[[], Any]]])
+    """
+    # pylint: disable=C0415
+    from src.db.stock_db import StockDB
+
+    stocks = StockDB()
+    queries = []
+    for symbol in symbols:
+        queries.append(('vwsp', lambda symbol=symbol: db.volume_weighted_stock_price(symbol)))
+        queries.append(('index', db.gbce_all_share_index))
+        queries.append(('dividend_yield', lambda symbol=symbol: stocks[symbol].dividend_yield(100.)))
+    return cycle(queries)
+
+
+class Soak:
+    """
+    Open loop ingest and query load against a trade db
+
+    Attributes:
+        db (TradeDB): the trade db under load, any object with the `TradeDB` API
+        ingest_rate (float): the target trades per second
+        query_rate (float): the target queries per second, no queries if 0
+        batch_size (int, default: 1000): trades per `add_batch` call
+        symbols (List[str] | None): the traded symbols, all of StockDB if not given
+        seed (int | None): random seed of the generated trades
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        db,
+        ingest_rate: float,
+        query_rate: float,
+        batch_size: int = 1000,
+        symbols: List[str] | None = None,
+        seed: int | None = None
+    ):
+        if ingest_rate <= 0 or query_rate < 0 or batch_size <= 0:
+            raise ValueError('Rates and batch size must be positive')
+        # pylint: disable=C0415
+        from src.db.stock_db import StockDB
+
+        self.db = db
+        self.ingest_rate = ingest_rate
+        self.query_rate = query_rate
+        self.batch_size = batch_size
+        self.symbols = symbols if symbols is not None else StockDB().symbols()
+        self.seed = seed
+        self.latencies: Dict[str, Histogram] = {}
+        self.totals: Dict[str, Histogram] = {}
+        self.counts: Dict[str, int] = {'trades': 0, 'queries': 0, 'errors': 0}
+
+    def __record(self, name: str, latency: int):
+        for histograms in (self.latencies, self.totals):
+            if name not in histograms:
+                histograms[name] = Histogram()
+            histograms[name].record(latency)
+
+    def run(self, duration: float, interval: float = 10.) -> Iterator[Dict[str, Any]]:
+        """
+        Run the load
+
+        Attributes:
+            duration (float): seconds to run for
+            interval (float, default: 10.): seconds between two series rows
+
+        Yields:
+            a row per interval with the achieved rates, the latency
+                percentiles in ms of every operation over the interval and
+                the resident set size (Iterator[Dict[str, Any]])
+        """
+        # pylint: disable=C0415
+        from src.utilities import gen_trade_batches
+
+        batches = gen_trade_batches(
+            round(self.ingest_rate * duration) + self.batch_size, self.batch_size,
+            symbols=self.symbols, rate=self.ingest_rate, start=datetime.now(), seed=self.seed
+        )
+        queries = make_queries(self.db, self.symbols)
+        ingest_period = round(self.batch_size / self.ingest_rate * NS_PER_SECOND)
+        query_period = round(NS_PER_SECOND / self.query_rate) if self.query_rate else None
+
+        start = perf_counter_ns()
+        end = start + round(duration * NS_PER_SECOND)
+        next_ingest, next_query = start, start if query_period else None
+        next_row, row_start = start + round(interval * NS_PER_SECOND), start
+        counts = dict(self.counts)
+        rss_start = rss_bytes()
+
+        while (now := perf_counter_ns()) < end:
+            due = min(t for t in (next_ingest, next_query, next_row) if t is not None)
+            if due > now:
+                sleep((due - now) / NS_PER_SECOND)
+                continue
+
+            if due == next_ingest:
+                batch = next(batches)
+                self.db.add_batch(batch, validate=False)
+                self.__record('ingest', perf_counter_ns() - next_ingest)
+                self.counts['trades'] += len(batch)
+                next_ingest += ingest_period
+            elif due == next_query:
+                name, query = next(queries)
+                try:
+                    query()
+                except ValueError:
+                    self.counts['errors'] += 1
+                self.__record(name, perf_counter_ns() - next_query)
+                self.counts['queries'] += 1
+                next_query += query_period
+            else:
+                yield self.__row(now - start, now - row_start, counts, rss_start)
+                counts, row_start = dict(self.counts), now
+                next_row += round(interval * NS_PER_SECOND)
+
+        now = perf_counter_ns()
+        if now > row_start:
+            yield self.__row(now - start, now - row_start, counts, rss_start)
+
+    def __row(self, elapsed: int, span: int, counts: Dict[str, int], rss_start: int) -> Dict[str, Any]:
+        "Series row of the interval, resets the interval latencies"
+        seconds = span / NS_PER_SECOND
+        rss = rss_bytes()
+        row = {
+            'elapsed': round(elapsed / NS_PER_SECOND, 3),
+            'trades': self.counts['trades'],
+            'ingest_rate': (self.counts['trades'] - counts['trades']) / seconds,
+            'query_rate': (self.counts['queries'] - counts['queries']) / seconds,
+            'errors': self.counts['errors'] - counts['errors'],
+            'rss_mb': rss / 2 ** 20,
+            'rss_growth_mb': (rss - rss_start) / 2 ** 20,
+            'latency_ms': {
+                name: {f'p{q:g}': histogram.percentile(q) / 1e6 for q in PERCENTILES}
+                for name, histogram in self.latencies.items()
+            },
+        }
+        self.latencies = {}
+        return row
+
+
+def write_series(rows: Iterator[Dict[str, Any]], stream: IO[str]) -> Dict[str, Any] | None:
+    "Stream rows as NDJSON and echo them to stderr, returns the last one"
+    row = None
+    for row in rows:
+        stream.write(json.dumps(row) + '\n')
+        stream.flush()
+        latencies = ' '.join(
+            f"{name}={values['p99']:.2f}" for name, values in row['latency_ms'].items()
+        )
+        print(
+            f"{row['elapsed']:>9.1f}s {row['ingest_rate']:>10.0f} trades/s"
+            f" {row['query_rate']:>8.0f} queries/s {row['rss_mb']:>8.1f}MB p99 ms {latencies}",
+            file=sys.stderr
+        )
+    return row
+
+
+def main(argv: List[str] | None = None) -> int:
+    "Run the soak, returns a non zero exit code on regressions"
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--duration', type=float, default=60., help='seconds to run for')
+    parser.add_argument('--ingest-rate', type=float, default=50_000., help='target trades per second')
+    parser.add_argument('--query-rate', type=float, default=1_000., help='target queries per second')
+    parser.add_argument('--batch-size', type=int, default=1000, help='trades per add_batch call')
+    parser.add_argument('--interval', type=float, default=10., help='seconds between series rows')
+    parser.add_argument('--preload', help='csv file of trades loaded before the soak')
+    parser.add_argument('--seed', type=int, help='random seed of the generated trades')
+    parser.add_argument('--series', default='soak.ndjson', help='NDJSON file of the interval rows')
+    parser.add_argument('--output', help='write the JSON summary report to a file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='relative slowdown allowed against the baseline')
+    args = parser.parse_args(argv)
+
+    # pylint: disable=C0415
+    from src.db.trade_db import TradeDB
+    from src.models.trade import Trade
+
+    db = TradeDB()
+    if args.preload:
+        for trade in Trade.from_csv(args.preload):
+            db.add(trade)  # pylint: disable=E1101
+
+    soak = Soak(db, args.ingest_rate, args.query_rate, args.batch_size, seed=args.seed)
+    with open(args.series, 'w', encoding='utf-8') as series:
+        last = write_series(soak.run(args.duration, args.interval), series)
+    print(f'Series written to {Path(args.series).resolve()}', file=sys.stderr)
+
+    report = Report('soak')
+    params = {'ingest_rate': args.ingest_rate, 'query_rate': args.query_rate}
+    elapsed = last['elapsed'] if last else args.duration
+    report.record('ingest', soak.counts['trades'] / elapsed, 'trades/s', True, **params)
+    report.record('queries', soak.counts['queries'] / elapsed, 'queries/s', True, **params)
+    for name, histogram in sorted(soak.totals.items()):
+        for q in PERCENTILES:
+            report.record(f'{name}_p{q:g}', histogram.percentile(q) / 1e6, 'ms', False, **params)
+    if last:
+        report.record('rss_growth', last['rss_growth_mb'], 'MB', False, **params)
+    report.dump(args.output)
+
+    if args.baseline:
+        regressions = report.compare(args.baseline, args.tolerance)
+        for key, change in regressions:
+            print(f'REGRESSION {key}: {change:+.1%}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+TradeDB ingest and formula latency benchmarks
+
+Measures `_TradeDB.add` and `_TradeDB.add_batch` throughput, `volume_weighted_stock_price` and
+`gbce_all_share_index` latency, the VWSP both with the query cache cleared before every call and
+answered from the cache, CSV load rate through
+`CsvParserMixin.from_csv` and memory per trade.
+
+Example:
+    python -m benchmarks.trade_db --trades 1000 100000 --symbols 5 500 \\
+        --output bench.json --baseline baseline.json
+"""
+
+import argparse
+import csv
+import gc
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from itertools import product
+from pathlib import Path
+from random import Random
+from statistics import median
+from string import ascii_uppercase
+from time import perf_counter
+from typing import Callable, List
+
+from benchmarks.report import Report
+from src.db.stock_db import StockDB
+from src.db.trade_db import TradeDB
+from src.models.stock import Stock
+from src.models.stock_type import StockType
+from src.models.trade import TradeWithTimestamp
+from src.models.trade_batch import TradeBatch
+from src.utilities import gen_trade_batches
+
+
+def register_symbols(n: int) -> List[str]:
+    """
+    Register synthetic stocks until the stock db holds n symbols
+
+    Attributes:
+        n (int): the number of symbols the benchmark needs
+
+    Returns:
+        the first n symbols of the stock db (List[str])
+    """
+    stocks = StockDB()
+    candidates = (''.join(letters) for letters in product(ascii_uppercase, repeat=3))
+    while len(stocks) < n:
+        symbol = next(candidates)
+        if symbol not in stocks:
+            stocks.add(Stock.from_fields(symbol, StockType.COMMON, 1., None, 100.))
+    return stocks.symbols()[:n]
+
+
+def make_batch(n: int, symbols: List[str], seed: int = 0) -> TradeBatch:
+    """
+    Generate n trades arriving over the past hour
+
+    Attributes:
+        n (int): the number of trades
+        symbols (List[str]): the symbols to draw from uniformly
+        seed (int, default: 0): random seed
+
+    Returns:
+        the trades in ascending timestamp order (TradeBatch)
+    """
+    return next(gen_trade_batches(
+        n, batch_size=n, symbols=symbols, rate=n / 3600,
+        start=datetime.now() - timedelta(hours=1), seed=seed
+    ))
+
+
+def time_call(
+    fn: Callable[[], object],
+    repeat: int,
+    setup: Callable[[], object] | None = None
+) -> float:
+    "Median wall time in seconds of repeated calls, setup runs untimed before each call"
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        fn()
+        timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def bench_ingest(report: Report, batch: List[TradeWithTimestamp], **params):
+    "Throughput of adding trades to an empty db"
+    TradeDB()
+    start = perf_counter()
+    for trade in batch:
+        TradeDB().add(trade)  # pylint: disable=E1101
+    report.record('add', len(batch) / (perf_counter() - start), 'trades/s', True, **params)
+
+
+def bench_batch_ingest(report: Report, batch: TradeBatch, **params):
+    "Throughput of bulk adding a validated batch to an empty db"
+    TradeDB()
+    start = perf_counter()
+    TradeDB().add_batch(batch)  # pylint: disable=E1101
+    report.record('add_batch', len(batch) / (perf_counter() - start), 'trades/s', True, **params)
+
+
+def bench_formulas(report: Report, traded: List[str], repeat: int, **params):
+    "Latency of formulas over the populated db, uncached and answered from the query cache"
+    db = TradeDB()
+    symbol = Random(1).choice(traded)
+
+    def vwsp():
+        return db.volume_weighted_stock_price(symbol)
+
+    # clearing the cache before every call times the window resolution, not a cache hit
+    report.record(
+        'volume_weighted_stock_price',
+        time_call(vwsp, repeat, db.query_cache.clear) * 1e3,
+        'ms', False, **params
+    )
+    vwsp()
+    report.record(
+        'volume_weighted_stock_price_cached', time_call(vwsp, repeat) * 1e3, 'ms', False, **params
+    )
+    # served from the running sums of the share index, the query cache is not involved
+    report.record(
+        'gbce_all_share_index',
+        time_call(db.gbce_all_share_index, repeat) * 1e3,
+        'ms', False, **params
+    )
+
+
+def bench_memory(report: Report, batch: List[TradeWithTimestamp], **params):
+    "Memory held per trade, including the trade objects and the db aggregates"
+    gc.collect()
+    tracemalloc.start()
+    TradeDB()
+    for trade in batch:
+        TradeDB().add(trade.model_copy())  # pylint: disable=E1101
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report.record('memory_per_trade', current / len(batch), 'bytes', False, **params)
+
+
+def bench_csv(report: Report, batch: List[TradeWithTimestamp], **params):
+    "Rate of loading validated trades from csv"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'trades.csv'
+        with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(TradeWithTimestamp.positional_fields())
+            writer.writerows(
+                (t.symbol, t.price, t.quantity, t.indicator, t.timestamp.isoformat())
+                for t in batch
+            )
+        start = perf_counter()
+        count = sum(1 for _ in TradeWithTimestamp.from_csv(path))
+        report.record('from_csv', count / (perf_counter() - start), 'rows/s', True, **params)
+
+
+def main(argv: List[str] | None = None) -> int:
+    "Run the suite, returns a non zero exit code on regressions"
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--trades', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='db sizes to benchmark, up to 10^7')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[5, 500],
+                        help='number of traded symbols, up to 5000')
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions of latency timings')
+    parser.add_argument('--csv-rows', type=int, default=100_000,
+                        help='cap on the rows of the csv load benchmark')
+    parser.add_argument('--output', help='write the JSON report to a file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='relative slowdown allowed against the baseline')
+    args = parser.parse_args(argv)
+
+    report = Report('trade_db')
+    for n_symbols in args.symbols:
+        symbols = register_symbols(n_symbols)
+        for n_trades in args.trades:
+            params = {'trades': n_trades, 'symbols': n_symbols}
+            batch = make_batch(n_trades, symbols)
+            trades = list(batch.trades())
+
+            bench_batch_ingest(report, batch, **params)
+            TradeDB.reset()
+
+            bench_ingest(report, trades, **params)
+            # query symbols traded in the past minutes so the VWSP window is never empty
+            bench_formulas(report, [t.symbol for t in trades[-100:]], args.repeat, **params)
+            TradeDB.reset()
+
+            bench_memory(report, trades[:min(n_trades, 100_000)], **params)
+            TradeDB.reset()
+
+            bench_csv(report, trades[:min(n_trades, args.csv_rows)], **params)
+            del batch, trades
+            gc.collect()
+
+    report.dump(args.output)
+
+    if args.baseline:
+        regressions = report.compare(args.baseline, args.tolerance)
+        for key, change in regressions:
+            print(f'REGRESSION {key}: {change:+.1%}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Query worker scaling benchmark
+
+Publishes trades in shared memory and measures the VWSP and batch query
+throughput of `QueryWorkers` pools of growing size, along with the
+speedup over a single worker. Throughput should grow with the number of
+workers up to the number of cores.
+
+Example:
+    python -m benchmarks.workers --trades 1000000 --processes 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+from typing import List
+
+from benchmarks.report import Report
+from benchmarks.trade_db import make_batch, register_symbols
+from src.db.trade_db import TradeDB
+from src.workers import QueryWorkers
+
+
+def bench_pool(
+    report: Report,
+    name: str,
+    processes: int,
+    traded: List[str],
+    n_queries: int,
+    **params
+) -> float:
+    """
+    Query throughput of a pool of workers, VWSP then batch queries
+
+    Returns:
+        the VWSP queries per second (float)
+    """
+    queried = [traded[n % len(traded)] for n in range(n_queries)]
+    with QueryWorkers(name, processes) as workers:
+        # every worker attaches the segment before timing
+        workers.volume_weighted_stock_prices(traded)
+
+        start = perf_counter()
+        workers.volume_weighted_stock_prices(queried)
+        vwsp = n_queries / (perf_counter() - start)
+
+        start = perf_counter()
+        count = sum(1 for _ in workers.evaluate((symbol, '10') for symbol in queried))
+        batch = count / (perf_counter() - start)
+
+    report.record('workers_vwsp', vwsp, 'queries/s', True, processes=processes, **params)
+    report.record('workers_batch', batch, 'queries/s', True, processes=processes, **params)
+    return vwsp
+
+
+def main(argv: List[str] | None = None) -> int:
+    "Run the suite, returns a non zero exit code on regressions"
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--trades', type=int, default=100_000, help='trades in shared memory')
+    parser.add_argument('--symbols', type=int, default=500, help='number of traded symbols')
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help='pool sizes to benchmark')
+    parser.add_argument('--queries', type=int, default=20_000, help='queries per measurement')
+    parser.add_argument('--output', help='write the JSON report to a file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=.2,
+                        help='relative slowdown allowed against the baseline')
+    args = parser.parse_args(argv)
+
+    db = TradeDB()
+    symbols = register_symbols(args.symbols)
+    store = db.configure_shared_memory(capacity=args.trades)  # pylint: disable=E1101
+    db.add_batch(make_batch(args.trades, symbols))  # pylint: disable=E1101
+
+    report = Report('workers')
+    params = {'trades': args.trades, 'symbols': args.symbols}
+    single = None
+    try:
+        for processes in args.processes:
+            rate = bench_pool(report, store.name, processes, symbols, args.queries, **params)
+            single = single or rate
+            report.record('workers_speedup', rate / single, 'x', True, processes=processes, **params)
+    finally:
+        db.configure_shared_memory(enabled=False)  # pylint: disable=E1101
+    report.dump(args.output)
+
+    if args.baseline:
+        regressions = report.compare(args.baseline, args.tolerance)
+        for key, change in regressions:
+            print(f'REGRESSION {key}: {change:+.1%}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,23 @@
 """
 Entrypoint
 
+Runs interactively by default, pass `--batch` to evaluate symbol/price
+queries from a file or stdin and stream the results to stdout.
+
 Example:
     python main.py
+    python main.py --batch queries.csv --format ndjson --trades trades.csv
 """
 
+import argparse
+import sys
+from typing import List
+
 from src.utilities import gen_k_random_trades, parse_price, STOCKS, TRADES
 
 
-if __name__ == "__main__":
+def interactive():
+    "Prompt for stock formulas, register random trades and prompt for trade formulas"
     print('\n\nStarting state...')
 
     print(STOCKS)
@@ -38,6 +47,8 @@ if __name__ == "__main__":
         TRADES.add(trade_with_ts)
 
     print(TRADES)
+    print('\nLatest trades...')
+    TRADES.between()[-10:].write(sys.stdout)
 
     print('\n\nCalculate Volume Weighted Stock Price for a given stock symbol')
     print(STOCKS)
@@ -58,3 +69,45 @@ if __name__ == "__main__":
             continue
 
     print(f'\nGBCE all share index for all shares {TRADES.gbce_all_share_index():.4f}')
+
+
+def batch(argv: List[str] | None = None) -> int:
+    "Evaluate queries in bulk, returns the process exit code"
+    # pylint: disable=C0415
+    from src.batch import FORMATS, FORMULAS, evaluate, read_queries, write_results
+    from src.models.trade import TradeWithTimestamp
+    from src.utilities import gen_trade_batches
+
+    parser = argparse.ArgumentParser(description='Evaluate symbol/price queries in bulk')
+    parser.add_argument('--batch', metavar='QUERIES', required=True,
+                        help='csv or ndjson file of symbol/price queries, - for stdin')
+    parser.add_argument('--format', choices=FORMATS, default='csv', help='output format')
+    parser.add_argument('--formulas', nargs='+', choices=FORMULAS, default=list(FORMULAS),
+                        help='formulas to evaluate')
+    parser.add_argument('--trades', help='csv file of trades with timestamp to load')
+    parser.add_argument('--random-trades', type=int, default=150,
+                        help='number of random trades to register if no trades file is given')
+    parser.add_argument('--seed', type=int, help='random seed of the generated trades')
+    args = parser.parse_args(argv)
+
+    if args.trades:
+        for trade in TradeWithTimestamp.from_csv(args.trades):
+            TRADES.add(trade)
+    else:
+        for trades in gen_trade_batches(args.random_trades, seed=args.seed):
+            TRADES.add_batch(trades, validate=False)
+
+    queries_file = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8')
+    with queries_file:
+        write_results(
+            evaluate(read_queries(queries_file), TRADES, args.formulas),
+            sys.stdout, args.format, args.formulas
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    # --batch FILE and --batch=FILE
+    if any(arg.startswith('--batch') or arg in ('-h', '--help') for arg in sys.argv[1:]):
+        sys.exit(batch())
+    interactive()
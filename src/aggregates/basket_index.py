@@ -0,0 +1,154 @@
+"""
+Basket indices maintained on trade ingestion
+
+A basket is a named subset of the listed stocks, e.g. common stocks
+only or a sector, its index is the geometric mean of the prices of the
+trades of its stocks, like the GBCE all share index over the whole
+market. A symbol to baskets map routes every added trade to the running
+log price sums of its baskets only, the log is taken once per trade, so
+an update costs the number of baskets of the symbol and reading an
+index is O(1).
+"""
+
+from math import exp, log
+from typing import Dict, FrozenSet, Iterable, List
+
+from pydantic import BaseModel, field_validator
+
+from src.db.stock_db import StockDB
+from src.models.stock_type import StockType
+
+
+class Basket(BaseModel):
+    """
+    Named subset of the listed stocks
+    """
+    name: str
+    symbols: FrozenSet[str]
+
+    # pylint: disable=R0903
+    class Config:
+        "Basket configuration"
+        frozen: bool = True
+
+    @field_validator('symbols')
+    @staticmethod
+    def _validate_symbols(value: FrozenSet[str]) -> FrozenSet[str]:
+        "Checks the basket is not empty and its symbols are in StockDB"
+        if not value:
+            raise ValueError('A basket must hold at least one stock')
+        if unknown := sorted(symbol for symbol in value if symbol not in StockDB()):
+            raise ValueError(f'Invalid stock symbols {unknown}')
+        return value
+
+    @classmethod
+    def of_type(cls, name: str, stock_type: StockType) -> "Basket":
+        """
+        Basket of all the listed stocks of a type
+
+        Attributes:
+            name (str): the basket name e.g. COMMON
+            stock_type (StockType): the stock type
+
+        Returns:
+            the basket (Basket)
+        """
+        return cls(name=name, symbols=frozenset(
+            stock.symbol for stock in StockDB().values() if stock.type == stock_type
+        ))
+
+
+class BasketIndices:
+    """
+    Geometric mean of the trade prices of every registered basket
+    """
+
+    def __init__(self):
+        self.__baskets: Dict[str, Basket] = {}
+        # log price sum and count per basket, shared with the symbol routing lists
+        self.__sums: Dict[str, List[float]] = {}
+        self.__by_symbol: Dict[str, List[List[float]]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__baskets
+
+    def __len__(self) -> int:
+        return len(self.__baskets)
+
+    def baskets(self) -> List[Basket]:
+        "The registered baskets in registration order"
+        return list(self.__baskets.values())
+
+    def register(self, basket: Basket, trades: Iterable = ()):
+        """
+        Register a basket, replacing any basket of the same name
+
+        Attributes:
+            basket (Basket): the basket
+            trades (Iterable[Trade]): trades already recorded, those of the
+                basket stocks seed its index
+        """
+        self.unregister(basket.name)
+        sums = [0., 0]
+        for trade in trades:
+            if trade.symbol in basket.symbols:
+                sums[0] += log(trade.price)
+                sums[1] += 1
+        self.__baskets[basket.name] = basket
+        self.__sums[basket.name] = sums
+        for symbol in basket.symbols:
+            self.__by_symbol.setdefault(symbol, []).append(sums)
+
+    def unregister(self, name: str):
+        "Drop a basket, unknown names are ignored"
+        if (basket := self.__baskets.pop(name, None)) is None:
+            return
+        sums = self.__sums.pop(name)
+        for symbol in basket.symbols:
+            routes = self.__by_symbol[symbol]
+            # by identity, baskets with equal sums are distinct routes
+            del routes[next(i for i, route in enumerate(routes) if route is sums)]
+            if not routes:
+                del self.__by_symbol[symbol]
+
+    def update(self, trade):
+        """
+        Add the log price of a trade to the sums of the baskets of its stock
+
+        Attributes:
+            trade (Trade): the ingested trade
+        """
+        if (routes := self.__by_symbol.get(trade.symbol)) is None:
+            return
+        log_price = log(trade.price)
+        for sums in routes:
+            sums[0] += log_price
+            sums[1] += 1
+
+    def clear(self):
+        "Reset the running sums, baskets stay registered"
+        for sums in self.__sums.values():
+            sums[0], sums[1] = 0., 0
+
+    def value(self, name: str) -> float | None:
+        """
+        Index of a basket
+
+        Attributes:
+            name (str): the basket name
+
+        Raises:
+            KeyError: if no basket has this name
+
+        Returns:
+            the geometric mean of the trade prices of the basket,
+                None if none of its stocks traded (float | None)
+        """
+        if name not in self.__sums:
+            raise KeyError(f'No such basket {name}')
+        log_sum, count = self.__sums[name]
+        return exp(log_sum / count) if count else None
+
+    def values(self) -> Dict[str, float | None]:
+        "Index of every basket, None for baskets without trades"
+        return {name: self.value(name) for name in self.__baskets}
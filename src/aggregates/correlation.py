@@ -0,0 +1,245 @@
+"""
+Cross-symbol return correlation maintained on trade ingestion
+
+Trades are bucketed by time, one minute by default, the close of a
+bucket is the last trade price of every symbol in it, forward-filled
+from the previous close for symbols that did not trade. When a bucket
+closes the log returns from the previous closes enter a sliding window
+of buckets, and the return of the oldest bucket leaves it: the sums and
+the upper triangle of the sums of cross products of the returns are
+updated in place, the matrices are never recomputed over the history.
+
+Forward-filled returns are zero, a closed bucket is a sparse vector of
+the returns of the symbols which traded in it: updating the cross
+products costs the square of the number of symbols which traded, not of
+the universe, so thousands of symbols fit a per-minute refresh. A
+symbol has zero returns until its first close.
+
+Trades older than the open bucket can not be added to closed buckets,
+they are counted in `late` and ignored, enable event time on the db to
+reorder them first.
+"""
+
+from array import array
+from collections import deque
+from datetime import timedelta
+from math import log, nan, sqrt
+from typing import Deque, Dict, Iterable, List, Tuple
+
+from pydantic import PositiveInt
+
+Returns = Tuple[Tuple[int, ...], Tuple[float, ...]]
+
+
+class ReturnCorrelation:
+    """
+    Rolling covariance and correlation of bucketed log returns across symbols
+
+    Attributes:
+        symbols (Iterable[str]): the symbols of the matrices, trades of other symbols are ignored
+        bucket (timedelta, default: 1 minute): the length of a bucket
+        window (PositiveInt, default: 60): the number of closed buckets in the window
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        bucket: timedelta = timedelta(minutes=1),
+        window: PositiveInt = 60
+    ):
+        self.symbols: Tuple[str, ...] = tuple(dict.fromkeys(symbols))
+        self.bucket = bucket
+        self.window = window
+        self.__bucket_ns = bucket // timedelta(microseconds=1) * 1000
+        if self.__bucket_ns <= 0 or window < 2:
+            raise ValueError('Buckets must be positive and the window at least 2 buckets long')
+        self.__codes: Dict[str, int] = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self.__returns)
+
+    # pylint: disable=W0201
+    def clear(self):
+        "Drop all buckets and reset the sums"
+        n = len(self.symbols)
+        self.late = 0
+        self.__current: int | None = None
+        self.__open: Dict[int, float] = {}
+        self.__closes: List[float | None] = [None] * n
+        self.__returns: Deque[Returns] = deque()
+        self.__sums = array('d', bytes(8 * n))
+        # buckets of the window in which each symbol moved, exact unlike the sums
+        self.__moves = array('q', bytes(8 * n))
+        # row i holds the sums of r_i * r_j for j >= i at j - i
+        self.__cross = [array('d', bytes(8 * (n - i))) for i in range(n)]
+
+    def update(self, trade):
+        """
+        Record the price of a trade in its bucket, closing the buckets before it
+
+        Attributes:
+            trade (TradeWithTimestamp): the ingested trade
+        """
+        if (code := self.__codes.get(trade.symbol)) is None:
+            return
+        bucket = trade.timestamp_ns // self.__bucket_ns
+        if self.__current is None:
+            self.__current = bucket
+        elif bucket > self.__current:
+            self.__close(bucket)
+        elif bucket < self.__current:
+            self.late += 1
+            return
+        self.__open[code] = trade.price
+
+    def advance(self, timestamp_ns: int):
+        """
+        Close the buckets ending at or before a timestamp, e.g. on a refresh timer
+        when no trade arrived since the end of the open bucket
+
+        Attributes:
+            timestamp_ns (int): the current timestamp in nanoseconds
+        """
+        bucket = timestamp_ns // self.__bucket_ns
+        if self.__current is not None and bucket > self.__current:
+            self.__close(bucket)
+
+    def __close(self, bucket: int):
+        "Close the open bucket and the empty buckets up to, excluding, a bucket"
+        closes, codes, returns = self.__closes, [], []
+        for code in sorted(self.__open):
+            log_price = log(self.__open[code])
+            if closes[code] is not None and log_price != closes[code]:
+                codes.append(code)
+                returns.append(log_price - closes[code])
+            closes[code] = log_price
+        self.__open.clear()
+        self.__push((tuple(codes), tuple(returns)))
+        # buckets without trades have zero returns, only the last window of them matters
+        for _ in range(min(bucket - self.__current - 1, self.window)):
+            self.__push(((), ()))
+        self.__current = bucket
+
+    def __push(self, returns: Returns):
+        "Slide the window by a closed bucket"
+        self.__accumulate(returns, 1)
+        self.__returns.append(returns)
+        if len(self.__returns) > self.window:
+            self.__accumulate(self.__returns.popleft(), -1)
+
+    def __accumulate(self, returns: Returns, sign: int):
+        "Add or remove the returns of a bucket to the sums"
+        codes, values = returns
+        sums, cross, moves = self.__sums, self.__cross, self.__moves
+        for a, (i, r_i) in enumerate(zip(codes, values)):
+            sums[i] += sign * r_i
+            moves[i] += sign
+            row, weighted = cross[i], sign * r_i
+            for j, r_j in zip(codes[a:], values[a:]):
+                row[j - i] += weighted * r_j
+
+    def __codes_of(self, symbols: Iterable[str] | None) -> List[int]:
+        "Codes of the requested symbols, all if not given"
+        if symbols is None:
+            return list(range(len(self.symbols)))
+        try:
+            return [self.__codes[symbol] for symbol in symbols]
+        except KeyError as error:
+            raise KeyError(f'Stock symbol {error.args[0]} is not tracked') from error
+
+    def __covariance(self, i: int, j: int) -> float:
+        "Sample covariance of the returns of two codes over the window"
+        n, sums = len(self.__returns), self.__sums
+        if not (self.__moves[i] and self.__moves[j]):
+            # only rounding residues of removed buckets are left in the sums
+            return 0.
+        if i > j:
+            i, j = j, i
+        value = (self.__cross[i][j - i] - sums[i] * sums[j] / n) / (n - 1)
+        return max(value, 0.) if i == j else value
+
+    def __check(self):
+        if len(self.__returns) < 2:
+            raise ValueError('At least 2 closed buckets are needed')
+
+    def covariance(self, symbols: Iterable[str] | None = None) -> List[List[float]]:
+        """
+        Sample covariance matrix of the bucket log returns over the window
+
+        Attributes:
+            symbols (Iterable[str] | None): the rows and columns, all tracked symbols if not given
+
+        Raises:
+            KeyError: if a symbol is not tracked
+            ValueError: if fewer than 2 buckets closed
+
+        Returns:
+            the symmetric matrix, in the order of the symbols (List[List[float]])
+        """
+        self.__check()
+        codes = self.__codes_of(symbols)
+        n, sums, cross, moves = len(self.__returns), self.__sums, self.__cross, self.__moves
+        # in ascending codes the upper triangle is read from contiguous rows
+        order = sorted(range(len(codes)), key=codes.__getitem__)
+        ascending = [codes[a] for a in order]
+        upper = []
+        for a, i in enumerate(ascending):
+            if not moves[i]:
+                # symbols which did not move only hold rounding residues of removed buckets
+                upper.append([0.] * (len(ascending) - a))
+                continue
+            row, mean = cross[i], sums[i] / n
+            upper.append([
+                (row[j - i] - mean * sums[j]) / (n - 1) if moves[j] else 0.
+                for j in ascending[a:]
+            ])
+            upper[-1][0] = max(upper[-1][0], 0.)
+        matrix = [[upper[b][a - b] for b in range(a)] + upper[a] for a in range(len(upper))]
+        if order == sorted(order):
+            return matrix
+        ranks = [0] * len(order)
+        for rank, a in enumerate(order):
+            ranks[a] = rank
+        return [[matrix[ranks[a]][rank] for rank in ranks] for a in range(len(order))]
+
+    def correlation(self, symbols: Iterable[str] | None = None) -> List[List[float]]:
+        """
+        Correlation matrix of the bucket log returns over the window
+
+        Attributes:
+            symbols (Iterable[str] | None): the rows and columns, all tracked symbols if not given
+
+        Raises:
+            KeyError: if a symbol is not tracked
+            ValueError: if fewer than 2 buckets closed
+
+        Returns:
+            the symmetric matrix, in the order of the symbols, nan for
+                symbols whose price did not move in the window (List[List[float]])
+        """
+        matrix = self.covariance(symbols)
+        scales = [1 / sqrt(row[a]) if row[a] else nan for a, row in enumerate(matrix)]
+        for a, (row, scale) in enumerate(zip(matrix, scales)):
+            matrix[a] = [value * scale * other for value, other in zip(row, scales)]
+            if row[a]:
+                matrix[a][a] = 1.
+        return matrix
+
+    def correlation_of(self, first: str, second: str) -> float:
+        """
+        Correlation of the bucket log returns of two symbols, O(1)
+
+        Raises:
+            KeyError: if a symbol is not tracked
+            ValueError: if fewer than 2 buckets closed
+
+        Returns:
+            the correlation, nan if a price did not move in the window (float)
+        """
+        self.__check()
+        i, j = self.__codes_of((first, second))
+        scale = sqrt(self.__covariance(i, i) * self.__covariance(j, j))
+        if not scale:
+            return nan
+        return 1. if i == j else max(-1., min(1., self.__covariance(i, j) / scale))
@@ -0,0 +1,147 @@
+"""
+Exponentially weighted moving averages per stock symbol
+
+Maintains the EWMA price and the EWMA of squared log returns, the
+realized volatility, of every symbol in O(1) per trade and per half-life.
+
+Half-lives are measured in trades, a trade half-life h weights the
+price of the trade h trades ago half as much as the latest one.
+"""
+
+from math import log, sqrt
+from typing import Dict, Iterable, List, Tuple
+
+from pydantic import PositiveInt
+
+
+class EwmaTracker:
+    """
+    EWMA price and realized volatility per symbol
+
+    Attributes:
+        half_lives (Tuple[PositiveInt, ...], default: (10, 100)): the half-lives
+            to maintain, measured in trades
+    """
+
+    def __init__(self, half_lives: Iterable[PositiveInt] = (10, 100)):
+        self.half_lives: Tuple[PositiveInt, ...] = tuple(half_lives)
+        if not self.half_lives or any(half_life <= 0 for half_life in self.half_lives):
+            raise ValueError('Half-lives must be positive integers')
+        self.__alphas = tuple(1 - 2 ** (-1 / half_life) for half_life in self.half_lives)
+        # symbol -> [last log price, ewma price, ewma squared return, ...] per half-life
+        self.__states: Dict[str, List[float]] = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.__states
+
+    def __step(self, state: List[float] | None, price: float) -> List[float]:
+        "Fold a price into the state of a symbol, shared by incremental and batch paths"
+        log_price = log(price)
+        if state is None:
+            return [log_price, *(value for _ in self.__alphas for value in (price, 0.))]
+
+        squared_return = (log_price - state[0]) ** 2
+        state[0] = log_price
+        for i, alpha in enumerate(self.__alphas, start=1):
+            state[2 * i - 1] += alpha * (price - state[2 * i - 1])
+            state[2 * i] += alpha * (squared_return - state[2 * i])
+        return state
+
+    def update(self, trade):
+        """
+        Fold the price of a trade into the state of its symbol
+
+        Attributes:
+            trade (Trade): the ingested trade
+        """
+        self.__states[trade.symbol] = self.__step(self.__states.get(trade.symbol), trade.price)
+
+    def clear(self):
+        "Drop the state of all symbols"
+        self.__states.clear()
+
+    def recompute(self, trades: Iterable):
+        """
+        Rebuild the state of all symbols from historical trades
+
+        Trades are grouped by symbol and folded in order, results are
+        identical to adding the same trades one by one.
+
+        Attributes:
+            trades (Iterable[Trade]): the trades in timestamp order
+        """
+        prices: Dict[str, List[float]] = {}
+        for trade in trades:
+            prices.setdefault(trade.symbol, []).append(trade.price)
+
+        self.__states.clear()
+        for symbol, symbol_prices in prices.items():
+            state = None
+            for price in symbol_prices:
+                state = self.__step(state, price)
+            self.__states[symbol] = state
+
+    def recompute_symbol(self, symbol: str, trades: Iterable):
+        """
+        Rebuild the state of a single symbol, e.g. after a late trade
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            trades (Iterable[Trade]): the trades of the symbol in order
+        """
+        state = None
+        for trade in trades:
+            state = self.__step(state, trade.price)
+        if state is None:
+            self.__states.pop(symbol, None)
+        else:
+            self.__states[symbol] = state
+
+    def __index(self, half_life: PositiveInt | None) -> int:
+        if half_life is None:
+            return 0
+        if half_life not in self.half_lives:
+            raise ValueError(f'Half-life {half_life} is not maintained')
+        return self.half_lives.index(half_life)
+
+    def price(self, symbol: str, half_life: PositiveInt | None = None) -> float:
+        """
+        EWMA price of a symbol
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            half_life (PositiveInt | None): a maintained half-life, the first if not given
+
+        Raises:
+            KeyError: if the symbol has no recorded trade
+
+        Returns:
+            the EWMA price (float)
+        """
+        return self.__states[symbol][2 * self.__index(half_life) + 1]
+
+    def volatility(self, symbol: str, half_life: PositiveInt | None = None) -> float:
+        """
+        Realized volatility of a symbol, the square root of the EWMA squared log return
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            half_life (PositiveInt | None): a maintained half-life, the first if not given
+
+        Raises:
+            KeyError: if the symbol has no recorded trade
+
+        Returns:
+            the realized volatility per trade (float)
+        """
+        return sqrt(self.__states[symbol][2 * self.__index(half_life) + 2])
+
+    def prices(self, half_life: PositiveInt | None = None) -> Dict[str, float]:
+        "EWMA price of every symbol"
+        idx = 2 * self.__index(half_life) + 1
+        return {symbol: state[idx] for symbol, state in self.__states.items()}
+
+    def volatilities(self, half_life: PositiveInt | None = None) -> Dict[str, float]:
+        "Realized volatility of every symbol"
+        idx = 2 * self.__index(half_life) + 2
+        return {symbol: sqrt(state[idx]) for symbol, state in self.__states.items()}
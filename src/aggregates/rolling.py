@@ -0,0 +1,120 @@
+"""
+Rolling aggregates maintained on trade ingestion
+
+Holds the running sums behind the volume weighted stock price of a
+symbol over a sliding window, and behind the GBCE all share index.
+"""
+
+from heapq import heappop, heappush
+from math import exp, log
+from typing import List, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import NS_PER_MINUTE
+from src.fixed_point import from_ticks, to_ticks
+
+
+class RollingVwsp:
+    """
+    Volume weighted stock price of a symbol over a sliding window
+
+    The window ends at the timestamp of the latest added trade, trades
+    leave it in timestamp order, late trades included, from a heap of
+    the window entries. With a tick size the notional is summed in exact
+    integer ticks.
+
+    Attributes:
+        symbol (str): a symbol reference to the stock e.g. TEA
+        n_minutes (PositiveInt, default: 15): the length of the window
+        tick_size (float | None): the tick size of the stock in fixed-point mode
+    """
+
+    def __init__(self, symbol: str, n_minutes: PositiveInt = 15, tick_size: float | None = None):
+        self.symbol = symbol
+        self.n_minutes = n_minutes
+        self.tick_size = tick_size
+        self.__window_ns = n_minutes * NS_PER_MINUTE
+        # heap of timestamp, quantity, notional entries and the latest timestamp,
+        # timestamps in nanoseconds since the epoch
+        self.__window: List[Tuple[int, int, float | int]] = []
+        self.__latest: int | None = None
+        self.__quantity = 0
+        self.__notional: float | int = 0. if tick_size is None else 0
+
+    def __len__(self) -> int:
+        return len(self.__window)
+
+    def update(self, trade):
+        """
+        Add a trade of the symbol and slide the window to the latest timestamp
+
+        Attributes:
+            trade (TradeWithTimestamp): the ingested trade
+        """
+        if trade.symbol != self.symbol:
+            return
+        timestamp = trade.timestamp_ns
+        if self.__latest is None or timestamp > self.__latest:
+            self.__latest = timestamp
+        start = self.__latest - self.__window_ns
+        if timestamp >= start:
+            notional = trade.quantity * (
+                trade.price if self.tick_size is None else to_ticks(trade.price, self.tick_size)
+            )
+            heappush(self.__window, (timestamp, trade.quantity, notional))
+            self.__quantity += trade.quantity
+            self.__notional += notional
+        while self.__window and self.__window[0][0] < start:
+            _, quantity, notional = heappop(self.__window)
+            self.__quantity -= quantity
+            self.__notional -= notional
+
+    def clear(self):
+        "Empty the window"
+        self.__window.clear()
+        self.__latest = None
+        self.__quantity = 0
+        self.__notional = 0. if self.tick_size is None else 0
+
+    @property
+    def value(self) -> float | None:
+        "The volume weighted stock price of the window, None if the window is empty"
+        if not self.__window:
+            return None
+        if self.tick_size is None:
+            return self.__notional / self.__quantity
+        return from_ticks(self.__notional / self.__quantity, self.tick_size)
+
+
+class LogPriceIndex:
+    """
+    Geometric mean of trade prices from a running sum of log prices
+    """
+
+    def __init__(self):
+        self.__log_sum = 0.
+        self.__count = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def update(self, trade):
+        """
+        Add the log price of a trade
+
+        Attributes:
+            trade (Trade): the ingested trade
+        """
+        self.__log_sum += log(trade.price)
+        self.__count += 1
+
+    def clear(self):
+        "Reset the running sums"
+        self.__log_sum = 0.
+        self.__count = 0
+
+    @property
+    def value(self) -> float | None:
+        "The geometric mean of all added prices, None if no price was added"
+        return exp(self.__log_sum / self.__count) if self.__count else None
@@ -0,0 +1,344 @@
+"""
+Streaming heavy hitters
+
+Implements windowed top-K trackers of the most traded stock symbols by
+quantity or notional, maintained on trade ingestion.
+
+Buckets leave the window on ingestion, once the latest trade timestamp
+moved the window past them, so memory stays bounded whether or not the
+trackers are queried. Queries never change the trackers: the buckets
+of the tracked window older than the queried window are left out of the
+answer only.
+
+The exact tracker keeps per bucket totals and a ranking of the window
+totals, so a top-K query is a slice of the ranking in O(K).
+
+The approximate tracker keeps space saving summaries (Metwally et al.)
+of bounded capacity, so memory does not grow with the number of symbols.
+A symbol total is overestimated by at most its reported error, which is
+bounded by the window total divided by the capacity. Summaries keep
+their counters ranked, a top-K query is a slice in O(K) as well.
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime
+from heapq import nlargest
+from typing import Dict, List, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import NS_PER_MINUTE
+from src.date_utilities import time_bucket, time_bucket_ns, timestamp_n_minutes_ago
+
+METRICS: Tuple[str, str] = ('quantity', 'notional')
+
+
+class SpaceSaving:
+    """
+    Weighted space saving summary
+
+    Attributes:
+        capacity (PositiveInt): the maximum number of monitored keys
+    """
+
+    def __init__(self, capacity: PositiveInt):
+        self.capacity = capacity
+        self.__counters: Dict[str, List[float]] = {}
+        # (-count, key) in ascending order, the minimum count is last
+        self.__ranking: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.__counters)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__counters
+
+    def add(self, key: str, weight: float):
+        """
+        Add a weighted occurrence of a key
+
+        Attributes:
+            key (str): the key e.g. a stock symbol
+            weight (float): the weight of the occurrence
+        """
+        ranking = self.__ranking
+        if key in self.__counters:
+            counter = self.__counters[key]
+            del ranking[bisect_left(ranking, (-counter[0], key))]
+            counter[0] += weight
+        elif len(self.__counters) < self.capacity:
+            counter = self.__counters[key] = [weight, 0.]
+        else:
+            # the evicted minimum count is the error bound of the new key
+            negated, evicted = ranking.pop()
+            del self.__counters[evicted]
+            counter = self.__counters[key] = [weight - negated, -negated]
+        insort(ranking, (-counter[0], key))
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Merge another summary into this one in place
+
+        Attributes:
+            other (SpaceSaving): the summary to merge, left untouched
+
+        Returns:
+            this summary (SpaceSaving)
+        """
+        for key, (count, error) in other.__counters.items():
+            counter = self.__counters.setdefault(key, [0., 0.])
+            counter[0] += count
+            counter[1] += error
+        if len(self.__counters) > self.capacity:
+            self.__counters = dict(
+                nlargest(self.capacity, self.__counters.items(), key=lambda item: item[1][0])
+            )
+        self.__ranking = sorted((-count, key) for key, (count, _) in self.__counters.items())
+        return self
+
+    def error(self, key: str) -> float:
+        """
+        Maximum overestimation of the count of a key
+
+        Attributes:
+            key (str): a monitored key
+
+        Returns:
+            the error bound of the key count (float)
+        """
+        return self.__counters[key][1]
+
+    def top(self, k: PositiveInt) -> List[Tuple[str, float]]:
+        """
+        Keys of highest count, a slice of the ranking in O(K)
+
+        Attributes:
+            k (PositiveInt): the number of keys to return
+
+        Returns:
+            pairs of key and estimated count in descending count order (List[Tuple[str, float]])
+        """
+        return [(key, -count) for count, key in self.__ranking[:k]]
+
+
+class _WindowedTopK:
+    """
+    Base class of windowed trackers, handles bucketing and window expiry
+
+    Attributes:
+        n_minutes (PositiveInt, default: 15): the length of the window
+        bucket_width (PositiveInt, default: 60): width of a time bucket in seconds
+    """
+
+    def __init__(self, n_minutes: PositiveInt = 15, bucket_width: PositiveInt = 60):
+        self.n_minutes = n_minutes
+        self.bucket_width = bucket_width
+        self._buckets: Dict[int, object] = {}
+        self._first: int | None = None
+        self.__latest: int | None = None
+
+    def _new_bucket(self) -> object:
+        raise NotImplementedError
+
+    def _add(self, state: object, symbol: str, quantity: int, notional: float):
+        raise NotImplementedError
+
+    def _add_to_window(self, symbol: str, quantity: int, notional: float):
+        raise NotImplementedError
+
+    def _expire(self, states: List[object]):
+        raise NotImplementedError
+
+    def _top(self, k: PositiveInt, metric: int, first: int) -> List[Tuple[str, float]]:
+        raise NotImplementedError
+
+    def clear(self):
+        "Drop all buckets and window totals"
+        self._buckets.clear()
+        self._first = None
+        self.__latest = None
+
+    def update(self, trade):
+        """
+        Add the quantity and notional of a trade to its bucket and to the window,
+        expiring the buckets the window ending at the latest trade moved past
+
+        Trades older than the window of the latest trade are ignored.
+
+        Attributes:
+            trade (TradeWithTimestamp): the ingested trade
+        """
+        timestamp = trade.timestamp_ns
+        if self.__latest is None or timestamp > self.__latest:
+            self.__latest = timestamp
+            first = time_bucket_ns(timestamp - self.n_minutes * NS_PER_MINUTE, self.bucket_width)
+            if self._first is None or first > self._first:
+                self._expire([
+                    self._buckets.pop(bucket)
+                    for bucket in sorted(self._buckets) if bucket < first
+                ])
+                self._first = first
+        bucket = time_bucket_ns(timestamp, self.bucket_width)
+        if bucket < self._first:
+            return
+        notional = trade.price * trade.quantity
+        if bucket not in self._buckets:
+            self._buckets[bucket] = self._new_bucket()
+        self._add(self._buckets[bucket], trade.symbol, trade.quantity, notional)
+        self._add_to_window(trade.symbol, trade.quantity, notional)
+
+    def top(
+        self,
+        k: PositiveInt = 20,
+        by: str = 'quantity',
+        mock_ts: datetime | None = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Most traded symbols in the window ending at the present moment
+
+        Windows are aligned to buckets. The tracker is left unchanged,
+        buckets older than the queried window are only left out.
+
+        Attributes:
+            k (PositiveInt, default: 20): the number of symbols to return
+            by (str, default: quantity): the ranking metric, quantity or notional
+            mock_ts (datetime | None): A mock timestamp to aid with testing
+                without the need of an external mocking framework
+
+        Raises:
+            ValueError: if the metric is unknown or the window starts before
+                the window of the latest trade, whose older buckets expired
+
+        Returns:
+            pairs of symbol and total in descending order (List[Tuple[str, float]])
+        """
+        if by not in METRICS:
+            raise ValueError(f'Metric must be one of {", ".join(METRICS)}')
+
+        first = time_bucket(
+            timestamp_n_minutes_ago(self.n_minutes, mock_ts), self.bucket_width
+        )
+        if self._first is not None and first < self._first:
+            raise ValueError('Window starts before the window of the latest trade')
+        return self._top(k, METRICS.index(by), first)
+
+
+class ExactWindowedTopK(_WindowedTopK):
+    """
+    Exact windowed top-K tracker, answers in O(K)
+    """
+
+    def __init__(self, n_minutes: PositiveInt = 15, bucket_width: PositiveInt = 60):
+        super().__init__(n_minutes, bucket_width)
+        self.__totals: Dict[str, List[float]] = {}
+        self.__rankings: Tuple[List[Tuple[float, str]], ...] = tuple([] for _ in METRICS)
+
+    def clear(self):
+        super().clear()
+        self.__totals.clear()
+        for ranking in self.__rankings:
+            ranking.clear()
+
+    def _new_bucket(self) -> Dict[str, List[float]]:
+        return {}
+
+    def _add(self, state: Dict[str, List[float]], symbol: str, quantity: int, notional: float):
+        totals = state.setdefault(symbol, [0, 0., 0])
+        totals[0] += quantity
+        totals[1] += notional
+        totals[2] += 1
+
+    def __rerank(self, symbol: str, old: List[float] | None, new: List[float] | None):
+        for metric, ranking in enumerate(self.__rankings):
+            if old is not None:
+                del ranking[bisect_left(ranking, (-old[metric], symbol))]
+            if new is not None:
+                insort(ranking, (-new[metric], symbol))
+
+    def _add_to_window(self, symbol: str, quantity: int, notional: float):
+        old = self.__totals.get(symbol)
+        old = list(old) if old is not None else None
+        self._add(self.__totals, symbol, quantity, notional)
+        self.__rerank(symbol, old, self.__totals[symbol])
+
+    def _expire(self, states: List[Dict[str, List[float]]]):
+        for state in states:
+            for symbol, (quantity, notional, count) in state.items():
+                old = self.__totals[symbol]
+                new = [old[0] - quantity, old[1] - notional, old[2] - count]
+                if new[2]:
+                    self.__totals[symbol] = new
+                else:
+                    new = None
+                    del self.__totals[symbol]
+                self.__rerank(symbol, old, new)
+
+    def _top(self, k: PositiveInt, metric: int, first: int) -> List[Tuple[str, float]]:
+        ranking = self.__rankings[metric]
+        older = [state for bucket, state in self._buckets.items() if bucket < first]
+        if not older:
+            return [(symbol, -value) for value, symbol in ranking[:k]]
+
+        # totals of the symbols traded in the older buckets are adjusted aside
+        adjusted: Dict[str, List[float]] = {}
+        for state in older:
+            for symbol, totals in state.items():
+                window = adjusted.setdefault(symbol, list(self.__totals[symbol]))
+                for i, total in enumerate(totals):
+                    window[i] -= total
+        candidates = [(-totals[metric], symbol) for symbol, totals in adjusted.items() if totals[2]]
+        unchanged = (entry for entry in ranking if entry[1] not in adjusted)
+        candidates.extend(entry for entry, _ in zip(unchanged, range(k)))
+        return [(symbol, -value) for value, symbol in sorted(candidates)[:k]]
+
+
+class ApproximateWindowedTopK(_WindowedTopK):
+    """
+    Approximate windowed top-K tracker of bounded memory, answers in O(K),
+    a window starting after the tracked window is merged from its buckets
+
+    Attributes:
+        capacity (PositiveInt, default: 1000): the maximum number of monitored
+            symbols per bucket and per window
+    """
+
+    def __init__(
+        self,
+        n_minutes: PositiveInt = 15,
+        bucket_width: PositiveInt = 60,
+        capacity: PositiveInt = 1000
+    ):
+        super().__init__(n_minutes, bucket_width)
+        self.capacity = capacity
+        self.__window = self._new_bucket()
+
+    def clear(self):
+        super().clear()
+        self.__window = self._new_bucket()
+
+    def _new_bucket(self) -> Tuple[SpaceSaving, ...]:
+        return tuple(SpaceSaving(self.capacity) for _ in METRICS)
+
+    def _add(self, state: Tuple[SpaceSaving, ...], symbol: str, quantity: int, notional: float):
+        state[0].add(symbol, quantity)
+        state[1].add(symbol, notional)
+
+    def _add_to_window(self, symbol: str, quantity: int, notional: float):
+        self._add(self.__window, symbol, quantity, notional)
+
+    def _expire(self, states: List[Tuple[SpaceSaving, ...]]):
+        if not states:
+            return
+        self.__window = self._new_bucket()
+        for state in self._buckets.values():
+            for window, summary in zip(self.__window, state):
+                window.merge(summary)
+
+    def _top(self, k: PositiveInt, metric: int, first: int) -> List[Tuple[str, float]]:
+        if all(bucket >= first for bucket in self._buckets):
+            return self.__window[metric].top(k)
+        window = SpaceSaving(self.capacity)
+        for bucket, state in self._buckets.items():
+            if bucket >= first:
+                window.merge(state[metric])
+        return window.top(k)
@@ -0,0 +1,175 @@
+"""
+Non-interactive batch queries
+
+Reads symbol/price pairs from a CSV file with a `symbol,price` header or
+from NDJSON objects with `symbol` and `price` keys, evaluates the
+requested formulas for every pair and streams one result per pair as
+CSV or NDJSON. Formulas over the trade db are evaluated once per symbol,
+queries failing for a formula and malformed lines yield null values and
+an error message instead of stopping the run.
+
+Example:
+    python main.py --batch queries.csv --format ndjson
+    cat queries.ndjson | python main.py --batch - --trades trades.csv
+"""
+
+import csv
+import json
+from itertools import chain
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple
+
+from src.db.stock_db import StockDB
+
+FORMULAS: Tuple[str, ...] = (
+    'dividend_yield', 'pe_ratio', 'volume_weighted_stock_price', 'gbce_all_share_index'
+)
+FORMATS: Tuple[str, ...] = ('csv', 'ndjson')
+
+
+class MalformedQuery(ValueError):
+    """
+    Line of a queries file which is not a query, yielded in its place
+    """
+
+
+def read_queries(stream: IO[str]) -> Iterator[Tuple[str, str] | MalformedQuery]:
+    """
+    Read symbol/price pairs, the format is detected from the first line
+
+    Attributes:
+        stream (IO[str]): CSV with a `symbol,price` header or NDJSON lines
+
+    Yields:
+        symbol and unparsed price pairs, the price is empty if not given,
+            or a MalformedQuery for a line without symbol or not valid JSON
+    """
+    first = next(stream, '')
+    lines = chain((first,), stream)
+    if first.lstrip().startswith('{'):
+        for number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    query = json.loads(line)
+                except ValueError:
+                    yield MalformedQuery(f'Line {number} is not valid JSON')
+                    continue
+                if not isinstance(query, dict) or not query.get('symbol'):
+                    yield MalformedQuery(f'Line {number} has no symbol')
+                    continue
+                yield str(query['symbol']), str(query.get('price') or '')
+        return
+    for number, row in enumerate(csv.DictReader(lines), start=2):
+        if not (row.get('symbol') or '').strip():
+            yield MalformedQuery(f'Line {number} has no symbol')
+            continue
+        yield row['symbol'].strip(), (row.get('price') or '').strip()
+
+
+def evaluate(
+    queries: Iterable[Tuple[str, str]],
+    trades,
+    formulas: Iterable[str] = FORMULAS
+) -> Iterator[Dict[str, Any]]:
+    """
+    Evaluate formulas for symbol/price pairs
+
+    Results of the trade db formulas are computed once per symbol for the
+    run, the db is not expected to change while queries are evaluated.
+
+    Attributes:
+        queries (Iterable[Tuple[str, str] | MalformedQuery]): symbol and unparsed
+            price pairs, malformed lines yield a result holding their error
+        trades (TradeDB): the trades the VWSP and the index are computed over
+        formulas (Iterable[str], default: FORMULAS): the formulas to evaluate
+
+    Raises:
+        ValueError: if a formula is unknown
+
+    Yields:
+        a result per query with the symbol, the price, a value per formula
+            and the errors joined, empty if none (Dict[str, Any])
+    """
+    # pylint: disable=C0415
+    from src.utilities import parse_price
+
+    formulas = tuple(formulas)
+    if unknown := set(formulas).difference(FORMULAS):
+        raise ValueError(f'Unknown formulas {sorted(unknown)}')
+
+    stocks = StockDB()
+    per_symbol: Dict[Tuple[str, str], Tuple[Any, str | None]] = {}
+
+    def memoized(formula: str, symbol: str) -> Tuple[Any, str | None]:
+        key = (formula, symbol if formula == 'volume_weighted_stock_price' else '')
+        if key not in per_symbol:
+            try:
+                per_symbol[key] = (
+                    trades.volume_weighted_stock_price(symbol) if key[1]
+                    else trades.gbce_all_share_index(), None
+                )
+            except (ValueError, KeyError, ZeroDivisionError) as exc:
+                per_symbol[key] = (None, str(exc))
+        return per_symbol[key]
+
+    scalar = [formula for formula in formulas if formula in ('dividend_yield', 'pe_ratio')]
+    for query in queries:
+        result: Dict[str, Any] = dict.fromkeys(('symbol', 'price', *formulas))
+        if isinstance(query, MalformedQuery):
+            result['error'] = str(query)
+            yield result
+            continue
+        symbol, raw_price = query
+        result.update(symbol=symbol, price=raw_price or None)
+        errors: List[str] = []
+        if scalar:
+            try:
+                stock, result['price'] = stocks[symbol], parse_price(raw_price)
+                for formula in scalar:
+                    result[formula] = getattr(stock, formula)(result['price'])
+            except (ValueError, KeyError) as exc:
+                errors.append(str(exc).strip("'"))
+        for formula in formulas:
+            if formula not in scalar:
+                result[formula], error = memoized(formula, symbol)
+                if error is not None:
+                    errors.append(f'{formula}: {error}')
+        result['error'] = '; '.join(errors)
+        yield result
+
+
+def write_results(
+    results: Iterable[Dict[str, Any]],
+    stream: IO[str],
+    fmt: str = 'csv',
+    formulas: Iterable[str] = FORMULAS
+) -> int:
+    """
+    Stream results as CSV or NDJSON, one line per result
+
+    Attributes:
+        results (Iterable[Dict[str, Any]]): the evaluated queries
+        stream (IO[str]): the output stream e.g. stdout
+        fmt (str, default: 'csv'): either csv or ndjson
+        formulas (Iterable[str], default: FORMULAS): the formula columns of the csv header
+
+    Raises:
+        ValueError: if the format is unknown
+
+    Returns:
+        the number of results written (int)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown output format {fmt}')
+    written = 0
+    if fmt == 'ndjson':
+        for written, result in enumerate(results, start=1):
+            stream.write(json.dumps(result) + '\n')
+        return written
+
+    writer = csv.DictWriter(
+        stream, fieldnames=('symbol', 'price', *formulas, 'error'), lineterminator='\n'
+    )
+    writer.writeheader()
+    for written, result in enumerate(results, start=1):
+        writer.writerow(result)
+    return written
@@ -0,0 +1,157 @@
+"""
+Injectable clocks returning integer nanoseconds since the epoch
+
+Indexes, windows and caches compare integer timestamps. Trades keep the
+integer epoch next to their `datetime`, set from the clock or the batch
+it was built from, `to_ns` runs only for timestamps given as `datetime`
+at the API boundary. The process clock defaults to the system clock,
+replace it with `set_clock` e.g. with a `CoarseClock` to round reference
+timestamps or a `ManualClock` in tests.
+
+Example:
+    set_clock(CoarseClock(resolution_us=500))
+    ts = now_ns()
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from time import time_ns
+from typing import Iterator, Protocol
+
+NS_PER_SECOND: int = 1_000_000_000
+NS_PER_MINUTE: int = 60 * NS_PER_SECOND
+
+
+class Clock(Protocol):  # pylint: disable=R0903
+    "Source of the current time"
+
+    def now_ns(self) -> int:
+        "Current time in nanoseconds since the epoch"
+
+
+class SystemClock:  # pylint: disable=R0903
+    """
+    The system wall clock
+    """
+
+    def now_ns(self) -> int:
+        "Current time in nanoseconds since the epoch"
+        return time_ns()
+
+
+class CoarseClock:
+    """
+    System clock rounded to steps of a resolution
+
+    The cached time is refreshed on read once the system clock moved past
+    it by the resolution, no background thread runs. Timestamps read
+    within a step are equal, e.g. reference timestamps of cached queries.
+
+    Attributes:
+        resolution_us (int, default: 1000): microseconds between refreshes,
+            the returned time lags the system clock by less than as much
+    """
+
+    def __init__(self, resolution_us: int = 1000):
+        if resolution_us <= 0:
+            raise ValueError('Resolution must be positive')
+        self.resolution_us = resolution_us
+        self.__resolution_ns = resolution_us * 1000
+        self.__now = time_ns()
+
+    def now_ns(self) -> int:
+        "Cached time in nanoseconds since the epoch, refreshed when a resolution old"
+        now = time_ns()
+        if now - self.__now >= self.__resolution_ns:
+            self.__now = now
+        return self.__now
+
+
+class ManualClock:
+    """
+    Clock moved by hand
+
+    Attributes:
+        ns (int, default: 0): the initial time in nanoseconds since the epoch
+    """
+
+    def __init__(self, ns: int = 0):
+        self.ns = ns
+
+    def now_ns(self) -> int:
+        "The set time in nanoseconds since the epoch"
+        return self.ns
+
+    def advance(self, ns: int):
+        "Move the clock by ns nanoseconds"
+        self.ns += ns
+
+
+_clock: Clock = SystemClock()
+
+
+def get_clock() -> Clock:
+    "The process clock"
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """
+    Replace the process clock
+
+    Attributes:
+        clock (Clock): the new clock
+
+    Returns:
+        the previous clock (Clock)
+    """
+    global _clock  # pylint: disable=W0603
+    previous, _clock = _clock, clock
+    return previous
+
+
+@contextmanager
+def use_clock(clock: Clock) -> Iterator[Clock]:
+    "Use a clock within a block, the previous one is restored on exit"
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
+def now_ns() -> int:
+    "Current time of the process clock in nanoseconds since the epoch"
+    return _clock.now_ns()
+
+
+def to_ns(ts: datetime) -> int:
+    """
+    Nanoseconds since the epoch of a timestamp, naive timestamps are local time
+
+    Attributes:
+        ts (datetime): the timestamp
+
+    Returns:
+        the integer epoch, exact to the microsecond (int)
+    """
+    return round(ts.timestamp() * 1_000_000) * 1000
+
+
+def from_ns(ns: int) -> datetime:
+    """
+    Naive local timestamp of nanoseconds since the epoch
+
+    Attributes:
+        ns (int): the integer epoch
+
+    Returns:
+        the timestamp, truncated to the microsecond (datetime)
+    """
+    # whole microseconds as a float round trip exactly for epochs within datetime range
+    return datetime.fromtimestamp(ns // 1000 / 1e6)
+
+
+def now() -> datetime:
+    "Current time of the process clock as a naive local timestamp"
+    return from_ns(_clock.now_ns())
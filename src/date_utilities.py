@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 
 from pydantic import PositiveInt
 
+from src.clock import NS_PER_MINUTE, NS_PER_SECOND, from_ns, now_ns, to_ns
+
 def timestamp_n_minutes_ago(
     n: PositiveInt = 15,
     mock_ts: datetime | None = None
@@ -15,11 +17,40 @@ def timestamp_n_minutes_ago(
     
     Attributes:
         n (PositiveInt, default: 15): the number of minutes to substract from timestamp
-        mock_ts (datetime | None): if given sets the init timestamp to the mock otherwise gets the timestamp of present moment
+        mock_ts (datetime | None): if given sets the init timestamp to the mock
+            otherwise gets the timestamp of present moment from the process clock
     
     Returns:
         returns the difference of timestamp and n minutes (datetime)
     """
     if mock_ts is None:
-        return datetime.now() - timedelta(minutes=n)
+        return from_ns(now_ns() - n * NS_PER_MINUTE)
     return mock_ts - timedelta(minutes=n)
+
+
+def time_bucket(ts: datetime, width: PositiveInt = 60) -> int:
+    """
+    Time bucket of a timestamp
+
+    Attributes:
+        ts (datetime): the timestamp to bucket
+        width (PositiveInt, default: 60): the width of a bucket in seconds
+
+    Returns:
+        the index of the bucket the timestamp falls into (int)
+    """
+    return time_bucket_ns(to_ns(ts), width)
+
+
+def time_bucket_ns(timestamp_ns: int, width: PositiveInt = 60) -> int:
+    """
+    Time bucket of a timestamp in nanoseconds since the epoch, e.g. of an ingested trade
+
+    Attributes:
+        timestamp_ns (int): the timestamp to bucket
+        width (PositiveInt, default: 60): the width of a bucket in seconds
+
+    Returns:
+        the index of the bucket the timestamp falls into (int)
+    """
+    return timestamp_ns // (width * NS_PER_SECOND)
@@ -0,0 +1,81 @@
+"""
+Duplicate trade detection with bounded memory
+
+Trade ids are kept in hash sets partitioned by trade timestamp. Only
+the partitions within the redelivery horizon of the latest timestamp are
+kept, older ones are evicted whole, so memory is bounded by the trade
+rate times the horizon whatever the session length. Every check costs
+a lookup per live partition, a constant.
+"""
+
+from collections import deque
+from typing import Deque, Set, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import NS_PER_SECOND
+
+
+class DedupeIndex:
+    """
+    Trade ids seen within a redelivery horizon
+
+    Attributes:
+        horizon_seconds (float, default: 300.): how long after the latest
+            trade timestamp a redelivery is still detected
+        partitions (PositiveInt, default: 8): the number of time partitions
+            covering the horizon
+    """
+
+    def __init__(self, horizon_seconds: float = 300., partitions: PositiveInt = 8):
+        if horizon_seconds <= 0 or partitions <= 0:
+            raise ValueError('Horizon and partitions must be positive')
+        self.horizon_seconds = horizon_seconds
+        self.__width = max(1, round(horizon_seconds * NS_PER_SECOND / partitions))
+        self.__partitions = partitions
+        # oldest first: partition index, ids
+        self.__live: Deque[Tuple[int, Set[str]]] = deque()
+        self.beyond_horizon = 0
+
+    def __len__(self) -> int:
+        return sum(len(ids) for _, ids in self.__live)
+
+    def seen(self, trade_id: str, timestamp: int) -> bool:
+        """
+        Record a trade id and tell if it was already recorded within the horizon
+
+        Attributes:
+            trade_id (str): the trade id
+            timestamp (int): the trade timestamp in nanoseconds since the epoch
+
+        Returns:
+            true if the trade is a duplicate (bool)
+        """
+        partition = timestamp // self.__width
+        live = self.__live
+        if not live or partition > live[-1][0]:
+            live.append((partition, set()))
+            while live[0][0] <= partition - self.__partitions:
+                live.popleft()
+
+        if any(trade_id in ids for _, ids in live):
+            return True
+
+        if partition <= live[-1][0] - self.__partitions:
+            # older than the horizon, redeliveries of it can no longer be detected
+            self.beyond_horizon += 1
+            return False
+        position = len(live)
+        while position and live[position - 1][0] > partition:
+            position -= 1
+        if not position or live[position - 1][0] < partition:
+            # late trade falling in a partition without any id yet
+            live.insert(position, (partition, set()))
+            position += 1
+        live[position - 1][1].add(trade_id)
+        return False
+
+    def clear(self):
+        "Forget all ids"
+        self.__live.clear()
+        self.beyond_horizon = 0
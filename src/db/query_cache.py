@@ -0,0 +1,186 @@
+"""
+Invalidation aware result cache for trade db formulas
+
+Entries are keyed by formula, symbol, window and the time bucket of the
+reference timestamp, and carry the range of reference timestamps for
+which the window holds the same trades. An entry is served only within
+that range, so it expires exactly when the window boundary moves past a
+trade. Timestamps are integer nanoseconds since the epoch. Adding a
+trade invalidates the entries of its symbol and those spanning all
+symbols. The cache is bounded and evicts the least recently used entry.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Set, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import NS_PER_SECOND, NS_PER_MINUTE
+
+ALL_SYMBOLS: str = '*'
+
+
+class WindowBounds:
+    """
+    Timestamps of the trades on either side of a window start,
+    in nanoseconds since the epoch
+
+    Attributes:
+        latest_excluded (int | None): the latest trade before the window, None if none
+        earliest_included (int | None): the earliest trade in the window, None if none
+    """
+
+    def __init__(self, latest_excluded: int | None, earliest_included: int | None):
+        self.latest_excluded = latest_excluded
+        self.earliest_included = earliest_included
+
+    def validity(self, n_minutes: PositiveInt) -> Tuple[int | None, int | None]:
+        """
+        Range of reference timestamps for which the window holds the same trades
+
+        Attributes:
+            n_minutes (PositiveInt): the length of the window
+
+        Returns:
+            exclusive lower and inclusive upper bound in nanoseconds, None if unbounded
+                (Tuple[int | None, int | None])
+        """
+        window = n_minutes * NS_PER_MINUTE
+        return (
+            self.latest_excluded + window if self.latest_excluded is not None else None,
+            self.earliest_included + window if self.earliest_included is not None else None,
+        )
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of formula results, updated on every added trade
+
+    Attributes:
+        maxsize (PositiveInt, default: 4096): the maximum number of entries
+        bucket_width (PositiveInt, default: 60): width of a time bucket in seconds
+    """
+
+    def __init__(self, maxsize: PositiveInt = 4096, bucket_width: PositiveInt = 60):
+        self.maxsize = maxsize
+        self.bucket_width = bucket_width
+        self.hits = 0
+        self.misses = 0
+        self.__entries: OrderedDict[Tuple, Tuple[Any, int | None, int | None]] = OrderedDict()
+        self.__by_symbol: Dict[str, Set[Tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def key(self, formula: str, symbol: str, window: Hashable, reference: int | None) -> Tuple:
+        """
+        Cache key of a query
+
+        Attributes:
+            formula (str): the formula name
+            symbol (str): the stock symbol, ALL_SYMBOLS for formulas over all stocks
+            window (Hashable): the window parameters of the formula
+            reference (int | None): the reference timestamp of the query in nanoseconds,
+                None for formulas independent of time
+
+        Returns:
+            the key (Tuple)
+        """
+        bucket = reference // (self.bucket_width * NS_PER_SECOND) if reference is not None \
+            else None
+        return (formula, symbol, window, bucket)
+
+    def get(self, key: Tuple, reference: int | None = None) -> Tuple[bool, Any]:
+        """
+        Look up a result valid at a reference timestamp
+
+        Attributes:
+            key (Tuple): the query key
+            reference (int | None): the reference timestamp of the query in nanoseconds
+
+        Returns:
+            whether the lookup hit and the cached value (Tuple[bool, Any])
+        """
+        entry = self.__entries.get(key)
+        if entry is not None:
+            value, valid_after, valid_until = entry
+            if reference is None or (
+                (valid_after is None or reference > valid_after)
+                and (valid_until is None or reference <= valid_until)
+            ):
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+        self.misses += 1
+        return False, None
+
+    def put(
+        self,
+        key: Tuple,
+        value: Any,
+        valid_after: int | None = None,
+        valid_until: int | None = None
+    ):
+        """
+        Store a result along with the range of reference timestamps it is valid for
+
+        Attributes:
+            key (Tuple): the query key
+            value (Any): the result
+            valid_after (int | None): exclusive lower bound in nanoseconds, unbounded if None
+            valid_until (int | None): inclusive upper bound in nanoseconds, unbounded if None
+        """
+        self.__entries[key] = (value, valid_after, valid_until)
+        self.__entries.move_to_end(key)
+        self.__by_symbol.setdefault(key[1], set()).add(key)
+        while len(self.__entries) > self.maxsize:
+            evicted, _ = self.__entries.popitem(last=False)
+            self.__discard(evicted)
+
+    def __discard(self, key: Tuple):
+        keys = self.__by_symbol.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.__by_symbol[key[1]]
+
+    def invalidate(self, symbol: str):
+        """
+        Drop the entries of a symbol and those spanning all symbols
+
+        Attributes:
+            symbol (str): the stock symbol
+        """
+        for keys in (self.__by_symbol.pop(symbol, ()), self.__by_symbol.pop(ALL_SYMBOLS, ())):
+            for key in keys:
+                del self.__entries[key]
+
+    def update(self, trade):
+        """
+        Invalidate the entries touched by a trade
+
+        Attributes:
+            trade (Trade): the ingested trade
+        """
+        self.invalidate(trade.symbol)
+
+    def clear(self):
+        "Drop all entries, statistics are kept"
+        self.__entries.clear()
+        self.__by_symbol.clear()
+
+    def info(self) -> Dict[str, float | int]:
+        """
+        Cache statistics
+
+        Returns:
+            hits, misses, hit ratio, current and maximum size (Dict[str, float | int])
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.,
+            'size': len(self.__entries),
+            'maxsize': self.maxsize,
+        }
@@ -0,0 +1,398 @@
+"""
+Columnar trades published in shared memory
+
+The ingest process registers a `SharedTradeStore` as an aggregate of
+the trade db, every added trade is appended to fixed capacity columns of
+a `multiprocessing.shared_memory` segment. Other processes attach a
+`SharedTradeView` by name and answer formulas straight from the shared
+buffers, no trade is copied or pickled.
+
+Layout: a header, a symbol table, the per symbol state, then the
+timestamp, price, quantity, per symbol running sum, link, symbol code and
+indicator columns. Every row holds the running sums of price times
+quantity and of quantity of its symbol up to and including itself, and
+links to the previous row of its symbol plus a skip link (Myers' skew
+binary jump pointers), so a reader finds the first row of a symbol in a
+window in O(log n) and answers the VWSP from two running sums. Symbols
+whose trades arrived out of timestamp order are summed over their own
+rows instead, never over the rows of other symbols.
+
+Rows are only ever appended past the published count and a symbol's
+last row is published after the row, so readers never see a partial
+row; the header fields
+(count, generation, running log price sum, ...) are guarded by a
+seqlock: the writer makes the sequence odd, updates the fields and makes
+it even again, readers retry until they read the same even sequence
+before and after the fields. Clearing the store bumps the generation,
+readers retry queries which saw it change.
+"""
+
+import struct
+from math import exp, log
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Sequence, Set, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import NS_PER_MINUTE, now_ns, to_ns
+
+MAGIC: bytes = b'GBCETRD1'
+# magic, sequence, generation, count, capacity, max symbols, symbols, sorted, log price sum
+HEADER = struct.Struct('<8sQQQQQQQd')
+SYMBOL_WIDTH: int = 16
+INDICATORS: Tuple[str, ...] = ('BUY', 'SELL')
+# per symbol: last row, whether its rows arrived in timestamp order
+SYMBOL_STATE: Tuple[Tuple[str, int], ...] = (('last_rows', 8), ('in_order', 8))
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('timestamps', 'q'), ('prices', 'd'), ('quantities', 'q'), ('notionals', 'd'),
+    ('volumes', 'q'), ('previous', 'q'), ('jumps', 'q'), ('depths', 'q'), ('codes', 'i'),
+    ('indicators', 'b'),
+)
+
+
+def _layout(capacity: int, max_symbols: int) -> Tuple[int, Dict[str, Tuple[int, int]]]:
+    "Total size and the start and end of every column, 8 byte columns first to keep them aligned"
+    offset, offsets = HEADER.size + max_symbols * SYMBOL_WIDTH, {}
+    offset += -offset % 8
+    for column, width in SYMBOL_STATE:
+        offsets[column] = (offset, offset + max_symbols * width)
+        offset += max_symbols * width
+    for column, typecode in COLUMNS:
+        size = capacity * struct.calcsize(typecode)
+        offsets[column] = (offset, offset + size)
+        offset += size
+    return offset, offsets
+
+
+def _columns(buffer: memoryview, offsets: Dict[str, Tuple[int, int]]) -> Dict[str, memoryview]:
+    "Typed views of the per symbol state and of the columns"
+    typecodes = dict(COLUMNS, last_rows='q', in_order='q')
+    return {
+        column: buffer[start:end].cast(typecodes[column])
+        for column, (start, end) in offsets.items()
+    }
+
+
+class SharedTradeStore:
+    """
+    Writer of the shared trade columns, meant to be registered as a trade db aggregate
+
+    Attributes:
+        capacity (PositiveInt, default: 1_000_000): the maximum number of trades
+        max_symbols (PositiveInt, default: 1024): the maximum number of symbols
+        name (str | None): the segment name, generated if not given
+    """
+
+    def __init__(
+        self,
+        capacity: PositiveInt = 1_000_000,
+        max_symbols: PositiveInt = 1024,
+        name: str | None = None
+    ):
+        if capacity <= 0 or max_symbols <= 0:
+            raise ValueError('Capacity and max symbols must be positive')
+        size, offsets = _layout(capacity, max_symbols)
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.__memory = SharedMemory(name, create=True, size=size)
+        self.__buffer = self.__memory.buf
+        self.__columns = _columns(self.__buffer, offsets)
+        self.__symbols: Dict[str, int] = {}
+        self.__reserved: Set[str] = set()
+        self.__last_rows: Dict[int, int] = {}
+        self.__sequence = self.__generation = self.__count = 0
+        self.__sorted = True
+        self.__log_sum = 0.
+        self.__publish()
+
+    @property
+    def name(self) -> str:
+        "The segment name views attach to"
+        return self.__memory.name
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __publish(self):
+        "Write the header fields under the seqlock"
+        self.__sequence += 1
+        struct.pack_into('<Q', self.__buffer, 8, self.__sequence)
+        HEADER.pack_into(
+            self.__buffer, 0, MAGIC, self.__sequence, self.__generation, self.__count,
+            self.capacity, self.max_symbols, len(self.__symbols), self.__sorted, self.__log_sum
+        )
+        self.__sequence += 1
+        struct.pack_into('<Q', self.__buffer, 8, self.__sequence)
+
+    def __code(self, symbol: str) -> int:
+        "Code of a symbol, entered in the symbol table if new"
+        if (code := self.__symbols.get(symbol)) is None:
+            code = len(self.__symbols)
+            if code == self.max_symbols:
+                raise ValueError(f'Shared trade store is full at {self.max_symbols} symbols')
+            start = HEADER.size + code * SYMBOL_WIDTH
+            self.__buffer[start:start + SYMBOL_WIDTH] = (
+                symbol.encode().ljust(SYMBOL_WIDTH, b'\0')[:SYMBOL_WIDTH]
+            )
+            self.__symbols[symbol] = code
+        return code
+
+    def admit(self, symbols: Sequence[str], pending: int = 0):
+        """
+        Check trades fit before the db stores them, the store then never diverges
+        from the db, nothing is entered until a trade is added
+
+        Attributes:
+            symbols (Sequence[str]): the symbol of every trade to add
+            pending (int, default: 0): trades accepted by the db but not added yet,
+                e.g. held in its reorder buffer, see `reserve`
+
+        Raises:
+            ValueError: if the store or its symbol table would be full
+        """
+        if self.__count + pending + len(symbols) > self.capacity:
+            raise ValueError(f'Shared trade store is full at {self.capacity} trades')
+        new = set(symbols).difference(self.__symbols, self.__reserved)
+        if len(self.__symbols) + len(self.__reserved) + len(new) > self.max_symbols:
+            raise ValueError(f'Shared trade store is full at {self.max_symbols} symbols')
+
+    def reserve(self, symbol: str):
+        """
+        Hold a place in the symbol table for a trade accepted but not added yet
+
+        Attributes:
+            symbol (str): the symbol of the pending trade
+        """
+        if symbol not in self.__symbols:
+            self.__reserved.add(symbol)
+
+    def update(self, trade):
+        """
+        Append a trade and publish it, see `admit`
+
+        Attributes:
+            trade (TradeWithTimestamp): the ingested trade
+
+        Raises:
+            ValueError: if the store or its symbol table is full
+        """
+        row = self.__count
+        if row == self.capacity:
+            raise ValueError(f'Shared trade store is full at {self.capacity} trades')
+        code = self.__code(trade.symbol)
+        self.__reserved.discard(trade.symbol)
+
+        columns, timestamp = self.__columns, trade.timestamp_ns
+        notional = trade.price * trade.quantity
+        last_rows, depths, jumps = columns['last_rows'], columns['depths'], columns['jumps']
+        if (last := self.__last_rows.get(code)) is None:
+            columns['notionals'][row], columns['volumes'][row] = notional, trade.quantity
+            columns['previous'][row], jumps[row], depths[row] = -1, row, 0
+            columns['in_order'][code] = 1
+        else:
+            columns['notionals'][row] = columns['notionals'][last] + notional
+            columns['volumes'][row] = columns['volumes'][last] + trade.quantity
+            columns['previous'][row], depths[row] = last, depths[last] + 1
+            jump = jumps[last]
+            jumps[row] = jumps[jump] \
+                if depths[last] - depths[jump] == depths[jump] - depths[jumps[jump]] else last
+            if timestamp < columns['timestamps'][last]:
+                columns['in_order'][code] = 0
+        columns['timestamps'][row] = timestamp
+        columns['prices'][row] = trade.price
+        columns['quantities'][row] = trade.quantity
+        columns['codes'][row] = code
+        columns['indicators'][row] = INDICATORS.index(trade.indicator)
+        # published once the row is complete
+        last_rows[code] = self.__last_rows[code] = row
+        if row and timestamp < columns['timestamps'][row - 1]:
+            self.__sorted = False
+        self.__count += 1
+        self.__log_sum += log(trade.price)
+        self.__publish()
+
+    def clear(self):
+        "Drop all trades, attached views see an empty store"
+        self.__count = 0
+        self.__sorted = True
+        self.__log_sum = 0.
+        self.__symbols.clear()
+        self.__reserved.clear()
+        self.__last_rows.clear()
+        self.__generation += 1
+        self.__publish()
+
+    def close(self, unlink: bool = True):
+        """
+        Release the segment
+
+        Attributes:
+            unlink (bool, default: True): also destroy the segment,
+                views attached elsewhere keep their mapping
+        """
+        for column in self.__columns.values():
+            column.release()
+        self.__memory.close()
+        if unlink:
+            self.__memory.unlink()
+
+
+class SharedTradeView:
+    """
+    Read-only view of a shared trade store, answers formulas like the trade db
+
+    Attributes:
+        name (str): the segment name of the store
+
+    Raises:
+        ValueError: if the segment is not a shared trade store
+    """
+
+    def __init__(self, name: str):
+        try:
+            # not tracked, the creating process owns the segment (Python 3.13+)
+            self.__memory = SharedMemory(name, track=False)  # pylint: disable=E1123
+        except TypeError:
+            # older Pythons track it, harmless for processes sharing the creator's
+            # resource tracker e.g. its pool workers
+            self.__memory = SharedMemory(name)
+        self.__buffer = buf = self.__memory.buf.toreadonly()
+        magic, _, _, _, capacity, max_symbols, _, _, _ = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            buf.release()
+            self.__memory.close()
+            raise ValueError(f'Segment {name} is not a shared trade store')
+        _, offsets = _layout(capacity, max_symbols)
+        self.name = name
+        self.__columns = _columns(buf, offsets)
+        self.__symbols: Dict[str, int] = {}
+        self.__symbols_generation = -1
+
+    def header(self) -> Tuple[int, int, int, bool, float]:
+        """
+        Consistent read of the published header
+
+        Returns:
+            the generation, the number of trades and of symbols, whether
+                timestamps are sorted and the log price sum (Tuple[int, int, int, bool, float])
+        """
+        while True:
+            _, before, generation, count, _, _, symbols, is_sorted, log_sum = (
+                HEADER.unpack_from(self.__buffer)
+            )
+            if not before & 1 and struct.unpack_from('<Q', self.__buffer, 8)[0] == before:
+                return generation, count, symbols, bool(is_sorted), log_sum
+
+    def __len__(self) -> int:
+        return self.header()[1]
+
+    def symbols(self) -> List[str]:
+        "Symbols with at least one trade, in order of first trade"
+        generation, _, n_symbols, _, _ = self.header()
+        if generation != self.__symbols_generation or n_symbols != len(self.__symbols):
+            self.__symbols = {
+                bytes(self.__buffer[start:start + SYMBOL_WIDTH]).rstrip(b'\0').decode(): code
+                for code, start in (
+                    (code, HEADER.size + code * SYMBOL_WIDTH) for code in range(n_symbols)
+                )
+            }
+            self.__symbols_generation = generation
+        return list(self.__symbols)
+
+    def gbce_all_share_index(self) -> float:
+        """
+        Geometric mean of all trade prices, read in O(1) from the published log price sum
+
+        Raises:
+            ValueError: if there are no trades
+        """
+        _, count, _, _, log_sum = self.header()
+        if not count:
+            raise ValueError('No trades in shared trade store')
+        return exp(log_sum / count)
+
+    def volume_weighted_stock_price(
+        self,
+        symbol: str,
+        mock_ts=None,
+        n_minutes: PositiveInt = 15,
+        reference: int | None = None
+    ) -> float:
+        """
+        Volume weighted stock price in the past n minutes, same contract as the trade db
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            mock_ts (datetime | None): the reference timestamp
+            n_minutes (PositiveInt, default: 15): the length of the window of trades
+            reference (int | None): the reference in nanoseconds since the epoch,
+                takes precedence over mock_ts, the process clock if neither is given
+
+        Raises:
+            ValueError: if the stock has no associated trade in the window
+                or if total quantity of shares is zero
+
+        Returns:
+            VWSP formula result (PositiveFloat)
+        """
+        if reference is None:
+            reference = to_ns(mock_ts) if mock_ts is not None else now_ns()
+        start = reference - n_minutes * NS_PER_MINUTE
+        while True:
+            generation = self.header()[0]
+            self.symbols()
+            code = self.__symbols.get(symbol)
+            notional, quantity, trades = 0., 0, 0
+            if code is not None:
+                notional, quantity, trades = self.__window_sums(code, start)
+            if self.header()[0] == generation:
+                break
+        if not trades:
+            raise ValueError(
+                f'Stock symbol {symbol} has no associated trade in last {n_minutes} minutes'
+            )
+        if not quantity:
+            raise ValueError('Total quantity of shares for stock is zero')
+        return notional / quantity
+
+    def __window_sums(self, code: int, start: int) -> Tuple[float, int, int]:
+        "Notional, quantity and number of the trades of a symbol from a timestamp on"
+        columns = self.__columns
+        last = columns['last_rows'][code]
+        timestamps, previous = columns['timestamps'], columns['previous']
+        if not columns['in_order'][code]:
+            # rows out of timestamp order, the rows of the symbol are summed
+            notional, quantity, trades, row = 0., 0, 0, last
+            prices, quantities = columns['prices'], columns['quantities']
+            while row >= 0:
+                if timestamps[row] >= start:
+                    notional += prices[row] * quantities[row]
+                    quantity += quantities[row]
+                    trades += 1
+                row = previous[row]
+            return notional, quantity, trades
+
+        # the last row of the symbol before the window, found by skipping back
+        jumps, depths, row, before = columns['jumps'], columns['depths'], last, -1
+        if timestamps[row] < start:
+            return 0., 0, 0
+        while previous[row] >= 0:
+            if timestamps[previous[row]] < start:
+                before = previous[row]
+                break
+            jump = jumps[row]
+            row = jump if jump != row and timestamps[jump] >= start else previous[row]
+        notionals, volumes = columns['notionals'], columns['volumes']
+        if before < 0:
+            return notionals[last], volumes[last], depths[last] + 1
+        return (
+            notionals[last] - notionals[before], volumes[last] - volumes[before],
+            depths[last] - depths[before]
+        )
+
+    def close(self):
+        "Detach from the segment"
+        for column in self.__columns.values():
+            column.release()
+        self.__buffer.release()
+        self.__memory.close()
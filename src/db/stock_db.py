@@ -1,9 +1,16 @@
 """
 Implements an in-memory singleton Stock DB
+
+The singleton is created lazily on first use from the csv file at
+`GBCE_STOCKS_CSV` if set, otherwise from the gbce.csv of the project root.
+Within an active exchange context, see `src.exchange`, `StockDB()`
+resolves to the stock registry of that exchange instead.
 """
 
 import gc
 from collections.abc import Mapping
+from contextvars import ContextVar
+from os import environ
 from random import choices
 
 from pathlib import Path
@@ -11,15 +18,15 @@ from typing import Dict, Iterable, Iterator, List, Union
 
 from src.models.stock import Stock
 
+DEFAULT_STOCKS_CSV: Path = Path(__file__).resolve().parents[2] / 'gbce.csv'
+
 class _StockDB(Mapping):
     """
     Map of Stock collections
     """
-    __data: Dict[str, Stock] = {}
 
     def __init__(self, stocks: Iterable[Stock] | None = None):
-        if stocks is not None:
-            self.__data = {stock.symbol: stock for stock in stocks}
+        self.__data: Dict[str, Stock] = {stock.symbol: stock for stock in stocks or ()}
 
     def __delitem__(self, symbol: str):
         if symbol in self.__data:
@@ -75,17 +82,42 @@ class _StockDB(Mapping):
         return cls(Stock.from_csv(path)) if path is not None else cls()
 
 
+# stock registry of the active exchange context, the singleton is used if None
+active_stock_db: ContextVar[_StockDB | None] = ContextVar('active_stock_db', default=None)
+
+
 class StockDB:
     """
-    Singleton wrapper
+    Singleton wrapper, resolves to the registry of the active exchange if any
     """
     __instance: _StockDB | None = None
+    __path: Union[Path, str] | None = environ.get('GBCE_STOCKS_CSV', DEFAULT_STOCKS_CSV)
 
     def __new__(cls):
+        if (active := active_stock_db.get()) is not None:
+            return active
         if cls.__instance is None:
-            cls.__instance = _StockDB()
+            cls.__instance = _StockDB.create(cls.__path)
         return cls.__instance
 
+    @classmethod
+    def configure(cls, path: Union[Path, str] | None):
+        """
+        Set the file the singleton is lazily created from on first use
+
+        Attributes:
+            cls: the class type
+            path (Path | str | None): path to the csv file, an empty DB is created if None
+
+        Raises:
+            AssertionError: if the singleton is already initialized
+        """
+        if cls.__instance is not None:
+            raise AssertionError(
+                f"Class {cls.__name__} is already initialized"
+            )
+        cls.__path = path
+
     @classmethod
     def is_initialized(cls) -> bool:
         """
@@ -99,7 +131,7 @@ class StockDB:
     @classmethod
     def list(cls) -> List[Stock]:
         "Get list of stocks in db"
-        return cls.__instance.list()
+        return cls().list()
 
     @classmethod
     def symbols(cls) -> List[str | None]:
@@ -108,8 +140,8 @@ class StockDB:
         
         Returns:
             the list of symbols in stock db (List[str | None])
-        """        "Get symbols list"
-        return cls.__instance.symbols()
+        """
+        return cls().symbols()
 
     @classmethod
     def reset(cls):
@@ -0,0 +1,313 @@
+"""
+Threshold subscriptions over trade db aggregates
+
+Conditions are evaluated on trade ingestion against rolling aggregates,
+only for the subscriptions a trade touches: VWSP conditions are indexed by
+symbol, index conditions are touched by every trade.
+Notifications are edge triggered, a VWSP condition notifies when it turns
+true, an index condition notifies when the index moved past the threshold
+since subscribing or since its previous notification.
+
+Delivery errors, a raising callback or a full queue, are counted per
+subscription and never reach trade ingestion.
+"""
+
+from enum import Enum
+from itertools import count
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable
+
+from pydantic import BaseModel, PositiveFloat, PositiveInt
+
+from src.aggregates.rolling import LogPriceIndex, RollingVwsp
+from src.fixed_point import TickSizes
+from src.metrics import METRICS
+
+if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop, Queue
+
+
+class Direction(str, Enum):
+    """
+    Enum representing the direction of a threshold crossing
+    """
+    ABOVE = "ABOVE"
+    BELOW = "BELOW"
+
+
+class VwspThreshold(BaseModel):
+    """
+    Condition on the volume weighted stock price of a stock e.g. VWSP(TEA, 15m) > X
+    """
+    symbol: str
+    level: PositiveFloat
+    direction: Direction = Direction.ABOVE
+    n_minutes: PositiveInt = 15
+
+    # pylint: disable=R0903
+    class Config:
+        "Condition configuration"
+        frozen: bool = True
+
+    def holds(self, value: float | None) -> bool:
+        "Check the condition against a VWSP value"
+        if value is None:
+            return False
+        if self.direction == Direction.ABOVE:
+            return value > self.level
+        return value < self.level
+
+
+class IndexMove(BaseModel):
+    """
+    Condition on the GBCE all share index moving by more than a percentage
+    """
+    percent: PositiveFloat
+
+    # pylint: disable=R0903
+    class Config:
+        "Condition configuration"
+        frozen: bool = True
+
+    def holds(self, value: float | None, reference: float | None) -> bool:
+        "Check the condition against an index value and its reference"
+        if value is None or reference is None:
+            return False
+        return abs(value / reference - 1) * 100 > self.percent
+
+
+class Notification(BaseModel):
+    """
+    Pushed to subscribers when a condition is met
+    """
+    subscription_id: int
+    condition: VwspThreshold | IndexMove
+    value: float
+    trade: Any
+
+
+class _Subscription:
+    """
+    Registered condition along with its delivery target and last evaluation
+    """
+    # pylint: disable=R0903
+
+    def __init__(
+        self,
+        subscription_id: int,
+        condition: VwspThreshold | IndexMove,
+        callback: Callable[[Notification], None] | None,
+        queue: "Queue | None",
+        loop: "AbstractEventLoop | None"
+    ):
+        self.subscription_id = subscription_id
+        self.condition = condition
+        self.callback = callback
+        self.queue = queue
+        self.loop = loop
+        self.state: bool | float | None = None
+        self.errors = 0
+
+    def __failed(self):
+        self.errors += 1
+        METRICS.count('subscriptions.errors')
+
+    def __put(self, notification: Notification):
+        "Enqueue a notification, a full queue drops it"
+        try:
+            self.queue.put_nowait(notification)
+        except Exception:  # pylint: disable=W0718
+            self.__failed()
+
+    def notify(self, value: float, trade):
+        "Deliver a notification to the callback or queue, counting failed deliveries"
+        notification = Notification(
+            subscription_id=self.subscription_id,
+            condition=self.condition,
+            value=value,
+            trade=trade
+        )
+        if self.callback is not None:
+            try:
+                self.callback(notification)
+            except Exception:  # pylint: disable=W0718
+                # the trade is already stored, the other aggregates must still see it
+                self.__failed()
+        if self.queue is not None:
+            if self.loop is not None:
+                try:
+                    self.loop.call_soon_threadsafe(self.__put, notification)
+                except RuntimeError:
+                    # the loop is closed
+                    self.__failed()
+            else:
+                self.__put(notification)
+
+
+class Subscriptions:
+    """
+    Registry of subscriptions, updated on every added trade
+
+    Attributes:
+        index (LogPriceIndex): the maintained GBCE all share index,
+            expected to be updated before the subscriptions
+    """
+
+    def __init__(self, index: LogPriceIndex):
+        self.__index = index
+        self.__ids = count(1)
+        self.__by_symbol: Dict[str, Dict[int, _Subscription]] = {}
+        self.__on_index: Dict[int, _Subscription] = {}
+        self.__vwsp: Dict[str, Dict[int, RollingVwsp]] = {}
+        self.tick_sizes: TickSizes | None = None
+
+    def __len__(self) -> int:
+        return sum(map(len, self.__by_symbol.values())) + len(self.__on_index)
+
+    def subscribe(
+        self,
+        condition: VwspThreshold | IndexMove,
+        callback: Callable[[Notification], None] | None = None,
+        queue: "Queue | None" = None,
+        loop: "AbstractEventLoop | None" = None,
+        history: Iterable = ()
+    ) -> int:
+        """
+        Register a condition
+
+        Attributes:
+            condition (VwspThreshold | IndexMove): the condition to evaluate
+            callback (Callable[[Notification], None] | None): called on notification
+            queue (asyncio.Queue | None): receives notifications
+            loop (asyncio.AbstractEventLoop | None): the loop of the queue, required
+                when trades are added from another thread than the loop's
+            history (Iterable[TradeWithTimestamp]): trades already recorded,
+                used to seed the rolling window of a new VWSP condition
+
+        Raises:
+            ValueError: if neither callback nor queue is given
+
+        Returns:
+            the subscription id (int)
+        """
+        if callback is None and queue is None:
+            raise ValueError('Subscription requires a callback or a queue')
+
+        subscription = _Subscription(next(self.__ids), condition, callback, queue, loop)
+        if isinstance(condition, IndexMove):
+            subscription.state = self.__index.value
+            self.__on_index[subscription.subscription_id] = subscription
+        else:
+            windows = self.__vwsp.setdefault(condition.symbol, {})
+            if condition.n_minutes not in windows:
+                windows[condition.n_minutes] = self.__window(
+                    condition.symbol, condition.n_minutes, history
+                )
+            subscription.state = condition.holds(windows[condition.n_minutes].value)
+            self.__by_symbol.setdefault(condition.symbol, {})[
+                subscription.subscription_id
+            ] = subscription
+        return subscription.subscription_id
+
+    def __window(self, symbol: str, n_minutes: int, history: Iterable) -> RollingVwsp:
+        "A rolling window seeded with recorded trades"
+        window = RollingVwsp(
+            symbol, n_minutes, self.tick_sizes[symbol] if self.tick_sizes is not None else None
+        )
+        for trade in history:
+            window.update(trade)
+        return window
+
+    def configure_tick_sizes(self, tick_sizes: TickSizes | None, history: Iterable = ()):
+        """
+        Switch rolling windows to fixed-point sums, or back to floats
+
+        Attributes:
+            tick_sizes (TickSizes | None): the tick sizes, None for float sums
+            history (Iterable[TradeWithTimestamp]): trades already recorded,
+                used to rebuild the existing windows
+        """
+        self.tick_sizes = tick_sizes
+        history = list(history) if self.__vwsp else ()
+        for symbol, windows in self.__vwsp.items():
+            for n_minutes in windows:
+                windows[n_minutes] = self.__window(symbol, n_minutes, history)
+
+    def unsubscribe(self, subscription_id: int):
+        """
+        Remove a subscription
+
+        Attributes:
+            subscription_id (int): the id returned on subscribing
+
+        Raises:
+            KeyError: if no such subscription exists
+        """
+        if subscription_id in self.__on_index:
+            del self.__on_index[subscription_id]
+            return
+        for symbol, subscriptions in self.__by_symbol.items():
+            if subscription_id in subscriptions:
+                condition = subscriptions.pop(subscription_id).condition
+                if not any(
+                    other.condition.n_minutes == condition.n_minutes
+                    for other in subscriptions.values()
+                ):
+                    del self.__vwsp[symbol][condition.n_minutes]
+                return
+        raise KeyError(f'No such subscription {subscription_id}')
+
+    def errors(self, subscription_id: int) -> int:
+        """
+        Failed deliveries of a subscription
+
+        Attributes:
+            subscription_id (int): the id returned on subscribing
+
+        Raises:
+            KeyError: if no such subscription exists
+
+        Returns:
+            the number of raising callbacks and notifications dropped by a full queue (int)
+        """
+        for subscriptions in (self.__on_index, *self.__by_symbol.values()):
+            if subscription_id in subscriptions:
+                return subscriptions[subscription_id].errors
+        raise KeyError(f'No such subscription {subscription_id}')
+
+    def update(self, trade):
+        """
+        Evaluate the subscriptions touched by a trade
+
+        Attributes:
+            trade (TradeWithTimestamp): the ingested trade
+        """
+        subscriptions = self.__by_symbol.get(trade.symbol)
+        if subscriptions:
+            windows = self.__vwsp[trade.symbol]
+            for vwsp in windows.values():
+                vwsp.update(trade)
+            for subscription in subscriptions.values():
+                value = windows[subscription.condition.n_minutes].value
+                condition = subscription.condition
+                holds = condition.holds(value)
+                if holds and not subscription.state:
+                    subscription.notify(value, trade)
+                subscription.state = holds
+
+        if self.__on_index:
+            value = self.__index.value
+            for subscription in self.__on_index.values():
+                if subscription.state is None:
+                    subscription.state = value
+                elif subscription.condition.holds(value, subscription.state):
+                    subscription.notify(value, trade)
+                    subscription.state = value
+
+    def clear(self):
+        "Reset rolling windows and evaluation states, subscriptions are kept"
+        for windows in self.__vwsp.values():
+            for vwsp in windows.values():
+                vwsp.clear()
+        for subscriptions in (*self.__by_symbol.values(), self.__on_index):
+            for subscription in subscriptions.values():
+                subscription.state = None
@@ -0,0 +1,127 @@
+"""
+Time ordered index over the trade db storage
+
+Keeps the storage sequence numbers of trades sorted by trade timestamp,
+timestamps are integer nanoseconds since the epoch so lookups compare
+integers. Trades arriving in timestamp order are appended in O(1), out
+of order trades are inserted in place and bump the version of the index,
+positions taken at an earlier version may have shifted.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Tuple
+
+
+class TimeIndex:
+    """
+    Sequence numbers of trades sorted by timestamp, ties kept in insertion order
+
+    Attributes:
+        version (int): bumped whenever entries move, by out of order inserts and clears
+    """
+
+    def __init__(self):
+        self.__timestamps: List[int] = []
+        self.__sequences: List[int] = []
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.__sequences)
+
+    def __getitem__(self, position: int) -> Tuple[int, int]:
+        return self.__timestamps[position], self.__sequences[position]
+
+    def insert(self, timestamp: int, sequence: int) -> bool:
+        """
+        Index a trade
+
+        Attributes:
+            timestamp (int): the trade timestamp in nanoseconds since the epoch
+            sequence (int): the position of the trade in storage
+
+        Returns:
+            true if the trade was appended in order (bool)
+        """
+        if not self.__timestamps or timestamp >= self.__timestamps[-1]:
+            self.__timestamps.append(timestamp)
+            self.__sequences.append(sequence)
+            return True
+        position = bisect_right(self.__timestamps, timestamp)
+        self.__timestamps.insert(position, timestamp)
+        self.__sequences.insert(position, sequence)
+        self.version += 1
+        return False
+
+    def clear(self):
+        "Drop all entries"
+        self.__timestamps.clear()
+        self.__sequences.clear()
+        self.version += 1
+
+    def bounds(self, since: int | None = None, until: int | None = None) -> range:
+        """
+        Positions of the entries within a time range
+
+        Attributes:
+            since (int | None): inclusive lower bound in nanoseconds, unbounded if not given
+            until (int | None): inclusive upper bound in nanoseconds, unbounded if not given
+
+        Returns:
+            the range of positions in the index (range)
+        """
+        start = bisect_left(self.__timestamps, since) if since is not None else 0
+        stop = bisect_right(self.__timestamps, until) if until is not None \
+            else len(self.__timestamps)
+        return range(start, max(start, stop))
+
+    def any_between(self, first: Tuple[int, int], last: Tuple[int, int], limit: int) -> bool:
+        """
+        Whether an entry sorts between two entries, both included, entries
+        sort by timestamp then sequence as sequences grow with insertion
+
+        Attributes:
+            first (Tuple[int, int]): the lowest timestamp and sequence
+            last (Tuple[int, int]): the highest timestamp and sequence
+            limit (int): only sequences below it count, e.g. the trades stored when a view was taken
+
+        Returns:
+            true if there is such an entry (bool)
+        """
+        timestamps, sequences = self.__timestamps, self.__sequences
+        return any(
+            first <= (timestamps[position], sequences[position]) <= last
+            and sequences[position] < limit
+            for position in range(
+                bisect_left(timestamps, first[0]), bisect_right(timestamps, last[0])
+            )
+        )
+
+    def sequences(
+        self,
+        since: int | None = None,
+        until: int | None = None
+    ) -> Iterator[int]:
+        """
+        Sequence numbers of the trades within a time range, in timestamp order
+
+        Attributes:
+            since (int | None): inclusive lower bound in nanoseconds, unbounded if not given
+            until (int | None): inclusive upper bound in nanoseconds, unbounded if not given
+
+        Returns:
+            an iterator over storage positions (Iterator[int])
+        """
+        return self.sequences_at(self.bounds(since, until))
+
+    def sequences_at(self, positions: range) -> Iterator[int]:
+        """
+        Sequence numbers of the trades at a range of positions, e.g. from `bounds`,
+        read by position so the cost does not depend on where the range starts
+
+        Attributes:
+            positions (range): positions in the index
+
+        Returns:
+            an iterator over storage positions (Iterator[int])
+        """
+        return map(self.__sequences.__getitem__, positions)
@@ -3,51 +3,757 @@ Implements an in-memory singleton Trade DB
 """
 
 import gc
+from array import array
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from heapq import heappop, heappush
+from itertools import chain, count, islice, repeat
 from pathlib import Path
-from typing import Iterable, Iterator, List, Sequence, Union
+from typing import (
+    IO, TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple, Union
+)
 
-from src.models.trade import Trade, TradeWithTimestamp
-from src.formulas.formulas import TradeDBVectorFormulasMixin
+from pydantic import PositiveFloat, PositiveInt
 
-class _TradeDB(Sequence, TradeDBVectorFormulasMixin):
+from src.aggregates.basket_index import Basket, BasketIndices
+from src.aggregates.correlation import ReturnCorrelation
+from src.aggregates.ewma import EwmaTracker
+from src.aggregates.quantile_sketch import PriceQuantileSketches
+from src.aggregates.rolling import LogPriceIndex
+from src.aggregates.top_k import ApproximateWindowedTopK, ExactWindowedTopK
+from src.clock import NS_PER_MINUTE, now_ns, to_ns
+from src.db.dedupe import DedupeIndex
+from src.db.query_cache import QueryCache, WindowBounds
+from src.db.shared_trades import SharedTradeStore
+from src.db.stock_db import StockDB
+from src.db.subscriptions import IndexMove, Notification, Subscriptions, VwspThreshold
+from src.db.time_index import TimeIndex
+from src.db.trade_query import TradeFilter, TradeQueryResult, plan_query
+from src.db.trade_view import TradeView, write_trades
+from src.fixed_point import TickSizes
+from src.metrics import METRICS
+from src.models.trade import Trade, TradeWithTimestamp, TransactionIndicator
+from src.models.trade_batch import TradeBatch
+from src.formulas.formulas import (
+    TradeDBCorrelationFormulasMixin,
+    TradeDBEwmaFormulasMixin,
+    TradeDBQuantileFormulasMixin,
+    TradeDBTopKFormulasMixin,
+    TradeDBVectorFormulasMixin,
+)
+
+if TYPE_CHECKING:
+    from asyncio import AbstractEventLoop, Queue
+
+class TradeDBSnapshot(Sequence, TradeDBVectorFormulasMixin):
+    """
+    Immutable view of the trades recorded up to a sequence number
+
+    Trades are only ever appended to the db storage, a snapshot shares
+    the storage and bounds it to its length without copying.
+    Scan based formulas run against the snapshot while ingestion continues.
+
+    Attributes:
+        trades (List[TradeWithTimestamp]): the append-only storage of the db
+        sequence (int): the number of trades visible in the snapshot
+    """
+
+    def __init__(self, trades: List[TradeWithTimestamp], sequence: int):
+        self.__trades = trades
+        self.sequence = sequence
+
+    def __contains__(self, value: str) -> bool:
+        return any(filter(lambda trade: trade.symbol == value, self))
+
+    def __getitem__(self, idx: int | slice) -> "TradeWithTimestamp | List[TradeWithTimestamp]":
+        if isinstance(idx, slice):
+            # resolve the slice against the snapshot bounds, not the growing storage
+            return list(map(self.__trades.__getitem__, range(self.sequence)[idx]))
+        if not -self.sequence <= idx < self.sequence:
+            raise IndexError('Snapshot index out of range')
+        return self.__trades[idx % self.sequence]
+
+    def __iter__(self) -> Iterator:
+        return islice(self.__trades, self.sequence)
+
+    def __len__(self) -> int:
+        return self.sequence
+
+    def __repr__(self):
+        return f'TradeDBSnapshot(sequence={self.sequence})'
+
+    def write(self, stream: IO[str], limit: int | None = None) -> int:
+        "Stream the trades of the snapshot one per line, see `write_trades`"
+        return write_trades(self, stream, limit)
+
+
+class _TradeDB(
+    Sequence,
+    TradeDBVectorFormulasMixin,
+    TradeDBEwmaFormulasMixin,
+    TradeDBQuantileFormulasMixin,
+    TradeDBTopKFormulasMixin,
+    TradeDBCorrelationFormulasMixin,
+):
     """
     Sequence of stock trades
+
+    Aggregates registered in the db are updated on every added trade.
+    Trades are stored in arrival order and indexed by timestamp, globally
+    and per symbol. A trade older than the latest trade of its symbol is
+    inserted in place in the time indexes and the order sensitive
+    aggregates of its symbol are recomputed in timestamp order, the same
+    order batch rebuilds fold trades in.
+
+    In event time mode trades are held in a reorder buffer until the
+    watermark, the latest trade timestamp minus the allowed lateness,
+    passes them, then they are added in timestamp order. Trades older
+    than the last added timestamp are late and counted in `late_trades`.
+
+    With deduplication enabled, trades carrying an id already added within
+    the redelivery horizon are dropped, see `configure_dedupe`.
     """
-    __trades: List[TradeWithTimestamp] = []
 
     def __init__(self, trades: Iterable[Trade] | None = None):
+        self.__trades: List[TradeWithTimestamp] = []
+        self.time_index = TimeIndex()
+        self.symbol_time_indexes: Dict[str, TimeIndex] = {}
+        self.lateness: timedelta | None = None
+        self.late_trades = 0
+        self.dedupe: DedupeIndex | None = None
+        self.shared: SharedTradeStore | None = None
+        self.duplicates = 0
+        self.__arrivals = count()
+        self.__lateness_ns = 0
+        self.__reorder_buffer: List[Tuple[int, int, TradeWithTimestamp]] = []
+        self.__latest_ts: int | None = None
+        self.__flushed_ts: int | None = None
+        self.fixed_point: TickSizes | None = None
+        self.__ticks = array('q')
+        self.price_sketches = PriceQuantileSketches()
+        self.ewma = EwmaTracker()
+        self.top_k_trackers: Dict[int, ExactWindowedTopK | ApproximateWindowedTopK] = {}
+        self.correlation: ReturnCorrelation | None = None
+        self.share_index = LogPriceIndex()
+        self.basket_indices = BasketIndices()
+        self.subscriptions = Subscriptions(self.share_index)
+        self.query_cache = QueryCache()
+        self.__aggregates = [
+            self.query_cache, self.price_sketches, self.ewma, self.share_index,
+            self.basket_indices, self.subscriptions
+        ]
         if trades is not None:
-            self.__trades = trades
+            for trade in trades:
+                self.add(trade)
 
     def __contains__(self, value: str) -> bool:
-        return any(filter(lambda trade: trade.symbol == value, self.__trades))
+        return value in self.symbol_time_indexes
 
     def __getitem__(self, idx: int) -> Trade:
         return self.__trades[idx]
 
+    def _trades_by_time(self) -> Iterator:
+        "Recorded trades in timestamp order, read from the global time index"
+        return map(self.__trades.__getitem__, self.time_index.sequences())
+
+    def _trades_of(self, symbol: str) -> Iterator:
+        """
+        Recorded trades of a given stock in timestamp order, read from its time index
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+
+        Returns:
+            an iterator over the trades of the stock (Iterator)
+        """
+        trades, index = self.__trades, self.symbol_time_indexes.get(symbol)
+        return (trades[sequence] for sequence in index.sequences()) if index is not None \
+            else iter(())
+
+    @METRICS.timed('formulas.gbce_all_share_index')
+    def gbce_all_share_index(self) -> PositiveFloat:
+        """
+        Geometric mean of recorded trade prices for all stocks, read in O(1)
+        from the running log price sum maintained on trade ingestion
+
+        Raises:
+            ValueError: if no trade is recorded
+
+        Returns:
+            the geometric mean of all trade prices in GBCE (PostiveFloat)
+        """
+        if (value := self.share_index.value) is None:
+            raise ValueError('No trade recorded')
+        return value
+
+    @METRICS.timed('formulas.volume_weighted_stock_price')
+    def volume_weighted_stock_price(
+        self,
+        symbol: str,
+        mock_ts: datetime | None = None,
+        n_minutes: PositiveInt = 15
+    ) -> PositiveFloat:
+        """
+        Volume weighted stock price in the past n minutes, served from the query
+        cache until a trade of the stock is added or the window moves past a trade
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            mock_ts (datetime | None): A mock timestamp to aid with testing
+                without the need of an external mocking framework
+            n_minutes (PositiveInt, default: 15): the length of the window of trades
+
+        Raises:
+            ValueError: if the stock has no associated trade in the window
+                or if total quantity of shares is zero
+
+        Returns:
+            VWSP formula result (PostiveFloat)
+        """
+        reference = to_ns(mock_ts) if mock_ts is not None else now_ns()
+        key = self.query_cache.key('volume_weighted_stock_price', symbol, n_minutes, reference)
+        hit, value = self.query_cache.get(key, reference)
+        if not hit:
+            # the window is looked up in the time index of the stock by integer timestamps
+            start = reference - n_minutes * NS_PER_MINUTE
+            index, trades = self.symbol_time_indexes.get(symbol, TimeIndex()), self.__trades
+            first = index.bounds(since=start).start
+            bounds = WindowBounds(
+                index[first - 1][0] if first else None,
+                index[first][0] if first < len(index) else None
+            )
+            if self.fixed_point is None:
+                value = self._volume_weighted_price(
+                    (trades[sequence] for sequence in index.sequences(since=start)),
+                    symbol, n_minutes
+                )
+            else:
+                value = self.__fixed_point_vwsp(index.sequences(since=start), symbol, n_minutes)
+            self.query_cache.put(key, value, *bounds.validity(n_minutes))
+        return value
+
+    def __fixed_point_vwsp(self, sequences: Iterable[int], symbol: str, n_minutes: int) -> float:
+        "Volume weighted price from exact integer sums of ticks times quantity and of quantities"
+        trades, ticks, notional, quantity = self.__trades, self.__ticks, 0, 0
+        for sequence in sequences:
+            trade_quantity = trades[sequence].quantity
+            notional += ticks[sequence] * trade_quantity
+            quantity += trade_quantity
+        if not quantity:
+            raise ValueError(
+                f'Stock symbol {symbol} has no associated trade in last {n_minutes} minutes'
+            )
+        return self.fixed_point.vwsp(symbol, notional, quantity)
+
+    def configure_fixed_point(self, enabled: bool = True, tick_sizes: TickSizes | None = None):
+        """
+        Enable or disable fixed-point price arithmetic
+
+        Prices are held as integer ticks alongside the trades and VWSP
+        sums are accumulated as exact integers, see `src.fixed_point`.
+
+        Attributes:
+            enabled (bool, default: True): whether to use fixed-point arithmetic
+            tick_sizes (TickSizes | None): the tick size per stock,
+                loaded from the tick sizes csv if not given
+
+        Raises:
+            ValueError: if a recorded price is not a multiple of its tick size,
+                the mode is left unchanged
+        """
+        if enabled:
+            tick_sizes = tick_sizes if tick_sizes is not None else TickSizes.from_csv()
+            self.__ticks = array(
+                'q', (tick_sizes.to_ticks(trade.symbol, trade.price) for trade in self.__trades)
+            )
+            self.fixed_point = tick_sizes
+        else:
+            self.__ticks = array('q')
+            self.fixed_point = None
+        self.subscriptions.configure_tick_sizes(self.fixed_point, self.__trades)
+        self.query_cache.clear()
+
+    @METRICS.timed('trade_db.add')
     def add(self, trade: Trade | TradeWithTimestamp):
-        "Add trade to db"
+        "Add trade to db, buffered up to the watermark in event time mode"
         # pylint: disable=C0123
         if type(trade) == Trade:
-            self.__trades.append(TradeWithTimestamp.from_trade(trade))
+            trade = TradeWithTimestamp.from_trade(trade)
+
+        timestamp = trade.timestamp_ns
+        # checked before the id is marked as seen, a rejected trade may be redelivered fixed
+        ticks = self.fixed_point.to_ticks(trade.symbol, trade.price) \
+            if self.fixed_point is not None else None
+        if self.shared is not None:
+            # only checks the trade fits, its symbol is entered once the trade is stored
+            self.shared.admit((trade.symbol,), len(self.__reorder_buffer))
+        if self.__duplicate(trade, timestamp):
+            return
+        if self.lateness is None:
+            self.__ingest(trade, timestamp, ticks)
+        elif self.__flushed_ts is not None and timestamp < self.__flushed_ts:
+            self.__correct(trade, timestamp)
         else:
-            self.__trades.append(trade)
+            if self.shared is not None:
+                self.shared.reserve(trade.symbol)
+            heappush(self.__reorder_buffer, (timestamp, next(self.__arrivals), trade))
+            if self.__latest_ts is None or timestamp > self.__latest_ts:
+                self.__latest_ts = timestamp
+            self.__flush(self.__latest_ts - self.__lateness_ns)
+
+    @METRICS.timed('trade_db.add_batch')
+    def add_batch(self, batch: TradeBatch, validate: bool = True):
+        """
+        Bulk add a columnar batch of trades, validated column by column
+        instead of per trade model
+
+        Attributes:
+            batch (TradeBatch): the trades to add
+            validate (bool, default: True): check the batch before adding it,
+                skip only for batches known to be valid e.g. generated ones
+
+        Raises:
+            ValueError: if the batch is invalid or, in fixed-point mode, a price
+                is off the tick grid, or it does not fit the shared memory store,
+                no trade of it is added
+        """
+        if validate:
+            batch.validate()
+        if self.shared is not None:
+            self.shared.admit(batch.symbols, len(self.__reorder_buffer))
+        # all prices are checked against the tick grid before any trade is added
+        ticks = repeat(None) if self.fixed_point is None else [
+            self.fixed_point.to_ticks(symbol, price)
+            for symbol, price in zip(batch.symbols, batch.prices)
+        ]
+        if self.lateness is not None:
+            for trade in batch.trades():
+                self.add(trade)
+        elif self.dedupe is not None:
+            for trade, timestamp, trade_ticks in zip(batch.trades(), batch.timestamps, ticks):
+                if not self.__duplicate(trade, timestamp):
+                    self.__ingest(trade, timestamp, trade_ticks)
+        else:
+            for trade, timestamp, trade_ticks in zip(batch.trades(), batch.timestamps, ticks):
+                self.__ingest(trade, timestamp, trade_ticks)
+        METRICS.count('trade_db.batch_trades', len(batch))
+
+    def __duplicate(self, trade: TradeWithTimestamp, timestamp: int) -> bool:
+        "Whether a trade id was already added within the redelivery horizon, counted if so"
+        if self.dedupe is None or trade.trade_id is None:
+            return False
+        if self.dedupe.seen(trade.trade_id, timestamp):
+            self.duplicates += 1
+            METRICS.count('trade_db.duplicates')
+            return True
+        return False
+
+    def __ingest(self, trade: TradeWithTimestamp, timestamp: int, ticks: int | None = None):
+        "Store, index by its timestamp in nanoseconds and aggregate a trade"
+        if self.fixed_point is not None:
+            # raises before anything is stored if the price is off the tick grid
+            self.__ticks.append(
+                ticks if ticks is not None else self.fixed_point.to_ticks(trade.symbol, trade.price)
+            )
+        sequence = len(self.__trades)
+        self.__trades.append(trade)
+        self.time_index.insert(timestamp, sequence)
+        if trade.symbol not in self.symbol_time_indexes:
+            self.symbol_time_indexes[trade.symbol] = TimeIndex()
+        in_order = self.symbol_time_indexes[trade.symbol].insert(timestamp, sequence)
+        for aggregate in self.__aggregates:
+            aggregate.update(trade)
+        if not in_order:
+            # order sensitive aggregates fold trades in timestamp order, as batch rebuilds do
+            self.ewma.recompute_symbol(trade.symbol, self._trades_of(trade.symbol))
+
+    def __correct(self, trade: TradeWithTimestamp, timestamp: int):
+        "Late trade path, ingestion patches the order sensitive aggregates of its symbol"
+        self.late_trades += 1
+        METRICS.count('trade_db.late_trades')
+        self.__ingest(trade, timestamp)
+
+    def __flush(self, watermark: int | None = None):
+        "Add buffered trades up to the watermark in timestamp order, all if not given"
+        while self.__reorder_buffer and (
+            watermark is None or self.__reorder_buffer[0][0] <= watermark
+        ):
+            timestamp, _, trade = heappop(self.__reorder_buffer)
+            self.__ingest(trade, timestamp)
+            self.__flushed_ts = timestamp
+
+    @property
+    def pending(self) -> int:
+        "The number of trades held in the reorder buffer"
+        return len(self.__reorder_buffer)
+
+    def flush(self):
+        "Add all buffered trades regardless of the watermark e.g. at the end of a session"
+        self.__flush()
+
+    def configure_event_time(self, lateness: timedelta | None):
+        """
+        Enable event time ingestion with an allowed lateness, or disable it
+
+        Attributes:
+            lateness (timedelta | None): how far behind the latest trade timestamp
+                trades may arrive and still be added in order,
+                None flushes the buffer and restores arrival order ingestion
+        """
+        if lateness is None:
+            self.flush()
+        self.lateness = lateness
+        self.__lateness_ns = lateness // timedelta(microseconds=1) * 1000 if lateness else 0
+
+    def configure_dedupe(
+        self,
+        horizon: timedelta | None,
+        partitions: PositiveInt = 8
+    ):
+        """
+        Enable dropping redelivered trades by trade id, or disable it
+
+        Ids are remembered for the horizon past the latest trade timestamp
+        only, memory stays flat however long the session. Trades without
+        an id are always added.
+
+        Attributes:
+            horizon (timedelta | None): how long redeliveries are detected,
+                None disables deduplication
+            partitions (PositiveInt, default: 8): the number of time partitions of the ids
+        """
+        if horizon is None:
+            self.dedupe = None
+        else:
+            self.dedupe = DedupeIndex(horizon.total_seconds(), partitions)
+
+    def register_basket(self, basket: Basket):
+        """
+        Maintain the index of a basket of stocks on every added trade,
+        seeded from the recorded trades of its stocks
+
+        Attributes:
+            basket (Basket): the basket, replaces any basket of the same name
+        """
+        self.basket_indices.register(
+            basket, chain.from_iterable(self._trades_of(symbol) for symbol in basket.symbols)
+        )
+
+    def basket_index(self, name: str) -> PositiveFloat:
+        """
+        Geometric mean of recorded trade prices of the stocks of a basket, O(1)
+
+        Attributes:
+            name (str): the basket name
+
+        Raises:
+            KeyError: if no basket has this name
+            ValueError: if none of the stocks of the basket traded
+
+        Returns:
+            the basket index (PositiveFloat)
+        """
+        if (value := self.basket_indices.value(name)) is None:
+            raise ValueError(f'No trade in basket {name}')
+        return value
+
+    def configure_shared_memory(
+        self,
+        enabled: bool = True,
+        capacity: PositiveInt = 1_000_000,
+        max_symbols: PositiveInt = 1024
+    ) -> SharedTradeStore | None:
+        """
+        Publish trades in a shared memory segment for query worker processes,
+        see `src.workers`, or stop publishing and destroy the segment
+
+        Attributes:
+            enabled (bool, default: True): whether to publish trades
+            capacity (PositiveInt, default: 1_000_000): the maximum number of trades
+            max_symbols (PositiveInt, default: 1024): the maximum number of symbols
+
+        Raises:
+            ValueError: if the trades already in db do not fit
+
+        Returns:
+            the store, its name is what workers attach to (SharedTradeStore | None)
+        """
+        if self.shared is not None:
+            self.__aggregates.remove(self.shared)
+            self.shared.close()
+            self.shared = None
+        if enabled:
+            if len(self.__trades) > capacity:
+                raise ValueError(f'{len(self.__trades)} trades do not fit a capacity of {capacity}')
+            self.shared = SharedTradeStore(capacity, max_symbols)
+            self.register_aggregate(self.shared)
+        return self.shared
+
+    def register_aggregate(self, aggregate):
+        """
+        Register an aggregate to be updated on every added trade
+
+        Attributes:
+            aggregate: an object implementing update(trade) and clear(),
+                it is first fed with the trades already in db
+        """
+        for trade in self.__trades:
+            aggregate.update(trade)
+        self.__aggregates.append(aggregate)
+
+    def track_top_k(self, n_minutes: PositiveInt = 15, capacity: PositiveInt | None = None):
+        """
+        Register a top-K tracker for a window
+
+        Attributes:
+            n_minutes (PositiveInt, default: 15): the length of the window
+            capacity (PositiveInt | None): if given the tracker is approximate and
+                monitors at most this many symbols, otherwise it is exact
+        """
+        tracker = ExactWindowedTopK(n_minutes) if capacity is None \
+            else ApproximateWindowedTopK(n_minutes, capacity=capacity)
+        if n_minutes in self.top_k_trackers:
+            self.__aggregates.remove(self.top_k_trackers[n_minutes])
+        self.register_aggregate(tracker)
+        self.top_k_trackers[n_minutes] = tracker
+
+    def configure_correlation(
+        self,
+        bucket: timedelta = timedelta(minutes=1),
+        window: PositiveInt = 60,
+        symbols: Iterable[str] | None = None
+    ) -> ReturnCorrelation:
+        """
+        Maintain the rolling correlation of bucketed log returns across stocks,
+        replacing any previous configuration, fed with the recorded trades in
+        timestamp order
+
+        Attributes:
+            bucket (timedelta, default: 1 minute): the length of a bucket
+            window (PositiveInt, default: 60): the number of closed buckets in the window
+            symbols (Iterable[str] | None): the stocks of the matrices, all of StockDB if not given
+
+        Returns:
+            the tracker (ReturnCorrelation)
+        """
+        tracker = ReturnCorrelation(symbols if symbols is not None else StockDB(), bucket, window)
+        for trade in self._trades_by_time():
+            tracker.update(trade)
+        if self.correlation is not None:
+            self.__aggregates.remove(self.correlation)
+        self.__aggregates.append(tracker)
+        self.correlation = tracker
+        return tracker
+
+    def configure_ewma(self, half_lives: Iterable[PositiveInt]):
+        """
+        Replace the maintained EWMA half-lives, the state is rebuilt in batch
+        from the recorded trades in timestamp order
+
+        Attributes:
+            half_lives (Iterable[PositiveInt]): the half-lives to maintain, measured in trades
+        """
+        tracker = EwmaTracker(half_lives)
+        tracker.recompute(self._trades_by_time())
+        self.__aggregates[self.__aggregates.index(self.ewma)] = tracker
+        self.ewma = tracker
+
+    def subscribe(
+        self,
+        condition: VwspThreshold | IndexMove,
+        callback: Callable[[Notification], None] | None = None,
+        queue: "Queue | None" = None,
+        loop: "AbstractEventLoop | None" = None
+    ) -> int:
+        """
+        Subscribe to notifications when a condition is met on trade ingestion
+
+        Attributes:
+            condition (VwspThreshold | IndexMove): e.g. VWSP(TEA, 15m) > X
+                or index moves by more than Y%
+            callback (Callable[[Notification], None] | None): called on notification
+            queue (asyncio.Queue | None): receives notifications
+            loop (asyncio.AbstractEventLoop | None): the loop of the queue, required
+                when trades are added from another thread than the loop's
+
+        Raises:
+            ValueError: if neither callback nor queue is given
+
+        Returns:
+            the subscription id (int)
+        """
+        return self.subscriptions.subscribe(condition, callback, queue, loop, self.__trades)
+
+    def unsubscribe(self, subscription_id: int):
+        """
+        Cancel a subscription
+
+        Attributes:
+            subscription_id (int): the id returned on subscribing
+
+        Raises:
+            KeyError: if no such subscription exists
+        """
+        self.subscriptions.unsubscribe(subscription_id)
+
+    @property
+    def sequence(self) -> int:
+        "The sequence number of the latest added trade, the number of trades added"
+        return len(self.__trades)
+
+    # pylint: disable=R0913
+    def query(
+        self,
+        symbol: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        indicator: TransactionIndicator | str | None = None,
+        min_qty: PositiveInt | None = None,
+        price_range: Tuple[float, float] | None = None,
+        ordered: bool = False
+    ) -> TradeQueryResult:
+        """
+        Lazy selection of trades, visited through the time index of the symbol,
+        the global time index or a full scan, whichever visits the fewest trades,
+        see `src.db.trade_query`
+
+        Attributes:
+            symbol (str | None): a symbol reference to the stock e.g. TEA
+            since (datetime | None): inclusive lower bound of the trade timestamps
+            until (datetime | None): inclusive upper bound of the trade timestamps
+            indicator (TransactionIndicator | str | None): BUY or SELL
+            min_qty (PositiveInt | None): the minimum quantity
+            price_range (Tuple[float, float] | None): inclusive low and high prices
+            ordered (bool, default: False): yield in timestamp order, full scans
+                yield in arrival order and are not considered
+
+        Raises:
+            ValidationError: if a criterion is invalid e.g. an empty range
+
+        Returns:
+            the result, iterate it or read it in columnar batches, its plan
+                tells the chosen access path (TradeQueryResult)
+        """
+        criteria = TradeFilter(
+            symbol=symbol, since=since, until=until, indicator=indicator,
+            min_qty=min_qty, price_range=price_range
+        )
+        plan = plan_query(
+            criteria, len(self.__trades), self.time_index, self.symbol_time_indexes, ordered
+        )
+        METRICS.count(f'trade_db.query.{plan.access.value}')
+        return TradeQueryResult(criteria, plan, self.__trades)
+
+    def snapshot(self, sequence: int | None = None) -> TradeDBSnapshot:
+        """
+        Immutable zero-copy view of the trades up to a sequence number
+
+        Attributes:
+            sequence (int | None): the number of trades to include,
+                all trades added so far if not given
+
+        Raises:
+            ValueError: if the sequence number is past the latest trade
+
+        Returns:
+            a snapshot which scan based formulas can run against (TradeDBSnapshot)
+        """
+        if sequence is None:
+            sequence = len(self.__trades)
+        if not 0 <= sequence <= len(self.__trades):
+            raise ValueError(f'Sequence number must be in range [0-{len(self.__trades)}]')
+        return TradeDBSnapshot(self.__trades, sequence)
 
     def clear(self):
-        self.__trades.clear()
+        "Clear trades, indexes and aggregates, snapshots taken before keep their trades"
+        self.__trades = []
+        self.time_index = TimeIndex()
+        self.symbol_time_indexes = {}
+        self.late_trades = 0
+        self.duplicates = 0
+        if self.dedupe is not None:
+            self.dedupe.clear()
+        self.__reorder_buffer = []
+        self.__latest_ts = self.__flushed_ts = None
+        self.__ticks = array('q')
+        for aggregate in self.__aggregates:
+            aggregate.clear()
 
     def __iadd__(self, trade: Trade) -> "_TradeDB":
         self.add(trade)
         return self
 
     def __iter__(self) -> Iterator:
-        return iter(self.__trades)
+        return islice(self.__trades, len(self.__trades))
 
     def __len__(self) -> int:
         return len(self.__trades)
 
     def __repr__(self):
-        return f"TradeDB(\n\t{'\n\t'.join(repr(trade) for trade in self.__trades)}\n)"
+        "Summary of the db, write its trades with `write` or read them by pages of a view"
+        summary = self.between().summary()
+        return (
+            f"TradeDB(trades={summary['trades']}, symbols={len(self.symbol_time_indexes)},"
+            f" first={summary['first']}, last={summary['last']})"
+        )
+
+    def write(self, stream: IO[str], limit: int | None = None) -> int:
+        """
+        Stream the trades in arrival order one per line, see `write_trades`
+
+        Attributes:
+            stream (IO[str]): the output stream
+            limit (int | None): the maximum number of trades to write, all if not given
+
+        Returns:
+            the number of trades written (int)
+        """
+        return write_trades(self, stream, limit)
+
+    def between(self, since: datetime | None = None, until: datetime | None = None) -> TradeView:
+        """
+        Zero-copy view of the trades within a time range, in timestamp order
+
+        Attributes:
+            since (datetime | None): inclusive lower bound, unbounded if not given
+            until (datetime | None): inclusive upper bound, unbounded if not given
+
+        Returns:
+            the view, slice or paginate it without copying (TradeView)
+        """
+        return self.__view(self.time_index, since, until, self.symbol_time_indexes)
+
+    def symbol_view(
+        self,
+        symbol: str,
+        since: datetime | None = None,
+        until: datetime | None = None
+    ) -> TradeView:
+        """
+        Zero-copy view of the trades of a stock within a time range, in timestamp order
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            since (datetime | None): inclusive lower bound, unbounded if not given
+            until (datetime | None): inclusive upper bound, unbounded if not given
+
+        Returns:
+            the view, empty if the stock has no trade (TradeView)
+        """
+        index = self.symbol_time_indexes.get(symbol, TimeIndex())
+        return self.__view(index, since, until, {symbol: index})
+
+    def __view(
+        self,
+        index: TimeIndex,
+        since: datetime | None,
+        until: datetime | None,
+        symbol_indexes: Mapping[str, TimeIndex]
+    ) -> TradeView:
+        positions = index.bounds(
+            to_ns(since) if since is not None else None, to_ns(until) if until is not None else None
+        )
+        return TradeView(self.__trades, index, positions, symbol_indexes)
 
     @classmethod
     def create(cls, path: Union[Path, str] | None) -> "_TradeDB":
@@ -56,17 +762,48 @@ class _TradeDB(Sequence, TradeDBVectorFormulasMixin):
         """
         return cls(Trade.from_csv(path)) if path is not None else cls()
 
+# trade db of the active exchange context, the singleton is used if None
+active_trade_db: ContextVar[_TradeDB | None] = ContextVar('active_trade_db', default=None)
+
+
 class TradeDB:
     """
-    Singleton wrapper
+    Singleton wrapper, resolves to the trade db of the active exchange if any
     """
     __instance: _TradeDB | None = None
 
     def __new__(cls):
+        if (active := active_trade_db.get()) is not None:
+            return active
         if cls.__instance is None:
             cls.__instance = _TradeDB()
         return cls.__instance
 
+    @classmethod
+    def is_initialized(cls) -> bool:
+        """
+        Returns true if the singleton has been initialized at least once
+
+        Returns:
+            status of singleton initialization (bool)
+        """
+        return cls.__instance is not None
+
+    @classmethod
+    def snapshot(cls, sequence: int | None = None) -> TradeDBSnapshot:
+        """
+        Immutable zero-copy view of the trades up to a sequence number
+
+        Attributes:
+            cls: the class type
+            sequence (int | None): the number of trades to include,
+                all trades added so far if not given
+
+        Returns:
+            a snapshot which scan based formulas can run against (TradeDBSnapshot)
+        """
+        return cls().snapshot(sequence)
+
     @classmethod
     def reset(cls):
         """
@@ -75,7 +812,6 @@ class TradeDB:
         cls.__instance.clear()
         gc.collect()
         cls.__instance = None
-        print(cls.__instance)
 
     @classmethod
     def create(cls, path: Union[Path, str] | None) -> "TradeDB":
@@ -95,3 +831,16 @@ class TradeDB:
             )
         cls.__instance = _TradeDB.create(path)
         return cls.__instance
+
+
+METRICS.register_gauge(
+    'trade_db.trades', lambda: len(TradeDB()) if TradeDB.is_initialized() else 0
+)
+METRICS.register_gauge(
+    'trade_db.symbols',
+    lambda: len(TradeDB().price_sketches.symbols()) if TradeDB.is_initialized() else 0
+)
+METRICS.register_gauge(
+    'query_cache.hit_ratio',
+    lambda: TradeDB().query_cache.info()['hit_ratio'] if TradeDB.is_initialized() else 0.
+)
@@ -0,0 +1,226 @@
+"""
+Ad-hoc trade queries with index aware planning
+
+A query filters trades by symbol, time range, indicator, minimum
+quantity and price range. The planner estimates the rows every access
+path would visit, exactly, from bisections of the time indexes: the
+time index of the symbol, the global time index or a scan of all
+trades, and picks the cheapest. Criteria the access path does not
+answer are checked on every visited trade.
+"""
+
+from datetime import datetime
+from enum import Enum
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from pydantic import BaseModel, PositiveInt, model_validator
+
+from src.clock import to_ns
+from src.db.time_index import TimeIndex
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+from src.models.trade_batch import TradeBatch
+
+CRITERIA: Tuple[str, ...] = ('symbol', 'since', 'until', 'indicator', 'min_qty', 'price_range')
+# relative cost of visiting a row through an index, positions are dereferenced in storage
+INDEX_ROW_COST: float = 1.5
+
+
+class Access(str, Enum):
+    """
+    Enum representing how a query visits trades
+    """
+    SYMBOL_INDEX = "symbol_index"
+    TIME_INDEX = "time_index"
+    FULL_SCAN = "full_scan"
+
+
+class TradeFilter(BaseModel):
+    """
+    Criteria of a trade query, all optional, combined with and
+    """
+    symbol: str | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    indicator: TransactionIndicator | None = None
+    min_qty: PositiveInt | None = None
+    price_range: Tuple[float, float] | None = None
+
+    # pylint: disable=R0903
+    class Config:
+        "Filter configuration"
+        frozen: bool = True
+        use_enum_values = True
+
+    @model_validator(mode='after')
+    def _check_ranges(self) -> "TradeFilter":
+        "Ranges must not be empty"
+        if self.since is not None and self.until is not None and self.since > self.until:
+            raise ValueError('since must not be later than until')
+        if self.price_range is not None and self.price_range[0] > self.price_range[1]:
+            raise ValueError('price range must be ordered low, high')
+        return self
+
+    def predicate(
+        self,
+        names: Tuple[str, ...] | None = None
+    ) -> Callable[[TradeWithTimestamp], bool] | None:
+        """
+        Check of the criteria on a single trade
+
+        Attributes:
+            names (Tuple[str, ...] | None): the criteria to check, all if not given,
+                e.g. those the access path does not answer
+
+        Returns:
+            the check, None if there is nothing left to check
+                (Callable[[TradeWithTimestamp], bool] | None)
+        """
+        names = names if names is not None else CRITERIA
+        checks: List[Callable[[Any], bool]] = []
+        if self.symbol is not None and 'symbol' in names:
+            checks.append(lambda trade, symbol=self.symbol: trade.symbol == symbol)
+        if self.since is not None and 'since' in names:
+            checks.append(lambda trade, since=self.since: trade.timestamp >= since)
+        if self.until is not None and 'until' in names:
+            checks.append(lambda trade, until=self.until: trade.timestamp <= until)
+        if self.indicator is not None and 'indicator' in names:
+            checks.append(lambda trade, indicator=self.indicator: trade.indicator == indicator)
+        if self.min_qty is not None and 'min_qty' in names:
+            checks.append(lambda trade, min_qty=self.min_qty: trade.quantity >= min_qty)
+        if self.price_range is not None and 'price_range' in names:
+            checks.append(
+                lambda trade, low=self.price_range[0], high=self.price_range[1]:
+                low <= trade.price <= high
+            )
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        return lambda trade: all(check(trade) for check in checks)
+
+
+class QueryPlan:
+    """
+    Access path chosen for a query
+
+    Attributes:
+        access (Access): how trades are visited
+        rows (int): the number of trades visited
+        residual (Tuple[str, ...]): the criteria checked on every visited trade
+        index (TimeIndex | None): the visited index, None for a full scan
+        positions (range | None): the visited positions of the index
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        access: Access,
+        rows: int,
+        residual: Tuple[str, ...],
+        index: TimeIndex | None = None,
+        positions: range | None = None
+    ):
+        self.access = access
+        self.rows = rows
+        self.residual = residual
+        self.index = index
+        self.positions = positions
+
+    def __repr__(self) -> str:
+        return (
+            f'QueryPlan(access={self.access.value}, rows={self.rows},'
+            f' residual={", ".join(self.residual) or "none"})'
+        )
+
+
+def plan_query(
+    criteria: TradeFilter,
+    n_trades: int,
+    time_index: TimeIndex,
+    symbol_time_indexes: Dict[str, TimeIndex],
+    ordered: bool = False
+) -> QueryPlan:
+    """
+    Pick the access path visiting the fewest rows, weighted by their cost
+
+    Attributes:
+        criteria (TradeFilter): the query criteria
+        n_trades (int): the number of stored trades
+        time_index (TimeIndex): the global time index
+        symbol_time_indexes (Dict[str, TimeIndex]): the time index of every symbol
+        ordered (bool, default: False): only consider paths yielding in timestamp order
+
+    Returns:
+        the plan (QueryPlan)
+    """
+    since = to_ns(criteria.since) if criteria.since is not None else None
+    until = to_ns(criteria.until) if criteria.until is not None else None
+    checked = tuple(name for name in CRITERIA if getattr(criteria, name) is not None)
+
+    candidates: List[Tuple[float, QueryPlan]] = []
+    if criteria.symbol is not None:
+        index = symbol_time_indexes.get(criteria.symbol, TimeIndex())
+        positions = index.bounds(since, until)
+        residual = tuple(name for name in checked if name not in ('symbol', 'since', 'until'))
+        candidates.append((
+            len(positions) * INDEX_ROW_COST,
+            QueryPlan(Access.SYMBOL_INDEX, len(positions), residual, index, positions)
+        ))
+    if since is not None or until is not None or ordered:
+        positions = time_index.bounds(since, until)
+        residual = tuple(name for name in checked if name not in ('since', 'until'))
+        candidates.append((
+            len(positions) * INDEX_ROW_COST,
+            QueryPlan(Access.TIME_INDEX, len(positions), residual, time_index, positions)
+        ))
+    if not ordered:
+        candidates.append((n_trades, QueryPlan(Access.FULL_SCAN, n_trades, checked)))
+    return min(candidates, key=lambda candidate: candidate[0])[1]
+
+
+class TradeQueryResult:
+    """
+    Lazy result of a trade query, trades are visited when iterated
+
+    Indexed plans yield trades in timestamp order, full scans in arrival order.
+
+    Attributes:
+        criteria (TradeFilter): the query criteria
+        plan (QueryPlan): the chosen access path
+    """
+
+    def __init__(self, criteria: TradeFilter, plan: QueryPlan, trades: List[TradeWithTimestamp]):
+        self.criteria = criteria
+        self.plan = plan
+        self.__trades = trades
+
+    def __repr__(self) -> str:
+        return f'TradeQueryResult({self.plan!r})'
+
+    def __iter__(self) -> Iterator[TradeWithTimestamp]:
+        trades = self.__trades
+        if self.plan.access is Access.FULL_SCAN:
+            visited = islice(trades, len(trades))
+        else:
+            visited = map(trades.__getitem__, self.plan.index.sequences_at(self.plan.positions))
+        predicate = self.criteria.predicate(self.plan.residual)
+        return filter(predicate, visited) if predicate is not None else visited
+
+    def count(self) -> int:
+        "The number of matching trades, visits them"
+        return sum(1 for _ in self)
+
+    def batches(self, size: PositiveInt = 100_000) -> Iterator[TradeBatch]:
+        """
+        Matching trades as columnar batches
+
+        Attributes:
+            size (PositiveInt, default: 100_000): the maximum number of trades per batch
+
+        Yields:
+            the trades in batches of at most size trades (Iterator[TradeBatch])
+        """
+        trades = iter(self)
+        while chunk := list(islice(trades, size)):
+            yield TradeBatch.from_trades(chunk)
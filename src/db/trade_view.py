@@ -0,0 +1,192 @@
+"""
+Zero-copy views of trade db time ranges
+
+A view is a range of positions in a time index, the global one or the
+one of a symbol, over the db storage: taking, slicing or paginating a
+view copies no trade and no list, trades are read when accessed. Views
+stream their trades instead of building one string of all of them.
+
+A view holds the trades of the index when it was taken, trades added
+afterwards are not visible. Positions are read from the live index as
+long as no late trade was inserted in place, after that the entries of
+the view are resolved once again from its first and last entries and
+the number of trades stored when it was taken.
+"""
+
+from collections.abc import Sequence
+from copy import copy
+from itertools import islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import from_ns
+from src.db.time_index import TimeIndex
+from src.formulas.formulas import TradeDBVectorFormulasMixin
+from src.models.trade import TradeWithTimestamp
+
+PAGE_SIZE: int = 50
+
+
+def write_trades(
+    trades: Iterable[TradeWithTimestamp],
+    stream: IO[str],
+    limit: int | None = None
+) -> int:
+    """
+    Stream the repr of trades, one per line
+
+    Attributes:
+        trades (Iterable[TradeWithTimestamp]): the trades
+        stream (IO[str]): the output stream
+        limit (int | None): the maximum number of trades to write, all if not given
+
+    Returns:
+        the number of trades written (int)
+    """
+    written = 0
+    for written, trade in enumerate(islice(trades, limit), start=1):
+        stream.write(f'{trade!r}\n')
+    return written
+
+
+class _Snapshot:
+    """
+    Entries of a range of positions of a time index as of when it was taken,
+    shared by a view and its slices
+
+    Attributes:
+        trades (List[TradeWithTimestamp]): the db storage
+        index (TimeIndex): the time index the positions refer to
+        positions (range): the positions of the range in the index when taken
+    """
+
+    def __init__(self, trades: List[TradeWithTimestamp], index: TimeIndex, positions: range):
+        self.trades = trades
+        self.index = index
+        self.positions = positions
+        # trades stored later have higher sequences and are not part of the snapshot
+        self.limit = len(trades)
+        self.__version = index.version
+        self.__bounds = (index[positions[0]], index[positions[-1]]) if positions else None
+        self.__sequences: List[int] | None = None
+
+    def __resolved(self) -> List[int]:
+        "Sequences of the snapshot, read again from the index once late inserts shifted it"
+        if self.__sequences is None and self.__bounds is None:
+            self.__sequences = []
+        elif self.__sequences is None:
+            (first, last), trades = self.__bounds, self.trades
+            self.__sequences = [
+                sequence for sequence in self.index.sequences(first[0], last[0])
+                if sequence < self.limit
+                and first <= (trades[sequence].timestamp_ns, sequence) <= last
+            ]
+        return self.__sequences
+
+    def __shift(self, positions: range) -> range:
+        start = self.positions.start
+        return range(positions.start - start, positions.stop - start, positions.step)
+
+    def entry(self, position: int) -> Tuple[int, int]:
+        "Timestamp and sequence at a position taken with the snapshot"
+        if self.index.version == self.__version:
+            return self.index[position]
+        sequence = self.__resolved()[position - self.positions.start]
+        return self.trades[sequence].timestamp_ns, sequence
+
+    def sequences_at(self, positions: range) -> Iterator[int]:
+        "Sequences at positions taken with the snapshot, see `TimeIndex.sequences_at`"
+        if self.index.version == self.__version:
+            return self.index.sequences_at(positions)
+        return map(self.__resolved().__getitem__, self.__shift(positions))
+
+
+class TradeView(Sequence, TradeDBVectorFormulasMixin):
+    """
+    Trades at a range of positions of a time index, in timestamp order
+
+    Attributes:
+        trades (List[TradeWithTimestamp]): the db storage
+        index (TimeIndex): the time index the positions refer to
+        positions (range): the positions of the view in the index when taken
+        symbol_indexes (Mapping[str, TimeIndex] | None): the time indexes per symbol
+            of the same trades, answer membership tests without visiting trades
+    """
+
+    def __init__(
+        self,
+        trades: List[TradeWithTimestamp],
+        index: TimeIndex,
+        positions: range,
+        symbol_indexes: Mapping[str, TimeIndex] | None = None
+    ):
+        self.__snapshot = _Snapshot(trades, index, positions)
+        self.__symbol_indexes = symbol_indexes
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, idx: int | slice) -> "TradeWithTimestamp | TradeView":
+        if isinstance(idx, slice):
+            view = copy(self)
+            view.positions = self.positions[idx]
+            return view
+        return self.__snapshot.trades[self.__snapshot.entry(self.positions[idx])[1]]
+
+    def __iter__(self) -> Iterator[TradeWithTimestamp]:
+        snapshot = self.__snapshot
+        return map(snapshot.trades.__getitem__, snapshot.sequences_at(self.positions))
+
+    def __contains__(self, value: str) -> bool:
+        positions, snapshot = self.positions, self.__snapshot
+        if self.__symbol_indexes is None or positions.step != 1:
+            return any(trade.symbol == value for trade in self)
+        index = self.__symbol_indexes.get(value)
+        return bool(positions) and index is not None and index.any_between(
+            snapshot.entry(positions[0]), snapshot.entry(positions[-1]), snapshot.limit
+        )
+
+    def __repr__(self) -> str:
+        return 'TradeView(' + ', '.join(f'{k}={v}' for k, v in self.summary().items()) + ')'
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Size and time span of the view, read from the index without visiting trades
+
+        Returns:
+            the number of trades and the first and last timestamps,
+                None if the view is empty (Dict[str, Any])
+        """
+        positions, snapshot = self.positions, self.__snapshot
+        return {
+            'trades': len(positions),
+            'first': from_ns(snapshot.entry(positions[0])[0]) if positions else None,
+            'last': from_ns(snapshot.entry(positions[-1])[0]) if positions else None,
+        }
+
+    def page(self, number: int, size: PositiveInt = PAGE_SIZE) -> "TradeView":
+        """
+        A page of the view
+
+        Attributes:
+            number (int): the page number, from 0
+            size (PositiveInt, default: PAGE_SIZE): trades per page
+
+        Returns:
+            the page, empty past the last page (TradeView)
+        """
+        if number < 0 or size <= 0:
+            raise ValueError('Page number must not be negative and page size must be positive')
+        return self[number * size:(number + 1) * size]
+
+    def pages(self, size: PositiveInt = PAGE_SIZE) -> Iterator["TradeView"]:
+        "Lazy iterator over the pages of the view"
+        if size <= 0:
+            raise ValueError('Page size must be positive')
+        return (self.page(number, size) for number in range(-(-len(self) // size)))
+
+    def write(self, stream: IO[str], limit: int | None = None) -> int:
+        "Stream the trades of the view one per line, see `write_trades`"
+        return write_trades(self, stream, limit)
@@ -0,0 +1,95 @@
+"""
+Independent exchange instances
+
+An exchange owns its stock registry and its trade db, with their own
+indexes and aggregates. While an exchange is active, `StockDB()` and
+`TradeDB()` resolve to its registry and db, so trade validation and
+every formula, batch query or service handler run unchanged against it.
+Activation is held in context variables: threads and asyncio tasks each
+see their own active exchange, many exchanges are served from one
+process. Outside any exchange the process-wide singletons are used.
+
+Example:
+    lse = Exchange.from_csv('LSE', 'lse.csv')
+    with lse:
+        TradeDB().add(Trade(symbol='TEA', price=10., quantity=5, indicator='BUY'))
+        price = TradeDB().volume_weighted_stock_price('TEA')
+"""
+
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Callable, Iterable, Tuple, TypeVar, Union
+
+from src.db.stock_db import _StockDB, active_stock_db
+from src.db.trade_db import _TradeDB, active_trade_db
+from src.models.stock import Stock
+
+T = TypeVar('T')
+
+
+class Exchange:
+    """
+    Isolated stock registry and trade db
+
+    Attributes:
+        name (str): the exchange name e.g. GBCE
+        stocks (Iterable[Stock] | None): the listed stocks, none if not given
+    """
+
+    def __init__(self, name: str, stocks: Iterable[Stock] | None = None):
+        self.name = name
+        self.stocks = _StockDB(stocks)
+        self.trades = _TradeDB()
+        # entries are undone in the context that made them, tasks and threads entering
+        # the same exchange concurrently each hold their own stack of tokens
+        self.__tokens: ContextVar[Tuple[Tuple[Token, Token], ...]] = ContextVar(
+            f'exchange_tokens_{name}', default=()
+        )
+
+    def __repr__(self) -> str:
+        return f'Exchange(name={self.name!r}, stocks={len(self.stocks)}, trades={len(self.trades)})'
+
+    def __enter__(self) -> "Exchange":
+        entry = (active_stock_db.set(self.stocks), active_trade_db.set(self.trades))
+        self.__tokens.set(self.__tokens.get() + (entry,))
+        return self
+
+    def __exit__(self, *exc_info):
+        *tokens, (stocks_token, trades_token) = self.__tokens.get()
+        self.__tokens.set(tuple(tokens))
+        active_trade_db.reset(trades_token)
+        active_stock_db.reset(stocks_token)
+
+    def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        "Call a function with the exchange active"
+        with self:
+            return fn(*args, **kwargs)
+
+    @classmethod
+    def from_csv(
+        cls,
+        name: str,
+        stocks_path: Union[Path, str],
+        trades_path: Union[Path, str, None] = None
+    ) -> "Exchange":
+        """
+        Create an exchange from a stocks csv file, and optionally its trades
+
+        Attributes:
+            name (str): the exchange name
+            stocks_path (Path | str): the stocks csv file, formatted as gbce.csv
+            trades_path (Path | str | None): a trades csv file, validated against the stocks
+
+        Returns:
+            the exchange (Exchange)
+        """
+        # pylint: disable=C0415
+        from src.models.trade import Trade
+
+        exchange = cls(name, Stock.from_csv(stocks_path))
+        if trades_path is not None:
+            with exchange:
+                for trade in Trade.from_csv(trades_path):
+                    exchange.trades.add(trade)
+        return exchange
+
@@ -0,0 +1,255 @@
+"""
+Streaming export of trades
+
+Writes trades of the db, a snapshot, a view or a query result as CSV
+readable back with `TradeWithTimestamp.from_csv`, as NDJSON, or in a
+columnar binary layout read back as `TradeBatch`es with `read_columnar`.
+Trades are encoded by chunks, a background thread compresses and writes
+the encoded chunks through a bounded queue: memory is bounded by the
+chunk size and queue depth whatever the number of trades, and the
+compressors release the GIL so ingestion keeps running. Export a
+`TradeDB.snapshot()` for a consistent end of day dump while trades keep
+being added.
+
+Columnar files start with the `GBCECOL1` magic, followed by chunks of a
+`<4sIII` header (b'CHNK', rows, symbol table and trade id bytes), the
+newline separated symbol table, the JSON list of trade ids if any, and
+the little endian symbol code (i), timestamp in nanoseconds (q), price
+(d), quantity (q) and indicator (b, 0 for BUY) columns.
+
+Example:
+    export(TradeDB().snapshot(), 'trades-2024-06-03.csv.gz')
+    export(TradeDB().query(symbol='TEA'), 'tea.col', fmt='columnar')
+"""
+
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import struct
+import sys
+from array import array
+from itertools import islice
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+from typing import IO, Dict, Iterable, Iterator, List, Tuple, Union
+
+from pydantic import PositiveInt
+
+from src.models.trade import TradeWithTimestamp
+from src.models.trade_batch import TradeBatch
+
+FORMATS: Tuple[str, ...] = ('csv', 'ndjson', 'columnar')
+COMPRESSIONS: Dict[str, str] = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma'}
+COLUMNAR_MAGIC: bytes = b'GBCECOL1'
+CHUNK_HEADER = struct.Struct('<4sIII')
+INDICATORS: Tuple[str, ...] = ('BUY', 'SELL')
+
+
+def _compressed(raw: IO[bytes], compression: str | None) -> IO[bytes]:
+    "Compressing stream over a raw binary stream"
+    match compression:
+        case None:
+            return raw
+        case 'gzip':
+            return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+        case 'bz2':
+            return bz2.BZ2File(raw, 'wb')
+        case 'lzma':
+            return lzma.LZMAFile(raw, 'wb')
+    raise ValueError(f'Unknown compression {compression}')
+
+
+class BackgroundWriter:
+    """
+    Binary stream compressing and writing in a background thread
+
+    Attributes:
+        raw (IO[bytes]): the destination stream, left open on close
+        compression (str | None): gzip, bz2, lzma or None
+        depth (PositiveInt, default: 4): the maximum number of chunks waiting to be written
+    """
+
+    def __init__(self, raw: IO[bytes], compression: str | None = None, depth: PositiveInt = 4):
+        self.__stream = _compressed(raw, compression)
+        self.__raw = raw
+        self.__queue: Queue[bytes | None] = Queue(depth)
+        self.__error: BaseException | None = None
+        self.__thread = Thread(target=self.__run, name='export-writer', daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        while (data := self.__queue.get()) is not None:
+            if self.__error is None:
+                try:
+                    self.__stream.write(data)
+                except Exception as exc:  # pylint: disable=W0718
+                    # reported to the producer, chunks are still drained so it never blocks
+                    self.__error = exc
+
+    def write(self, data: bytes):
+        """
+        Queue a chunk, blocks while the queue is full
+
+        Raises:
+            OSError: if a previous chunk could not be written
+        """
+        if self.__error is not None:
+            raise self.__error
+        self.__queue.put(data)
+
+    def close(self):
+        """
+        Flush queued chunks and finish the compressed stream
+
+        Raises:
+            OSError: if a chunk could not be written
+        """
+        self.__queue.put(None)
+        self.__thread.join()
+        if self.__stream is not self.__raw:
+            self.__stream.close()
+        if self.__error is not None:
+            raise self.__error
+
+
+def _csv_chunk(trades: List[TradeWithTimestamp], header: bool) -> bytes:
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator='\n')
+    if header:
+        writer.writerow(TradeWithTimestamp.positional_fields())
+    writer.writerows(
+        (trade.symbol, trade.price, trade.quantity, trade.indicator,
+         trade.timestamp.isoformat(), trade.trade_id or '')
+        for trade in trades
+    )
+    return text.getvalue().encode()
+
+
+def _ndjson_chunk(trades: List[TradeWithTimestamp], _: bool) -> bytes:
+    return b''.join(trade.model_dump_json().encode() + b'\n' for trade in trades)
+
+
+def _columnar_chunk(trades: List[TradeWithTimestamp], header: bool) -> bytes:
+    batch = TradeBatch.from_trades(trades)
+    codes: Dict[str, int] = {}
+    symbol_codes = array('i', (codes.setdefault(symbol, len(codes)) for symbol in batch.symbols))
+    indicators = array('b', (INDICATORS.index(indicator) for indicator in batch.indicators))
+    columns = [symbol_codes, batch.timestamps, batch.prices, batch.quantities, indicators]
+    if sys.byteorder == 'big':
+        for column in columns:
+            column.byteswap()
+    symbols = '\n'.join(codes).encode()
+    trade_ids = json.dumps(batch.trade_ids).encode() if batch.trade_ids is not None else b''
+    return b''.join((
+        COLUMNAR_MAGIC if header else b'',
+        CHUNK_HEADER.pack(b'CHNK', len(batch), len(symbols), len(trade_ids)),
+        symbols,
+        trade_ids,
+        *(column.tobytes() for column in columns),
+    ))
+
+
+ENCODERS = {'csv': _csv_chunk, 'ndjson': _ndjson_chunk, 'columnar': _columnar_chunk}
+
+
+def _detect(path: Path, fmt: str | None, compression: str | None) -> Tuple[str, str | None]:
+    "Format and compression from the file suffixes when not given"
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    if compression is None and suffixes and suffixes[-1] in COMPRESSIONS:
+        compression = COMPRESSIONS[suffixes.pop()]
+    if fmt is None:
+        fmt = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(
+            suffixes[-1] if suffixes else '', 'columnar'
+        )
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt}')
+    return fmt, compression
+
+
+# pylint: disable=R0913
+def export(
+    trades: Iterable[TradeWithTimestamp],
+    path: Union[Path, str],
+    fmt: str | None = None,
+    compression: str | None = None,
+    chunk_size: PositiveInt = 10_000,
+    depth: PositiveInt = 4
+) -> int:
+    """
+    Stream trades to a file
+
+    Attributes:
+        trades (Iterable[TradeWithTimestamp]): the trades, e.g. the db, a
+            snapshot, a view or a query result
+        path (Path | str): the destination file
+        fmt (str | None): csv, ndjson or columnar, from the file suffix if not given
+        compression (str | None): gzip, bz2 or lzma, from a .gz, .bz2 or .xz
+            suffix if not given, none otherwise
+        chunk_size (PositiveInt, default: 10_000): trades encoded at a time
+        depth (PositiveInt, default: 4): encoded chunks queued for the writer thread
+
+    Raises:
+        ValueError: if the format or the compression is unknown
+        OSError: if the file can not be written
+
+    Returns:
+        the number of trades written (int)
+    """
+    path = Path(path)
+    fmt, compression = _detect(path, fmt, compression)
+    encode, trades, written = ENCODERS[fmt], iter(trades), 0
+    with open(path, 'wb') as raw:
+        writer = BackgroundWriter(raw, compression, depth)
+        try:
+            while chunk := list(islice(trades, chunk_size)):
+                writer.write(encode(chunk, not written))
+                written += len(chunk)
+            if not written and fmt != 'ndjson':
+                writer.write(encode([], True) if fmt == 'csv' else COLUMNAR_MAGIC)
+        finally:
+            writer.close()
+    return written
+
+
+def read_columnar(path: Union[Path, str], compression: str | None = None) -> Iterator[TradeBatch]:
+    """
+    Read back a columnar export chunk by chunk
+
+    Attributes:
+        path (Path | str): the exported file
+        compression (str | None): gzip, bz2 or lzma, from the file suffix if not given
+
+    Raises:
+        ValueError: if the file is not a columnar export
+
+    Yields:
+        a batch per exported chunk (Iterator[TradeBatch])
+    """
+    path = Path(path)
+    _, compression = _detect(path, 'columnar', compression)
+    opener = {None: open, 'gzip': gzip.open, 'bz2': bz2.open, 'lzma': lzma.open}[compression]
+    with opener(path, 'rb') as stream:
+        if stream.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f'{path} is not a columnar trades export')
+        while header := stream.read(CHUNK_HEADER.size):
+            tag, rows, symbols_size, trade_ids_size = CHUNK_HEADER.unpack(header)
+            if tag != b'CHNK':
+                raise ValueError(f'{path} is corrupted')
+            symbols = stream.read(symbols_size).decode().split('\n')
+            trade_ids = json.loads(stream.read(trade_ids_size)) if trade_ids_size else None
+            columns = []
+            for typecode in 'iqdqb':
+                column = array(typecode)
+                column.frombytes(stream.read(rows * column.itemsize))
+                if sys.byteorder == 'big':
+                    column.byteswap()
+                columns.append(column)
+            codes, timestamps, prices, quantities, indicators = columns
+            yield TradeBatch(
+                [symbols[code] for code in codes], prices, quantities,
+                [INDICATORS[indicator] for indicator in indicators], timestamps, trade_ids
+            )
@@ -0,0 +1,112 @@
+"""
+Fixed-point price arithmetic
+
+In fixed-point mode prices are held as integer multiples of the tick
+size of their stock, sums of price times quantity and of quantities are
+exact integers and prices are divided back only when read. Results no
+longer depend on the order trades are summed in, so incrementally
+maintained values are bit-identical to full recomputations.
+
+Tick sizes are read from a csv file alongside gbce.csv with a
+`Stock Symbol, Tick Size` header, `gbce_ticks.csv` of the project root
+unless `GBCE_TICKS_CSV` is set. Stocks not listed get the default tick.
+"""
+
+from csv import reader
+from os import environ
+from pathlib import Path
+from typing import Dict, Union
+
+DEFAULT_TICK_SIZE: float = 1e-4
+DEFAULT_TICKS_CSV: Path = Path(__file__).resolve().parents[1] / 'gbce_ticks.csv'
+
+
+def to_ticks(price: float, tick_size: float) -> int:
+    """
+    Integer ticks of a price
+
+    Attributes:
+        price (float): the price
+        tick_size (float): the tick size of the stock
+
+    Raises:
+        ValueError: if the price is not a multiple of the tick size
+
+    Returns:
+        the price in ticks (int)
+    """
+    ticks = round(price / tick_size)
+    if abs(ticks * tick_size - price) > tick_size * 1e-6:
+        raise ValueError(f'Price {price} is not a multiple of the tick size {tick_size}')
+    return ticks
+
+
+def from_ticks(ticks: int | float, tick_size: float) -> float:
+    """
+    Price of a number of ticks, fractional for averages
+
+    Attributes:
+        ticks (int | float): the price in ticks
+        tick_size (float): the tick size of the stock
+
+    Returns:
+        the price (float)
+    """
+    return ticks * tick_size
+
+
+class TickSizes:
+    """
+    Tick size per stock symbol
+
+    Attributes:
+        sizes (Dict[str, float]): the tick size of listed symbols
+        default (float, default: DEFAULT_TICK_SIZE): the tick size of other symbols
+    """
+
+    def __init__(self, sizes: Dict[str, float] | None = None, default: float = DEFAULT_TICK_SIZE):
+        if default <= 0 or any(size <= 0 for size in (sizes or {}).values()):
+            raise ValueError('Tick sizes must be positive')
+        self.sizes = dict(sizes or {})
+        self.default = default
+
+    def __getitem__(self, symbol: str) -> float:
+        return self.sizes.get(symbol, self.default)
+
+    def to_ticks(self, symbol: str, price: float) -> int:
+        "Integer ticks of a price of a stock, see `to_ticks`"
+        return to_ticks(price, self[symbol])
+
+    def vwsp(self, symbol: str, notional: int, quantity: int) -> float:
+        """
+        Volume weighted price from exact sums, the only division
+
+        Attributes:
+            symbol (str): a symbol reference to the stock e.g. TEA
+            notional (int): the sum of price ticks times quantity
+            quantity (int): the sum of quantities
+
+        Returns:
+            the volume weighted price (float)
+        """
+        return from_ticks(notional / quantity, self[symbol])
+
+    @classmethod
+    def from_csv(cls, path: Union[Path, str, None] = None) -> "TickSizes":
+        """
+        Load tick sizes, a missing file leaves every stock on the default tick
+
+        Attributes:
+            path (Path | str | None): the csv file, `GBCE_TICKS_CSV` or the
+                project default if not given
+
+        Returns:
+            the tick sizes (TickSizes)
+        """
+        path = Path(path or environ.get('GBCE_TICKS_CSV', DEFAULT_TICKS_CSV))
+        if not path.exists():
+            return cls()
+        with open(path, encoding='utf-8') as csv_file:
+            rows = reader(csv_file)
+            next(rows, None)
+            return cls({symbol.strip(): float(size) for symbol, size in rows})
@@ -4,12 +4,15 @@ Formulas
 
 from datetime import datetime
 from itertools import tee
-from typing import Optional
+from math import exp, fsum, log
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from pydantic import PositiveFloat, PositiveInt
 
+from src.clock import now_ns, to_ns
 from src.models.stock_type import StockType
 from src.date_utilities import timestamp_n_minutes_ago
+from src.metrics import METRICS
 
 
 class StockScalarFormulasMixin:
@@ -17,6 +20,7 @@ class StockScalarFormulasMixin:
     Mixin class providing implementations of scalar formulas for a stock
     """
 
+    @METRICS.timed('formulas.dividend_yield')
     def dividend_yield(self, price: PositiveFloat) -> PositiveFloat:
         """
         Calculates dividend yield of stock for a given price
@@ -35,6 +39,7 @@ class StockScalarFormulasMixin:
             case StockType.PREFERRED:
                 return (self.par_value * self.fixed_dividend) / price
 
+    @METRICS.timed('formulas.pe_ratio')
     def pe_ratio(self, price: PositiveFloat) -> Optional[PositiveFloat]:
         """
         Calculates P/E ratio for a given price
@@ -55,6 +60,7 @@ class TradeDBVectorFormulasMixin:
     Mixin class providing implementations of vector formulas for trade db
     """
 
+    @METRICS.timed('formulas.gbce_all_share_index')
     def gbce_all_share_index(self) -> PositiveFloat:
         """
         Calculates geometric mean of recorded trade prices for all stocks
@@ -65,15 +71,15 @@ class TradeDBVectorFormulasMixin:
         Returns:
             the geometric mean of all trade prices in GBCE (PostiveFloat)
         """
-        product: PositiveFloat = 1.0
-        for trade in self:
-            product *= trade.price
-        return product ** (1 / len(self))
+        # mean of log prices, the product of prices overflows on large dbs
+        return exp(fsum(log(trade.price) for trade in self) / len(self))
 
+    @METRICS.timed('formulas.volume_weighted_stock_price')
     def volume_weighted_stock_price(
         self,
         symbol: str,
-        mock_ts: datetime | None = None
+        mock_ts: datetime | None = None,
+        n_minutes: PositiveInt = 15
     ) -> PositiveFloat | None:
         """
         Calculates volume weighted stock price formula for all
@@ -84,6 +90,7 @@ class TradeDBVectorFormulasMixin:
             symbol (str): a symbol reference to the stock e.g. TEA
             mock_ts (datetime | None): A mock timestamp to aid with testing
                 without the need of an external mocking framework
+            n_minutes (PositiveInt, default: 15): the length of the window of trades
         
         Raises:
             ValueError: if Stock symbol is not registered in StockDB
@@ -92,16 +99,47 @@ class TradeDBVectorFormulasMixin:
         Returns:
             VWSP formula result (PostiveFloat | None)
         """
-        n_minutes: PositiveInt = 15
         ts_min_ago = timestamp_n_minutes_ago(n_minutes, mock_ts)
-        stock_trades_it = tee(
-            filter(
-                lambda trade: trade.symbol == symbol \
-                    and trade.timestamp >= ts_min_ago,
-                self
-            ),
-            3
+        return self._volume_weighted_price(
+            filter(lambda trade: trade.timestamp >= ts_min_ago, self._trades_of(symbol)),
+            symbol,
+            n_minutes
         )
+
+    def _trades_of(self, symbol: str) -> Iterator:
+        """
+        Recorded trades of a given stock, scans all trades
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            symbol (str): a symbol reference to the stock e.g. TEA
+
+        Returns:
+            an iterator over the trades of the stock (Iterator)
+        """
+        return filter(lambda trade: trade.symbol == symbol, self)
+
+    @staticmethod
+    def _volume_weighted_price(
+        stock_trades: Iterable,
+        symbol: str,
+        n_minutes: PositiveInt
+    ) -> PositiveFloat:
+        """
+        Volume weighted price of the trades of a stock within a window
+
+        Attributes:
+            stock_trades (Iterable[TradeWithTimestamp]): the trades within the window
+            symbol (str): a symbol reference to the stock e.g. TEA
+            n_minutes (PositiveInt): the length of the window of trades
+
+        Raises:
+            ValueError: if there are no trades or if total quantity of shares is zero
+
+        Returns:
+            VWSP formula result (PostiveFloat)
+        """
+        stock_trades_it = tee(stock_trades, 3)
         total_quantity = sum(trade.quantity for trade in stock_trades_it[0])
 
         try:
@@ -118,3 +156,273 @@ class TradeDBVectorFormulasMixin:
             ) from exc
         except ZeroDivisionError as exc:
             raise ValueError('Total quantity of shares for stock is zero') from  exc
+
+
+class TradeDBEwmaFormulasMixin:
+    """
+    Mixin class providing exponentially weighted moving average formulas for trade db,
+    answered from the state maintained on trade ingestion
+    """
+
+    def ewma_price(self, symbol: str, half_life: PositiveInt | None = None) -> PositiveFloat:
+        """
+        Exponentially weighted moving average price of a stock
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            symbol (str): a symbol reference to the stock e.g. TEA
+            half_life (PositiveInt | None): a maintained half-life in trades,
+                the first maintained if not given
+
+        Raises:
+            ValueError: if the stock has no associated trade
+                or the half-life is not maintained
+
+        Returns:
+            the EWMA price of the stock (PositiveFloat)
+        """
+        if symbol not in self.ewma:
+            raise ValueError(f'Stock symbol {symbol} has no associated trade')
+        return self.ewma.price(symbol, half_life)
+
+    def realized_volatility(self, symbol: str, half_life: PositiveInt | None = None) -> float:
+        """
+        Realized volatility of a stock from exponentially weighted squared log returns
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            symbol (str): a symbol reference to the stock e.g. TEA
+            half_life (PositiveInt | None): a maintained half-life in trades,
+                the first maintained if not given
+
+        Raises:
+            ValueError: if the stock has no associated trade
+                or the half-life is not maintained
+
+        Returns:
+            the realized volatility per trade of the stock (float)
+        """
+        if symbol not in self.ewma:
+            raise ValueError(f'Stock symbol {symbol} has no associated trade')
+        return self.ewma.volatility(symbol, half_life)
+
+    def ewma_prices(self, half_life: PositiveInt | None = None) -> Dict[str, PositiveFloat]:
+        """
+        Exponentially weighted moving average price of every traded stock
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            half_life (PositiveInt | None): a maintained half-life in trades,
+                the first maintained if not given
+
+        Returns:
+            the EWMA price per stock symbol (Dict[str, PositiveFloat])
+        """
+        return self.ewma.prices(half_life)
+
+    def realized_volatilities(self, half_life: PositiveInt | None = None) -> Dict[str, float]:
+        """
+        Realized volatility of every traded stock
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            half_life (PositiveInt | None): a maintained half-life in trades,
+                the first maintained if not given
+
+        Returns:
+            the realized volatility per stock symbol (Dict[str, float])
+        """
+        return self.ewma.volatilities(half_life)
+
+    def recompute_ewma(self):
+        """
+        Rebuild the EWMA state from the recorded trades in a single batch pass
+        in timestamp order, e.g. after a historical reload
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+        """
+        self.ewma.recompute(self._trades_by_time())
+
+class TradeDBQuantileFormulasMixin:
+    """
+    Mixin class providing approximate price quantiles for trade db,
+    answered from the price sketches maintained on trade ingestion
+    """
+
+    def price_quantiles(
+        self,
+        quantiles: Iterable[float] = (0.05, 0.5, 0.95),
+        symbols: Iterable[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None
+    ) -> Dict[float, float]:
+        """
+        Approximate trade price quantiles across a set of symbols and a time range
+
+        Only the buckets retained by the price sketches are covered, the last
+        day per symbol by default: without bounds the quantiles are of that
+        day, not of the whole session. Set `price_sketches.retention` to None
+        before adding trades to keep every bucket.
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            quantiles (Iterable[float], default: (0.05, 0.5, 0.95)): the quantiles
+                to calculate, each in range [0-1]
+            symbols (Iterable[str] | None): the stock symbols to include, all if not given
+            since (datetime | None): lower bound of the time range, unbounded if not given
+            until (datetime | None): upper bound of the time range, unbounded if not given
+
+        Raises:
+            ValueError: if no trade was recorded for the symbols in the time range
+
+        Returns:
+            the approximate price of each quantile (Dict[float, float])
+        """
+        quantiles = tuple(quantiles)
+        sketch = self.price_sketches.merged(symbols, since, until)
+        if not len(sketch):
+            raise ValueError('No recorded trade for the given symbols and time range')
+        return dict(zip(quantiles, sketch.quantiles(quantiles)))
+
+    def rolling_price_quantiles(
+        self,
+        symbol: str,
+        quantiles: Iterable[float] = (0.05, 0.5, 0.95),
+        mock_ts: datetime | None = None
+    ) -> Dict[float, float]:
+        """
+        Approximate trade price quantiles of a stock in the past 15 minutes
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            symbol (str): a symbol reference to the stock e.g. TEA
+            quantiles (Iterable[float], default: (0.05, 0.5, 0.95)): the quantiles
+                to calculate, each in range [0-1]
+            mock_ts (datetime | None): A mock timestamp to aid with testing
+                without the need of an external mocking framework
+
+        Raises:
+            ValueError: if the stock has no associated trade in the past 15 minutes
+
+        Returns:
+            the approximate price of each quantile (Dict[float, float])
+        """
+        n_minutes: PositiveInt = 15
+        quantiles = tuple(quantiles)
+        sketch = self.price_sketches.merged(
+            (symbol,),
+            since=timestamp_n_minutes_ago(n_minutes, mock_ts),
+            until=mock_ts
+        )
+        if not len(sketch):
+            raise ValueError(
+                f'Stock symbol {symbol} has no associated trade in'
+                f' last {n_minutes} minutes'
+            )
+        return dict(zip(quantiles, sketch.quantiles(quantiles)))
+
+
+class TradeDBTopKFormulasMixin:
+    """
+    Mixin class providing the most traded stocks for trade db,
+    answered from windowed trackers maintained on trade ingestion
+    """
+
+    def top_traded_symbols(
+        self,
+        k: PositiveInt = 20,
+        by: str = 'quantity',
+        n_minutes: PositiveInt = 15,
+        mock_ts: datetime | None = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Most traded stock symbols by quantity or notional in the past n minutes
+
+        The tracker of a window is registered on first use,
+        following queries are answered incrementally.
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            k (PositiveInt, default: 20): the number of symbols to return
+            by (str, default: quantity): the ranking metric, quantity or notional
+            n_minutes (PositiveInt, default: 15): the length of the window
+            mock_ts (datetime | None): A mock timestamp to aid with testing
+                without the need of an external mocking framework
+
+        Raises:
+            ValueError: if the metric is unknown or the window starts before the window
+                of the latest trade, whose older buckets expired
+
+        Returns:
+            pairs of symbol and total in descending order (List[Tuple[str, float]])
+        """
+        if n_minutes not in self.top_k_trackers:
+            self.track_top_k(n_minutes)
+        return self.top_k_trackers[n_minutes].top(k, by, mock_ts)
+
+
+class TradeDBCorrelationFormulasMixin:
+    """
+    Mixin class providing the correlation of stock returns for trade db,
+    answered from the bucketed returns maintained on trade ingestion
+    """
+
+    def _return_correlation(self):
+        "The tracker, configured with the defaults on first use"
+        if self.correlation is None:
+            self.configure_correlation()
+        return self.correlation
+
+    def close_return_buckets(self, until: datetime | None = None):
+        """
+        Close the return buckets ended by a timestamp when no trade arrived since,
+        e.g. on a refresh timer of a live session, later trades of closed buckets
+        are ignored by the tracker
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            until (datetime | None): the timestamp, the process clock if not given
+        """
+        self._return_correlation().advance(to_ns(until) if until is not None else now_ns())
+
+    def return_covariance(self, symbols: Iterable[str] | None = None) -> List[List[float]]:
+        """
+        Covariance matrix of the bucketed log returns of stocks over the window
+        of buckets closed by the trades, or by `close_return_buckets`
+
+        The tracker is configured with one minute buckets over an hour
+        on first use, see `configure_correlation`.
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            symbols (Iterable[str] | None): the rows and columns, all tracked stocks if not given
+
+        Raises:
+            KeyError: if a stock is not tracked
+            ValueError: if fewer than 2 buckets closed
+
+        Returns:
+            the symmetric matrix in the order of the symbols, those of
+                `correlation.symbols` if not given (List[List[float]])
+        """
+        return self._return_correlation().covariance(symbols)
+
+    def return_correlation(self, symbols: Iterable[str] | None = None) -> List[List[float]]:
+        """
+        Correlation matrix of the bucketed log returns of stocks over the window,
+        see `return_covariance`
+
+        Attributes:
+            self (TradeDB): this mixin expects to be interfaced with TradeDB
+            symbols (Iterable[str] | None): the rows and columns, all tracked stocks if not given
+
+        Raises:
+            KeyError: if a stock is not tracked
+            ValueError: if fewer than 2 buckets closed
+
+        Returns:
+            the symmetric matrix in the order of the symbols, nan for stocks
+                whose price did not move in the window (List[List[float]])
+        """
+        return self._return_correlation().correlation(symbols)
@@ -0,0 +1,253 @@
+"""
+Opt-in hot path instrumentation
+
+Latency histograms and counters for ingestion, validation, csv parsing
+and formulas. Instrumentation is disabled by default, a disabled timed
+call costs a single flag check. Enable it with `METRICS.enable()` or by
+setting `GBCE_METRICS=1`.
+
+Example:
+    METRICS.enable()
+    METRICS.start_dump('metrics.ndjson', interval=60.)
+    ...
+    print(METRICS.stats())
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from os import environ
+from pathlib import Path
+from threading import Event, Thread
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, Iterator
+
+
+class Histogram:
+    """
+    HDR style latency histogram of nanosecond values
+
+    Values below 64ns are recorded exactly, above that every power of two
+    is split in 32 linear sub-buckets, a relative precision of about 3%.
+    """
+    _SUB_BITS: int = 5
+    _SUB: int = 1 << _SUB_BITS
+
+    def __init__(self):
+        self.counts = [0] * (2 * self._SUB + 58 * self._SUB)
+        self.count = 0
+        self.total = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < 2 * cls._SUB:
+            return value
+        shift = value.bit_length() - cls._SUB_BITS - 1
+        return 2 * cls._SUB + (shift - 1) * cls._SUB + (value >> shift) - cls._SUB
+
+    @classmethod
+    def _highest_value(cls, index: int) -> int:
+        if index < 2 * cls._SUB:
+            return index
+        shift, sub = divmod(index - 2 * cls._SUB, cls._SUB)
+        return ((sub + cls._SUB + 1) << (shift + 1)) - 1
+
+    def record(self, value: int):
+        """
+        Record a value
+
+        Attributes:
+            value (int): a latency in nanoseconds
+        """
+        value = max(value, 0)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> int | None:
+        """
+        Value at a percentile, the highest value equivalent to its bucket
+
+        Attributes:
+            q (float): the percentile in range [0-100]
+
+        Returns:
+            the value in nanoseconds, None if nothing was recorded (int | None)
+        """
+        if not self.count:
+            return None
+        target, cumulative = max(1, round(q / 100 * self.count)), 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return min(self._highest_value(index), self.max)
+        return self.max
+
+    def reset(self):
+        "Drop recorded values"
+        self.__init__()
+
+    def summary(self) -> Dict[str, float | int | None]:
+        "Count, extremes, mean and percentiles in nanoseconds"
+        return {
+            'count': self.count,
+            'min_ns': self.min,
+            'mean_ns': self.total / self.count if self.count else None,
+            'p50_ns': self.percentile(50),
+            'p90_ns': self.percentile(90),
+            'p99_ns': self.percentile(99),
+            'p999_ns': self.percentile(99.9),
+            'max_ns': self.max,
+        }
+
+
+class Metrics:
+    """
+    Registry of histograms, counters and gauges
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], Any]] = {}
+        self.__dump_stop: Event | None = None
+
+    def enable(self):
+        "Start recording"
+        self.enabled = True
+
+    def disable(self):
+        "Stop recording, recorded values are kept"
+        self.enabled = False
+
+    def reset(self):
+        "Drop recorded values, registered histograms and gauges are kept"
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.counters.clear()
+
+    def histogram(self, name: str) -> Histogram:
+        "Get or register a histogram"
+        return self.histograms.setdefault(name, Histogram())
+
+    def count(self, name: str, n: int = 1):
+        """
+        Increment a counter if enabled
+
+        Attributes:
+            name (str): the counter name
+            n (int, default: 1): the increment
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def register_gauge(self, name: str, fn: Callable[[], Any]):
+        """
+        Register a value sampled on every stats call e.g. the size of a db
+
+        Attributes:
+            name (str): the gauge name
+            fn (Callable[[], Any]): returns the current value
+        """
+        self.gauges[name] = fn
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Time a block into a histogram if enabled
+
+        Attributes:
+            name (str): the histogram name
+        """
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(perf_counter_ns() - start)
+
+    def timed(self, name: str) -> Callable:
+        """
+        Decorator timing every call into a histogram if enabled
+
+        Attributes:
+            name (str): the histogram name
+        """
+        histogram = self.histogram(name)
+
+        def decorator(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.record(perf_counter_ns() - start)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current counters, gauges and summaries of non empty histograms
+
+        Returns:
+            a JSON serializable snapshot of the metrics (Dict[str, Any])
+        """
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'enabled': self.enabled,
+            'counters': dict(self.counters),
+            'gauges': {name: fn() for name, fn in self.gauges.items()},
+            'histograms': {
+                name: histogram.summary()
+                for name, histogram in self.histograms.items() if histogram.count
+            },
+        }
+
+    def dump(self, path: Path | str):
+        """
+        Append the current stats as a JSON line to a file
+
+        Attributes:
+            path (Path | str): the file to append to
+        """
+        with open(path, 'a', encoding='utf-8') as dump_file:
+            dump_file.write(json.dumps(self.stats()) + '\n')
+
+    def start_dump(self, path: Path | str, interval: float = 60.):
+        """
+        Periodically dump stats from a background thread
+
+        Attributes:
+            path (Path | str): the file to append to
+            interval (float, default: 60.): seconds between dumps
+        """
+        self.stop_dump()
+        self.__dump_stop = stop = Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.dump(path)
+
+        Thread(target=run, name='metrics-dump', daemon=True).start()
+
+    def stop_dump(self):
+        "Stop the periodic dump if running"
+        if self.__dump_stop is not None:
+            self.__dump_stop.set()
+            self.__dump_stop = None
+
+
+METRICS: Metrics = Metrics(enabled=environ.get('GBCE_METRICS', '') not in ('', '0'))
@@ -3,12 +3,15 @@ Stock Trade model
 """
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
 from random import choices
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Tuple
 
 from pydantic import BaseModel, PositiveFloat, PositiveInt, validator
 
+from src.clock import from_ns, now_ns, to_ns
 from src.db.stock_db import StockDB
+from src.metrics import METRICS
 from src.models.stock import Stock
 from src.parsers.csv_parser import CsvParserMixin
 
@@ -36,12 +39,14 @@ class TransactionIndicator(str, Enum):
 
 class Trade(BaseModel, CsvParserMixin):
     """
-    Represents a trade transaction
+    Represents a trade transaction, the optional trade id identifies
+    redelivered trades
     """
     symbol: str
     price: PositiveFloat
     quantity: PositiveInt
     indicator: TransactionIndicator
+    trade_id: str | None = None
 
     # pylint: disable=R0903
     class Config:
@@ -50,19 +55,27 @@ class Trade(BaseModel, CsvParserMixin):
         str_strip_whitespace = True
         use_enum_values = True
 
-    if not StockDB.is_initialized():
-        raise AssertionError(
-            f'Class requires initialization of {StockDB.__name__}'
-        )
+    def __init__(self, **data: Any):
+        if not METRICS.enabled:
+            super().__init__(**data)
+            return
+        with METRICS.timer('trade.validation'):
+            super().__init__(**data)
 
     @validator('symbol', pre=True)
     @staticmethod
     def _validate_stock_symbol(value: str):
-        "Checks if symbol is in StockDB "
-        if value not in StockDB.symbols():
+        "Checks if symbol is in StockDB, initializes StockDB on first use"
+        if value not in StockDB():
             raise ValueError(f'Invalid stock symbol {value}')
         return value
 
+    @validator('trade_id', pre=True)
+    @staticmethod
+    def _empty_trade_id(value: Any):
+        "An empty trade id, e.g. an empty csv column, is no trade id"
+        return value if value != '' else None
+
     def get_stock(self) -> Stock:
         "Get stock from symbol reference"
         # pylint: disable=E1136
@@ -77,7 +90,8 @@ class Trade(BaseModel, CsvParserMixin):
         due to pydantic enforcing keyword arguments.
 
         This factory proivides an easy way to instantiate using
-        positional arguments
+        positional arguments, the optional trade id comes last so rows
+        without it still parse
         
         Attributes:
             cls (Trade type)
@@ -88,15 +102,38 @@ class Trade(BaseModel, CsvParserMixin):
             instantiated trade object (Trade)
         """
         return cls(
-            **{field: value for field, value in zip(cls.model_fields, field_values)}
+            **{field: value for field, value in zip(cls.positional_fields(), field_values)}
         )
 
+    @classmethod
+    def positional_fields(cls) -> List[str]:
+        "Field names in the order of `from_fields`, e.g. of csv columns"
+        return [field for field in cls.model_fields if field != 'trade_id'] + ['trade_id']
+
 class TradeWithTimestamp(Trade):
     """
-    Trade with timestamp
+    Trade with timestamp, the integer epoch of the timestamp is kept next
+    to it in `timestamp_ns` for the indexes and aggregates of the db
     """
     timestamp: datetime
 
+    @cached_property
+    def timestamp_ns(self) -> int:
+        "Timestamp in nanoseconds since the epoch, converted on first read unless set on creation"
+        return to_ns(self.timestamp)
+
+    def model_copy(
+        self,
+        *,
+        update: Dict[str, Any] | None = None,
+        deep: bool = False
+    ) -> "TradeWithTimestamp":
+        "Copy of the trade, the epoch is converted again if the timestamp is updated"
+        copy = super().model_copy(update=update, deep=deep)
+        if update and 'timestamp' in update:
+            copy.__dict__.pop('timestamp_ns', None)
+        return copy
+
     @classmethod
     def from_trade(
         cls,
@@ -110,12 +147,18 @@ class TradeWithTimestamp(Trade):
             cls
             trade (Trade): an instantiated trade object to init from
             mock_timestamp (datetime | None): a mock timestamp to insert
-                if not given the current timestamp is taken into account
+                if not given the current timestamp of the process clock is taken into account
         """
-        return cls(
-            timestamp=mock_timestamp or datetime.now(),
+        # the clock is read in nanoseconds, truncated to the microsecond of the datetime
+        timestamp = now_ns() // 1000 * 1000 if mock_timestamp is None else None
+        augmented = cls(
+            timestamp=mock_timestamp if timestamp is None else from_ns(timestamp),
             symbol=trade.symbol,
             price=trade.price,
             quantity=trade.quantity,
-            indicator=trade.indicator
+            indicator=trade.indicator,
+            trade_id=trade.trade_id
         )
+        if timestamp is not None:
+            augmented.__dict__['timestamp_ns'] = timestamp
+        return augmented
@@ -0,0 +1,138 @@
+"""
+Columnar batch of stock trades
+
+Holds trades as parallel columns, prices, quantities and integer epoch
+timestamps in typed arrays, so large batches are generated and
+validated without building a model per trade. Timestamps are truncated
+to microseconds on construction, the resolution of the datetimes of
+trade models, so the db indexes the timestamps its trades carry.
+"""
+
+from array import array
+from itertools import repeat
+from math import isfinite
+from typing import Iterable, Iterator, List
+
+from src.clock import from_ns
+from src.db.stock_db import StockDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+
+class TradeBatch:
+    """
+    Parallel columns of trades
+
+    Attributes:
+        symbols (List[str]): the stock symbols
+        prices (array): the prices, typecode d
+        quantities (array): the quantities, typecode q
+        indicators (List[str]): the transaction indicators, BUY or SELL
+        timestamps (array): the timestamps in nanoseconds since the epoch truncated
+            to microseconds, typecode q
+        trade_ids (List[str | None] | None): the optional trade ids
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        prices: Iterable[float],
+        quantities: Iterable[int],
+        indicators: List[str],
+        timestamps: Iterable[int],
+        trade_ids: List[str | None] | None = None
+    ):
+        self.symbols = symbols
+        self.prices = array('d', prices)
+        self.quantities = array('q', quantities)
+        self.indicators = indicators
+        self.timestamps = array('q', (timestamp - timestamp % 1000 for timestamp in timestamps))
+        self.trade_ids = trade_ids
+        if not (
+            len(self.symbols) == len(self.prices) == len(self.quantities)
+            == len(self.indicators) == len(self.timestamps)
+        ) or (trade_ids is not None and len(trade_ids) != len(self.symbols)):
+            raise ValueError('Batch columns must have the same length')
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __repr__(self) -> str:
+        return f'TradeBatch(trades={len(self)})'
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[TradeWithTimestamp]) -> "TradeBatch":
+        """
+        Build a batch from trade models
+
+        Attributes:
+            trades (Iterable[TradeWithTimestamp]): the trades
+
+        Returns:
+            the batch (TradeBatch)
+        """
+        trades = list(trades)
+        return cls(
+            [trade.symbol for trade in trades],
+            (trade.price for trade in trades),
+            (trade.quantity for trade in trades),
+            [trade.indicator for trade in trades],
+            (trade.timestamp_ns for trade in trades),
+            [trade.trade_id for trade in trades] if any(trade.trade_id for trade in trades)
+            else None
+        )
+
+    def validate(self):
+        """
+        Check the batch column by column, the checks of the trade model
+
+        Raises:
+            ValueError: if a symbol is not in StockDB, a price is not a positive
+                finite float, a quantity is not positive, an indicator is invalid
+                or a trade id is neither a string nor None
+        """
+        if self.trade_ids is not None:
+            if len(self.trade_ids) != len(self):
+                raise ValueError('Batch columns must have the same length')
+            if not all(trade_id is None or isinstance(trade_id, str) for trade_id in self.trade_ids):
+                raise ValueError('Trade ids must be strings or None')
+        if not self:
+            return
+        unknown = set(self.symbols).difference(StockDB())
+        if unknown:
+            raise ValueError(f'Invalid stock symbols {sorted(unknown)}')
+        if not all(isfinite(price) and price > 0 for price in self.prices):
+            raise ValueError('Prices must be positive finite floats')
+        if min(self.quantities) <= 0:
+            raise ValueError('Quantities must be positive')
+        invalid = set(self.indicators).difference(indicator.value for indicator in TransactionIndicator)
+        if invalid:
+            raise ValueError(f'Invalid transaction indicators {sorted(invalid)}')
+
+    def trades(self) -> Iterator[TradeWithTimestamp]:
+        """
+        Trade models of the batch, built without validation
+
+        Yields:
+            the trades in batch order (Iterator[TradeWithTimestamp])
+        """
+        # the steps of model_construct for a known set of fields, without its per call overhead
+        new, setattr_ = TradeWithTimestamp.__new__, object.__setattr__
+        fields = frozenset(TradeWithTimestamp.model_fields)
+        for symbol, price, quantity, indicator, timestamp, trade_id in zip(
+            self.symbols, self.prices, self.quantities, self.indicators, self.timestamps,
+            self.trade_ids if self.trade_ids is not None else repeat(None)
+        ):
+            trade = new(TradeWithTimestamp)
+            setattr_(trade, '__dict__', {
+                'symbol': symbol,
+                'price': price,
+                'quantity': quantity,
+                'indicator': indicator,
+                'trade_id': trade_id,
+                'timestamp': from_ns(timestamp),
+                'timestamp_ns': timestamp,
+            })
+            setattr_(trade, '__pydantic_fields_set__', set(fields))
+            setattr_(trade, '__pydantic_extra__', None)
+            setattr_(trade, '__pydantic_private__', None)
+            yield trade
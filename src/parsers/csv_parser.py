@@ -2,10 +2,17 @@
 CSV stock parsing utility module
 """
 
+import bz2
+import gzip
+import lzma
 from csv import reader
 from pathlib import Path
 from typing import Generator
 
+from src.metrics import METRICS
+
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
 
 # pylint: disable=R0903
 class CsvParserMixin:
@@ -19,7 +26,8 @@ class CsvParserMixin:
         Method that gets mixed in to target class.
 
         Requires the `from_fields` class method interface to build a target object
-        for each row and yields from a generator expression.
+        for each row and yields from a generator expression. Files with a
+        .gz, .bz2 or .xz suffix are decompressed on the fly.
 
         Attributes:
             cls (StockDB | TradeDB): expects the interface of either stock or trade db
@@ -41,7 +49,15 @@ class CsvParserMixin:
         if not hasattr(cls, _fn := "from_fields"):
             raise AttributeError(f"Classmethod {_fn} needs to be implemented")
 
-        with open(csv_path, encoding="utf-8") as csv_file:
+        opener = OPENERS.get(csv_path.suffix.lower(), open)
+        with opener(csv_path, 'rt', encoding="utf-8") as csv_file:
             csv_it = reader(csv_file)
             next(csv_it)  # pylint: disable=R1708
-            yield from (cls.from_fields(*row) for row in csv_it)
+            if not METRICS.enabled:
+                yield from (cls.from_fields(*row) for row in csv_it)
+                return
+            for row in csv_it:
+                with METRICS.timer('csv.row'):
+                    parsed = cls.from_fields(*row)
+                METRICS.count('csv.rows')
+                yield parsed
@@ -0,0 +1,261 @@
+"""
+Historical trade replay under a simulated clock
+
+Streams trades in timestamp order into a trade db while a simulated
+clock follows their timestamps, either as fast as possible or paced at N
+times real time. At every fixed simulated interval the index, the VWSP
+and the realized volatility of every traded symbol are sampled with the
+sample time as reference, so a session is backtested in seconds.
+
+Example:
+    python -m src.replay trades.csv --interval 60 --output series.ndjson
+    python -m src.replay trades.csv --speed 60 --format csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timedelta
+from time import perf_counter, sleep
+from typing import IO, Any, Dict, Iterable, Iterator, List
+
+from pydantic import PositiveInt
+
+from src.clock import NS_PER_SECOND, from_ns, to_ns, use_clock
+from src.db.trade_db import TradeDB
+
+
+class SimulatedClock:
+    """
+    Clock following replayed timestamps, the process clock while a replay computes
+
+    Attributes:
+        speed (float | None): simulated seconds per wall clock second,
+            None to run as fast as possible
+    """
+
+    def __init__(self, speed: float | None = None):
+        if speed is not None and speed <= 0:
+            raise ValueError('Speed must be positive')
+        self.speed = speed
+        # simulated times in nanoseconds since the epoch
+        self.__now: int | None = None
+        self.__origin: int | None = None
+        self.__wall_origin = 0.
+
+    def now(self) -> datetime:
+        """
+        The simulated time
+
+        Raises:
+            ValueError: if the clock was never advanced
+        """
+        return from_ns(self.now_ns())
+
+    def now_ns(self) -> int:
+        """
+        The simulated time in nanoseconds since the epoch
+
+        Raises:
+            ValueError: if the clock was never advanced
+        """
+        if self.__now is None:
+            raise ValueError('Simulated clock is not started')
+        return self.__now
+
+    def advance_to(self, ts: datetime):
+        """
+        Move the clock forward, in paced mode sleep until the wall clock catches up
+
+        Attributes:
+            ts (datetime): the new simulated time, earlier times are ignored
+        """
+        self.advance_to_ns(to_ns(ts))
+
+    def advance_to_ns(self, timestamp_ns: int):
+        """
+        Move the clock forward to a time in nanoseconds since the epoch, see `advance_to`
+
+        Attributes:
+            timestamp_ns (int): the new simulated time, earlier times are ignored
+        """
+        if self.__now is None:
+            self.__now = self.__origin = timestamp_ns
+            self.__wall_origin = perf_counter()
+            return
+        if timestamp_ns <= self.__now:
+            return
+        self.__now = timestamp_ns
+        if self.speed is not None:
+            wall = self.__wall_origin + (timestamp_ns - self.__origin) / NS_PER_SECOND / self.speed
+            if (delay := wall - perf_counter()) > 0:
+                sleep(delay)
+
+
+class Replay:
+    """
+    Replays trades into a trade db and samples its formulas
+
+    Attributes:
+        trades (Iterable[TradeWithTimestamp]): historical trades in timestamp order
+        interval (timedelta, default: 1 minute): simulated time between samples
+        speed (float | None): N times real time, None to run as fast as possible
+        n_minutes (PositiveInt, default: 15): the VWSP window
+        db (TradeDB | None): the db to replay into, the singleton if not given
+    """
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        trades: Iterable,
+        interval: timedelta = timedelta(minutes=1),
+        speed: float | None = None,
+        n_minutes: PositiveInt = 15,
+        db=None
+    ):
+        if interval <= timedelta(0):
+            raise ValueError('Sampling interval must be positive')
+        self.trades = trades
+        self.interval = interval
+        self.n_minutes = n_minutes
+        self.clock = SimulatedClock(speed)
+        self.db = db if db is not None else TradeDB()
+
+    def sample(self, ts: datetime) -> Dict[str, Any]:
+        """
+        Formulas of the db as of a simulated time
+
+        Attributes:
+            ts (datetime): the reference timestamp
+
+        Returns:
+            the number of trades, the index and per symbol VWSP and
+                volatility, None where undefined (Dict[str, Any])
+        """
+        vwsp: Dict[str, float | None] = {}
+        for symbol in self.db.symbol_time_indexes:
+            try:
+                vwsp[symbol] = self.db.volume_weighted_stock_price(symbol, ts, self.n_minutes)
+            except ValueError:
+                vwsp[symbol] = None
+        return {
+            'timestamp': ts.isoformat(),
+            'trades': len(self.db),
+            'gbce_all_share_index': self.db.share_index.value,
+            'volume_weighted_stock_price': vwsp,
+            'realized_volatility': self.db.ewma.volatilities(),
+        }
+
+    def run(self) -> Iterator[Dict[str, Any]]:
+        """
+        Replay all trades
+
+        Samples are taken at multiples of the interval from the first
+        trade, each one once the trades up to it are added, the last one
+        after the last trade. The simulated clock is the process clock
+        only until the next sample is ready, the previous clock is back
+        whenever a sample is yielded, so the caller and an abandoned
+        replay never run under the simulated clock.
+
+        Yields:
+            the samples in simulated time order (Iterator[Dict[str, Any]])
+        """
+        samples = self.__samples()
+        while True:
+            with use_clock(self.clock):
+                sample = next(samples, None)
+            if sample is None:
+                return
+            yield sample
+
+    def __samples(self) -> Iterator[Dict[str, Any]]:
+        "Add trades and sample, see `run`, under whatever clock is installed"
+        # simulated times are followed in integer nanoseconds, samples are stamped in datetime
+        interval = self.interval // timedelta(microseconds=1) * 1000
+        next_sample: int | None = None
+        for trade in self.trades:
+            timestamp = trade.timestamp_ns
+            if next_sample is None:
+                next_sample = timestamp + interval
+            while timestamp > next_sample:
+                self.clock.advance_to_ns(next_sample)
+                yield self.sample(from_ns(next_sample))
+                next_sample += interval
+            self.clock.advance_to_ns(timestamp)
+            self.db.add(trade)
+        if next_sample is not None:
+            self.clock.advance_to_ns(next_sample)
+            yield self.sample(from_ns(next_sample))
+
+
+def write_series(samples: Iterable[Dict[str, Any]], stream: IO[str], fmt: str = 'ndjson') -> int:
+    """
+    Stream samples, NDJSON writes one sample per line, CSV one row per
+    timestamp, metric and symbol
+
+    Attributes:
+        samples (Iterable[Dict[str, Any]]): the replay samples
+        stream (IO[str]): the output stream
+        fmt (str, default: 'ndjson'): either ndjson or csv
+
+    Raises:
+        ValueError: if the format is unknown
+
+    Returns:
+        the number of samples written (int)
+    """
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError(f'Unknown output format {fmt}')
+    written = 0
+    if fmt == 'ndjson':
+        for written, sample in enumerate(samples, start=1):
+            stream.write(json.dumps(sample) + '\n')
+        return written
+
+    writer = csv.writer(stream, lineterminator='\n')
+    writer.writerow(('timestamp', 'metric', 'symbol', 'value'))
+    for written, sample in enumerate(samples, start=1):
+        ts = sample['timestamp']
+        writer.writerow((ts, 'trades', '', sample['trades']))
+        writer.writerow((ts, 'gbce_all_share_index', '', sample['gbce_all_share_index']))
+        for metric in ('volume_weighted_stock_price', 'realized_volatility'):
+            writer.writerows((ts, metric, symbol, value) for symbol, value in sample[metric].items())
+    return written
+
+
+def main(argv: List[str] | None = None) -> int:
+    "Replay a trades csv file and write the sampled series"
+    # pylint: disable=C0415
+    from src.models.trade import TradeWithTimestamp
+
+    parser = argparse.ArgumentParser(description='Replay historical trades under a simulated clock')
+    parser.add_argument('trades', help='csv file of trades with timestamp, in timestamp order')
+    parser.add_argument('--interval', type=float, default=60.,
+                        help='simulated seconds between samples')
+    parser.add_argument('--speed', type=float,
+                        help='N times real time, as fast as possible if not given')
+    parser.add_argument('--n-minutes', type=int, default=15, help='VWSP window in minutes')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson', help='output format')
+    parser.add_argument('--output', help='write the series to a file instead of stdout')
+    args = parser.parse_args(argv)
+
+    replay = Replay(
+        TradeWithTimestamp.from_csv(args.trades), timedelta(seconds=args.interval),
+        args.speed, args.n_minutes
+    )
+    start = perf_counter()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            samples = write_series(replay.run(), output, args.format)
+    else:
+        samples = write_series(replay.run(), sys.stdout, args.format)
+    print(
+        f'Replayed {len(replay.db)} trades, {samples} samples in {perf_counter() - start:.2f}s',
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
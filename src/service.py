@@ -0,0 +1,308 @@
+"""
+HTTP/JSON query service over StockDB and TradeDB
+
+A stdlib only asyncio HTTP/1.1 server. Connections are kept alive and
+pipelined requests are answered in order, connections beyond the limit
+are refused with a 503. Reads are served from the maintained aggregates
+of the trade db: the running log price index, the query cache and the
+per symbol time indexes.
+
+Endpoints, all GET, price batches may also be POSTed as a JSON list:
+    /stocks                                 listed stocks
+    /stocks/{symbol}/dividend_yield?prices=10,20
+    /stocks/{symbol}/pe_ratio?prices=10,20
+    /vwsp?n_minutes=15                      VWSP of every traded symbol
+    /vwsp/{symbol}?n_minutes=15             VWSP of a symbol
+    /index                                  GBCE all share index
+
+Example:
+    python -m src.service --port 8080 --trades trades.csv
+    curl 'localhost:8080/stocks/GIN/pe_ratio?prices=10,20'
+"""
+
+import argparse
+import asyncio
+import json
+from http import HTTPStatus
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.db.stock_db import StockDB
+from src.db.trade_db import TradeDB
+from src.metrics import METRICS
+from src.utilities import parse_price
+
+
+class HTTPError(Exception):
+    """
+    Error answered with a HTTP status
+
+    Attributes:
+        status (HTTPStatus): the response status
+        message (str): the error message
+    """
+
+    def __init__(self, status: HTTPStatus, message: str | None = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class QueryService:
+    """
+    Asyncio HTTP server answering formula queries
+
+    Attributes:
+        max_connections (int, default: 256): connections served concurrently
+        keep_alive_timeout (float, default: 5.): seconds an idle connection is kept open
+        max_body (int, default: 1 MiB): the largest accepted request body in bytes
+        max_headers (int, default: 100): the most header lines accepted per request
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 256,
+        keep_alive_timeout: float = 5.,
+        max_body: int = 1 << 20,
+        max_headers: int = 100
+    ):
+        self.max_connections = max_connections
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_body = max_body
+        self.max_headers = max_headers
+        self.__connections = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.Server:
+        """
+        Start listening
+
+        Attributes:
+            host (str, default: '127.0.0.1'): the interface to bind
+            port (int, default: 8080): the port to bind, 0 for any free port
+
+        Returns:
+            the listening server (asyncio.Server)
+        """
+        return await asyncio.start_server(self.__serve, host, port)
+
+    def route(self, method: str, target: str, body: bytes = b'') -> Any:
+        """
+        Answer a request
+
+        Attributes:
+            method (str): the HTTP method
+            target (str): the request target, path and query
+            body (bytes): the request body
+
+        Raises:
+            HTTPError: if the request can not be answered
+
+        Returns:
+            the JSON serializable response payload (Any)
+        """
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+        if method not in ('GET', 'POST'):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        if method == 'POST' and (len(parts) != 3 or parts[0] != 'stocks'):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        try:
+            match parts:
+                case ['stocks']:
+                    return [stock.model_dump(mode='json') for stock in StockDB().values()]
+                case ['stocks', symbol, ('dividend_yield' | 'pe_ratio') as formula]:
+                    prices = self.__prices(query, body)
+                    # pylint: disable=E1136
+                    return {
+                        'symbol': symbol,
+                        'prices': prices,
+                        formula: [getattr(StockDB()[symbol], formula)(price) for price in prices],
+                    }
+                case ['vwsp']:
+                    n_minutes = self.__n_minutes(query)
+                    return {
+                        symbol: self.__vwsp(symbol, n_minutes)
+                        for symbol in TradeDB().symbol_time_indexes  # pylint: disable=E1101
+                    }
+                case ['vwsp', symbol]:
+                    n_minutes = self.__n_minutes(query)
+                    return {
+                        'symbol': symbol,
+                        'n_minutes': n_minutes,
+                        'volume_weighted_stock_price': TradeDB().volume_weighted_stock_price(  # pylint: disable=E1101
+                            symbol, n_minutes=n_minutes
+                        ),
+                    }
+                case ['index']:
+                    return {'gbce_all_share_index': TradeDB().share_index.value}  # pylint: disable=E1101
+        except KeyError as exc:
+            raise HTTPError(HTTPStatus.NOT_FOUND, str(exc).strip("'")) from exc
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc)) from exc
+        raise HTTPError(HTTPStatus.NOT_FOUND, f'No such endpoint {url.path}')
+
+    @staticmethod
+    def __prices(query: Dict[str, List[str]], body: bytes) -> List[float]:
+        "Prices from the query string or a JSON list body, all must be positive"
+        if body:
+            values = json.loads(body)
+            if not isinstance(values, list):
+                raise ValueError('Body should be a JSON list of prices')
+        else:
+            values = [value for values in query.get('prices', ()) for value in values.split(',')]
+        if not values:
+            raise ValueError('No prices given')
+        return [parse_price(value) for value in values]
+
+    @staticmethod
+    def __n_minutes(query: Dict[str, List[str]]) -> int:
+        n_minutes = int(query.get('n_minutes', ['15'])[0])
+        if n_minutes <= 0:
+            raise ValueError('n_minutes should be a positive integer')
+        return n_minutes
+
+    @staticmethod
+    def __vwsp(symbol: str, n_minutes: int) -> float | None:
+        "VWSP of a symbol, None if it has no trade in the window"
+        try:
+            return TradeDB().volume_weighted_stock_price(symbol, n_minutes=n_minutes)  # pylint: disable=E1101
+        except ValueError:
+            return None
+
+    @staticmethod
+    def __response(status: HTTPStatus, payload: Any, keep_alive: bool) -> bytes:
+        body = json.dumps(payload).encode()
+        return (
+            f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        ).encode('latin-1') + body
+
+    async def __read_request(
+        self,
+        reader: asyncio.StreamReader
+    ) -> Tuple[str, str, bytes, bool] | None:
+        """
+        Read the next request of a connection
+
+        Raises:
+            HTTPError: if the request is malformed, has too many headers or its body is too large
+
+        Returns:
+            method, target, body and keep alive, None on end of stream
+                (Tuple[str, str, bytes, bool] | None)
+        """
+        request_line = await asyncio.wait_for(reader.readline(), self.keep_alive_timeout)
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Malformed request line') from exc
+
+        headers: Dict[str, str] = {}
+        n_lines = 0
+        while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+            n_lines += 1
+            if n_lines > self.max_headers:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Malformed Content-Length') from exc
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Malformed Content-Length')
+        if length > self.max_body:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b''
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method, target, body, keep_alive
+
+    async def __serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        "Answer the requests of a connection in order until it is closed"
+        if self.__connections >= self.max_connections:
+            writer.write(self.__response(
+                HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'Too many connections'}, False
+            ))
+            await writer.drain()
+            writer.close()
+            return
+
+        self.__connections += 1
+        try:
+            while True:
+                try:
+                    request = await self.__read_request(reader)
+                except HTTPError as exc:
+                    writer.write(self.__response(exc.status, {'error': str(exc)}, False))
+                    break
+                if request is None:
+                    break
+
+                method, target, body, keep_alive = request
+                with METRICS.timer('service.request'):
+                    try:
+                        status, payload = HTTPStatus.OK, self.route(method, target, body)
+                    except HTTPError as exc:
+                        status, payload = exc.status, {'error': str(exc)}
+                    except Exception:  # pylint: disable=W0718
+                        # answered so the connection and its pipelined requests survive
+                        METRICS.count('service.errors')
+                        status = HTTPStatus.INTERNAL_SERVER_ERROR
+                        payload = {'error': status.phrase}
+                writer.write(self.__response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.__connections -= 1
+            writer.close()
+
+
+async def serve(host: str, port: int, **kwargs: Any):
+    "Serve until cancelled"
+    server = await QueryService(**kwargs).start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: List[str] | None = None):
+    "Load trades and serve"
+    # pylint: disable=C0415
+    from src.models.trade import TradeWithTimestamp
+    from src.utilities import gen_trade_batches
+
+    parser = argparse.ArgumentParser(description='HTTP/JSON query service over StockDB and TradeDB')
+    parser.add_argument('--host', default='127.0.0.1', help='interface to bind')
+    parser.add_argument('--port', type=int, default=8080, help='port to bind')
+    parser.add_argument('--max-connections', type=int, default=256,
+                        help='connections served concurrently, others get a 503')
+    parser.add_argument('--trades', help='csv file of trades with timestamp to load')
+    parser.add_argument('--random-trades', type=int, default=150,
+                        help='number of random trades to register if no trades file is given')
+    args = parser.parse_args(argv)
+
+    if args.trades:
+        for trade in TradeWithTimestamp.from_csv(args.trades):
+            TradeDB().add(trade)  # pylint: disable=E1101
+    else:
+        for batch in gen_trade_batches(args.random_trades):
+            TradeDB().add_batch(batch, validate=False)  # pylint: disable=E1101
+
+    try:
+        asyncio.run(serve(args.host, args.port, max_connections=args.max_connections))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
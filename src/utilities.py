@@ -1,25 +1,51 @@
 """
 Various helper functions and db initializations
+
+The `STOCKS` and `TRADES` singletons are initialized lazily on first
+access, importing this module neither parses the stocks csv nor imports
+the trade db and its models. Set `GBCE_STOCKS_CSV` or call
+`StockDB.configure` before first use to load stocks from another file.
 """
 
-from datetime import datetime, timedelta
-from random import random, randrange
-from typing import Generator
+from array import array
+from datetime import datetime
+from itertools import accumulate
+from math import exp, isfinite
+from random import Random, random, randrange
+from typing import TYPE_CHECKING, Any, Generator, Iterable, Literal
 
-from pydantic import PositiveFloat
+if TYPE_CHECKING:
+    from pydantic import PositiveFloat
 
-from src.db.stock_db import StockDB
+    from src.db.stock_db import StockDB
+    from src.db.trade_db import TradeDB
+    from src.models.trade import TradeWithTimestamp
+    from src.models.trade_batch import TradeBatch
 
-STOCKS: StockDB = StockDB.create(r'gbce.csv')
+STOCKS: "StockDB"
+TRADES: "TradeDB"
 
-from src.models.trade import TradeWithTimestamp, TransactionIndicator  # pylint: disable=C0413
 
-from src.db.trade_db import TradeDB  # pylint: disable=C0413
+def __getattr__(name: str) -> Any:
+    """
+    Lazily initialize the db singletons on first access
 
-TRADES: TradeDB = TradeDB()
+    Attributes:
+        name (str): the module attribute being looked up
+
+    Raises:
+        AttributeError: if the attribute is not a lazy singleton
+    """
+    if name == 'STOCKS':
+        from src.db.stock_db import StockDB  # pylint: disable=C0415
+        return StockDB()
+    if name == 'TRADES':
+        from src.db.trade_db import TradeDB  # pylint: disable=C0415
+        return TradeDB()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
-def parse_price(value: str) -> PositiveFloat:
+def parse_price(value: str) -> "PositiveFloat":
     """
     Parse price to positive float
     Mainly used in the main price prompt
@@ -34,12 +60,15 @@ def parse_price(value: str) -> PositiveFloat:
         teh converted price (PositiveFloat)
     """
     try:
-        return PositiveFloat(value)
-    except ValueError as ex:
+        price = float(value)
+    except (TypeError, ValueError) as ex:
         raise ValueError('Price should be a positive float') from ex
+    if not (isfinite(price) and price > 0):
+        raise ValueError('Price should be a positive float')
+    return price
 
 
-def gen_k_random_trades(k: int = 5) -> Generator[TradeWithTimestamp, None, None]:
+def gen_k_random_trades(k: int = 5) -> Generator["TradeWithTimestamp", None, None]:
     """
     Boilerplate random trades generation
 
@@ -49,12 +78,17 @@ def gen_k_random_trades(k: int = 5) -> Generator[TradeWithTimestamp, None, None]
     Yields:
         a genrator of trades with timestamp
     """
+    # pylint: disable=C0415,W0621
+    from src.clock import NS_PER_MINUTE, from_ns, now_ns
+    from src.db.stock_db import StockDB
+    from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
     def random_timestamp():
-        return datetime.now() - timedelta(minutes=randrange(60))
+        return from_ns(now_ns() - randrange(60) * NS_PER_MINUTE)
 
     for ts, stock_symbol, stock_price, quantity, indicator in zip(
         (random_timestamp() for _ in range(k)),
-        STOCKS.get_k_random_symbols(k),
+        StockDB().get_k_random_symbols(k),
         (round(100 * random() + 1e-4, 4) for _ in range(k)),
         (randrange(1, 50) for _ in range(k)),
         TransactionIndicator.get_k_random_indicators(k)
@@ -66,3 +100,81 @@ def gen_k_random_trades(k: int = 5) -> Generator[TradeWithTimestamp, None, None]
             quantity=quantity,
             indicator=indicator
         )
+
+
+# pylint: disable=R0913,R0914
+def gen_trade_batches(
+    n: int,
+    batch_size: int = 100_000,
+    symbols: Iterable[str] | None = None,
+    distribution: Literal['uniform', 'zipf'] = 'uniform',
+    zipf_exponent: float = 1.1,
+    volatility: float = 1e-3,
+    rate: float = 100.,
+    start: datetime | None = None,
+    seed: int | None = None
+) -> Generator["TradeBatch", None, None]:
+    """
+    Columnar random trades generation for load tests, meant for `TradeDB.add_batch`
+
+    Symbols are drawn uniformly or by a Zipf law over their order, the
+    price of every symbol follows a geometric random walk and arrivals
+    follow a Poisson process, inter-arrival times are exponential.
+
+    Attributes:
+        n (int): the total number of trades
+        batch_size (int, default: 100_000): the maximum number of trades per batch
+        symbols (Iterable[str] | None): the symbols to draw from, all of StockDB if not given
+        distribution (Literal['uniform', 'zipf'], default: 'uniform'): the symbol distribution
+        zipf_exponent (float, default: 1.1): the exponent of the Zipf law
+        volatility (float, default: 1e-3): standard deviation of the log return per trade
+        rate (float, default: 100.): mean number of trades per second
+        start (datetime | None): timestamp of the arrival process start,
+            if not given trades end around the current timestamp
+        seed (int | None): random seed, batches are reproducible for a given seed
+
+    Raises:
+        ValueError: if the distribution is unknown
+
+    Yields:
+        a generator of trade batches in ascending timestamp order
+    """
+    # pylint: disable=C0415,W0621
+    from src.clock import NS_PER_SECOND, now_ns, to_ns
+    from src.db.stock_db import StockDB
+    from src.models.trade_batch import TradeBatch
+
+    rng = Random(seed)
+    symbols = list(symbols) if symbols is not None else StockDB().symbols()
+    if distribution == 'uniform':
+        cum_weights = None
+    elif distribution == 'zipf':
+        cum_weights = list(accumulate(rank ** -zipf_exponent for rank in range(1, len(symbols) + 1)))
+    else:
+        raise ValueError(f'Unknown symbol distribution {distribution}')
+
+    last_prices = {symbol: round(rng.uniform(1., 100.), 4) for symbol in symbols}
+    clock = to_ns(start) if start is not None else now_ns() - round(n / rate * NS_PER_SECOND)
+    gauss, expovariate, uniform = rng.gauss, rng.expovariate, rng.random
+
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        batch_symbols = rng.choices(symbols, cum_weights=cum_weights, k=size)
+
+        prices = array('d', bytes(8 * size))
+        for i, symbol in enumerate(batch_symbols):
+            price = max(round(last_prices[symbol] * exp(gauss(0., volatility)), 4), 1e-4)
+            prices[i] = last_prices[symbol] = price
+
+        timestamps = array('q', accumulate(
+            (round(expovariate(rate) * NS_PER_SECOND) for _ in range(size)), initial=clock
+        ))
+        del timestamps[0]
+        clock = timestamps[-1]
+        yield TradeBatch(
+            batch_symbols,
+            prices,
+            (int(49 * uniform()) + 1 for _ in range(size)),
+            rng.choices(('BUY', 'SELL'), k=size),
+            timestamps
+        )
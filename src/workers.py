@@ -0,0 +1,146 @@
+"""
+Multi-process query workers over shared memory trades
+
+The ingest process publishes its trades with
+`TradeDB.configure_shared_memory()`, a pool of worker processes attaches
+the segment read-only once at start and answers VWSP, index and batch
+queries in parallel, one core each. Only queries and results cross
+process boundaries, trades are read in place.
+
+Example:
+    store = TradeDB().configure_shared_memory(capacity=10_000_000)
+    with QueryWorkers(store.name, processes=8) as workers:
+        prices = workers.volume_weighted_stock_prices(['TEA', 'POP'])
+"""
+
+from itertools import islice
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import PositiveInt
+
+from src.clock import ManualClock, now_ns, use_clock
+from src.db.shared_trades import SharedTradeView
+
+_view: SharedTradeView | None = None
+
+
+def _attach(name: str):
+    "Worker initializer, attaches the shared trades once per process"
+    global _view  # pylint: disable=W0603
+    _view = SharedTradeView(name)
+
+
+def _vwsp(query: Tuple[str, int, int]) -> float | None:
+    symbol, reference, n_minutes = query
+    try:
+        return _view.volume_weighted_stock_price(symbol, n_minutes=n_minutes, reference=reference)
+    except ValueError:
+        return None
+
+
+def _index(_: Any = None) -> float | None:
+    try:
+        return _view.gbce_all_share_index()
+    except ValueError:
+        return None
+
+
+def _evaluate(task: Tuple[List[Tuple[str, str]], Tuple[str, ...], int]) -> List[Dict[str, Any]]:
+    # pylint: disable=C0415
+    from src.batch import evaluate
+
+    queries, formulas, reference = task
+    # windows end at the caller's time, not the worker's
+    with use_clock(ManualClock(reference)):
+        return list(evaluate(queries, _view, formulas))
+
+
+class QueryWorkers:
+    """
+    Pool of processes answering queries from a shared trade store
+
+    Attributes:
+        name (str): the segment name of the shared trade store
+        processes (PositiveInt | None): the number of workers, one per core if not given
+        start_method (str | None): the multiprocessing start method, the platform default if not given
+    """
+
+    def __init__(
+        self,
+        name: str,
+        processes: PositiveInt | None = None,
+        start_method: str | None = None
+    ):
+        self.name = name
+        self.__pool = get_context(start_method).Pool(processes, _attach, (name,))
+
+    def __enter__(self) -> "QueryWorkers":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def volume_weighted_stock_prices(
+        self,
+        symbols: Iterable[str],
+        n_minutes: PositiveInt = 15,
+        reference: int | None = None
+    ) -> Dict[str, float | None]:
+        """
+        VWSP of many stocks in parallel
+
+        Attributes:
+            symbols (Iterable[str]): the symbols
+            n_minutes (PositiveInt, default: 15): the length of the window of trades
+            reference (int | None): the window end in nanoseconds since the epoch,
+                the process clock of the caller if not given
+
+        Returns:
+            the VWSP per symbol, None where there is no trade in the window
+                (Dict[str, float | None])
+        """
+        reference = reference if reference is not None else now_ns()
+        symbols = list(symbols)
+        return dict(zip(symbols, self.__pool.map(
+            _vwsp, [(symbol, reference, n_minutes) for symbol in symbols]
+        )))
+
+    def gbce_all_share_index(self) -> float | None:
+        "The index as published by the ingest process, None if there is no trade"
+        return self.__pool.apply(_index)
+
+    def evaluate(
+        self,
+        queries: Iterable[Tuple[str, str]],
+        formulas: Iterable[str] | None = None,
+        chunk_size: PositiveInt = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Batch queries evaluated in parallel chunks, see `src.batch.evaluate`
+
+        Attributes:
+            queries (Iterable[Tuple[str, str]]): symbol and unparsed price pairs
+            formulas (Iterable[str] | None): the formulas to evaluate, all if not given
+            chunk_size (PositiveInt, default: 1000): queries per task
+
+        Yields:
+            a result per query in query order (Iterator[Dict[str, Any]])
+        """
+        # pylint: disable=C0415
+        from src.batch import FORMULAS
+
+        formulas = tuple(formulas) if formulas is not None else FORMULAS
+        if unknown := set(formulas).difference(FORMULAS):
+            raise ValueError(f'Unknown formulas {sorted(unknown)}')
+        queries, reference = iter(queries), now_ns()
+        chunks = iter(lambda: list(islice(queries, chunk_size)), [])
+        for results in self.__pool.imap(
+            _evaluate, ((chunk, formulas, reference) for chunk in chunks)
+        ):
+            yield from results
+
+    def close(self):
+        "Stop the workers"
+        self.__pool.terminate()
+        self.__pool.join()
@@ -0,0 +1,80 @@
+"""
+Tests targeting basket indices
+"""
+
+import unittest
+from math import exp, fsum, log
+
+from pydantic import ValidationError
+
+from src.aggregates.basket_index import Basket
+from src.db.trade_db import TradeDB
+from src.models.stock_type import StockType
+from src.utilities import STOCKS, gen_trade_batches  # pylint: disable=W0611
+
+
+def geometric_mean(prices) -> float:
+    "Reference geometric mean"
+    prices = list(prices)
+    return exp(fsum(map(log, prices)) / len(prices))
+
+
+class TestBasketIndices(unittest.TestCase):
+    """
+    Test incremental basket indices against full recomputations
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+        self.batches = gen_trade_batches(3_000, batch_size=1_000, seed=10)
+        self.db.add_batch(next(self.batches), validate=False)  # pylint: disable=E1101
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def expected(self, basket: Basket) -> float:
+        "Index of a basket recomputed from all trades"
+        return geometric_mean(trade.price for trade in self.db if trade.symbol in basket.symbols)
+
+    def test_incremental(self):
+        """
+        Indices registered before or during ingestion match recomputations
+        """
+        common = Basket.of_type('COMMON', StockType.COMMON)
+        preferred = Basket.of_type('PREFERRED', StockType.PREFERRED)
+        drinks = Basket(name='DRINKS', symbols={'TEA', 'GIN', 'POP'})
+        self.assertEqual(preferred.symbols, {'GIN'})
+        for basket in (common, preferred, drinks):
+            self.db.register_basket(basket)  # pylint: disable=E1101
+        for batch in self.batches:
+            self.db.add_batch(batch, validate=False)  # pylint: disable=E1101
+
+        for basket in (common, preferred, drinks):
+            self.assertAlmostEqual(self.db.basket_index(basket.name), self.expected(basket))  # pylint: disable=E1101
+        self.assertEqual(len(self.db.basket_indices), 3)  # pylint: disable=E1101
+
+    def test_lifecycle(self):
+        """
+        Baskets are validated, replaced, unregistered and cleared
+        """
+        with self.assertRaises(ValidationError):
+            Basket(name='BAD', symbols={'TEA', 'XYZ'})
+        with self.assertRaises(ValidationError):
+            Basket(name='EMPTY', symbols=set())
+
+        self.db.register_basket(Basket(name='B', symbols={'TEA'}))  # pylint: disable=E1101
+        self.db.register_basket(Basket(name='B', symbols={'POP'}))  # pylint: disable=E1101
+        self.assertAlmostEqual(self.db.basket_index('B'), self.expected(Basket(name='B', symbols={'POP'})))  # pylint: disable=E1101
+
+        self.db.basket_indices.unregister('B')  # pylint: disable=E1101
+        with self.assertRaises(KeyError):
+            self.db.basket_index('B')  # pylint: disable=E1101
+
+        self.db.register_basket(Basket(name='C', symbols={'JOE'}))  # pylint: disable=E1101
+        self.db.clear()  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            self.db.basket_index('C')  # pylint: disable=E1101
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Tests targeting the rolling return correlation tracker
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from math import isnan, log, sqrt
+
+# initialize, load and import StockDB singleton
+# this provides a way to check valid stocks indexed in GBCE stock exchange
+from src.utilities import STOCKS, gen_trade_batches  # pylint: disable=W0611
+
+from src.aggregates.correlation import ReturnCorrelation
+from src.clock import NS_PER_MINUTE, to_ns
+from src.db.trade_db import TradeDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+START = datetime(2024, 6, 3, 8)
+
+
+def _trade(minutes: float, symbol: str, price: float) -> TradeWithTimestamp:
+    return TradeWithTimestamp(
+        timestamp=START + timedelta(minutes=minutes),
+        symbol=symbol,
+        price=price,
+        quantity=1,
+        indicator=TransactionIndicator.BUY
+    )
+
+
+def reference_covariance(trades, symbols, window: int):
+    "Covariance recomputed from dense forward-filled closes of every closed bucket"
+    buckets = {}
+    for trade in sorted(trades, key=lambda trade: trade.timestamp):
+        buckets.setdefault(to_ns(trade.timestamp) // NS_PER_MINUTE, {})[trade.symbol] = trade.price
+    first, last = min(buckets), max(buckets)
+    closes, series = {}, []
+    for bucket in range(first, last):
+        prices = buckets.get(bucket, {})
+        series.append([
+            log(prices[symbol]) - log(closes[symbol])
+            if symbol in prices and symbol in closes else 0.
+            for symbol in symbols
+        ])
+        closes.update(prices)
+    series = series[-window:]
+    n = len(series)
+    means = [sum(returns[i] for returns in series) / n for i in range(len(symbols))]
+    return [
+        [
+            sum((returns[i] - means[i]) * (returns[j] - means[j]) for returns in series) / (n - 1)
+            for j in range(len(symbols))
+        ]
+        for i in range(len(symbols))
+    ]
+
+
+class TestReturnCorrelation(unittest.TestCase):
+    """
+    Test incremental bucketed return covariance and correlation
+    """
+
+    def test_matches_recomputation(self):
+        """
+        Incremental matrices match a dense recomputation over the window
+        """
+        symbols = tuple(STOCKS)
+        trades = [
+            trade
+            for batch in gen_trade_batches(3_000, batch_size=1_000, rate=1., start=START, seed=3)
+            for trade in batch.trades()
+        ]
+        tracker = ReturnCorrelation(symbols, window=20)
+        for trade in trades:
+            tracker.update(trade)
+
+        self.assertEqual(len(tracker), 20)
+        expected = reference_covariance(trades, symbols, 20)
+        covariance = tracker.covariance()
+        correlation = tracker.correlation()
+        for i in range(len(symbols)):
+            for j in range(len(symbols)):
+                self.assertAlmostEqual(covariance[i][j], expected[i][j], places=12)
+                self.assertAlmostEqual(
+                    correlation[i][j], expected[i][j] / sqrt(expected[i][i] * expected[j][j])
+                )
+        self.assertAlmostEqual(
+            tracker.correlation_of(symbols[0], symbols[1]), correlation[0][1]
+        )
+        self.assertEqual(tracker.covariance(symbols[:2]), [row[:2] for row in covariance[:2]])
+        self.assertEqual(
+            tracker.covariance((symbols[2], symbols[0])),
+            [[covariance[2][2], covariance[2][0]], [covariance[0][2], covariance[0][0]]]
+        )
+
+    def test_gaps_and_late_trades(self):
+        """
+        Buckets without trades have zero returns, late trades are ignored
+        """
+        tracker = ReturnCorrelation(('TEA', 'POP', 'GIN'), window=3)
+        with self.assertRaises(ValueError):
+            tracker.covariance()
+        for minutes, tea, pop in ((0, 10., 20.), (1, 11., 22.), (2, 10., 20.), (3, 12., 24.)):
+            tracker.update(_trade(minutes, 'TEA', tea))
+            tracker.update(_trade(minutes, 'POP', pop))
+        tracker.update(_trade(2.5, 'TEA', 100.))
+        tracker.update(_trade(3.5, 'GIN', 1.))
+        self.assertEqual(tracker.late, 1)
+
+        correlation = tracker.correlation()
+        self.assertAlmostEqual(correlation[0][1], 1.)
+        self.assertEqual(correlation[0][0], 1.)
+        self.assertTrue(isnan(correlation[2][2]) and isnan(tracker.correlation_of('TEA', 'GIN')))
+        with self.assertRaises(KeyError):
+            tracker.correlation(('TEA', 'JOE'))
+
+        # a gap longer than the window leaves only zero returns
+        tracker.advance(to_ns(START + timedelta(minutes=30)))
+        self.assertEqual(len(tracker), 3)
+        self.assertEqual(tracker.covariance(), [[0.] * 3 for _ in range(3)])
+
+        tracker.clear()
+        self.assertEqual((len(tracker), tracker.late), (0, 0))
+
+    def test_residues(self):
+        """
+        Symbols whose moves all left the window have no variance
+        """
+        tracker = ReturnCorrelation(('TEA', 'POP'), window=2)
+        for minutes, tea, pop in ((0, 10., 20.), (1, 10.3, 21.7), (2, 10.3, 21.7), (3, 10.3, 20.)):
+            tracker.update(_trade(minutes, 'TEA', tea))
+            tracker.update(_trade(minutes, 'POP', pop))
+        tracker.advance(to_ns(START + timedelta(minutes=4)))
+
+        self.assertEqual(tracker.covariance()[0], [0., 0.])
+        correlation = tracker.correlation()
+        self.assertTrue(isnan(correlation[0][0]) and isnan(correlation[0][1]))
+        self.assertEqual(correlation[1][1], 1.)
+        self.assertTrue(isnan(tracker.correlation_of('TEA', 'TEA')))
+
+
+class TestTradeDBCorrelation(unittest.TestCase):
+    """
+    Test the correlation formulas of trade db
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_formulas(self):
+        """
+        Recorded trades are replayed in timestamp order, reads never close buckets
+        """
+        for minutes, tea, pop in ((0, 10., 20.), (1, 11., 22.), (2, 10., 19.)):
+            self.db.add(_trade(minutes, 'TEA', tea))  # pylint: disable=E1101
+            self.db.add(_trade(minutes, 'POP', pop))  # pylint: disable=E1101
+        self.db.configure_correlation(window=10, symbols=('TEA', 'POP'))  # pylint: disable=E1101
+        self.assertEqual(len(self.db.correlation), 2)  # pylint: disable=E1101
+
+        self.db.return_correlation()  # pylint: disable=E1101
+        self.assertEqual(len(self.db.correlation), 2)  # pylint: disable=E1101
+        self.db.close_return_buckets(START + timedelta(minutes=3))  # pylint: disable=E1101
+        covariance = self.db.return_covariance()  # pylint: disable=E1101
+        correlation = self.db.return_correlation()  # pylint: disable=E1101
+        self.assertEqual(len(self.db.correlation), 3)  # pylint: disable=E1101
+        self.assertGreater(covariance[0][1], 0.)
+        self.assertGreater(correlation[0][1], 0.9)
+
+        self.db.clear()  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            self.db.return_correlation()  # pylint: disable=E1101
+
+    def test_historical_reads(self):
+        """
+        Reading the matrices of historical trades does not drop later trades
+        """
+        self.db.configure_correlation(window=30, symbols=('TEA', 'POP'))  # pylint: disable=E1101
+        for minutes in range(20):
+            self.db.add(_trade(minutes, 'TEA', 10. + minutes % 3))  # pylint: disable=E1101
+            self.db.add(_trade(minutes, 'POP', 20. + minutes % 4))  # pylint: disable=E1101
+            if minutes == 10:
+                self.db.return_correlation()  # pylint: disable=E1101
+
+        correlation = self.db.return_correlation()  # pylint: disable=E1101
+        self.assertEqual(self.db.correlation.late, 0)  # pylint: disable=E1101
+        self.assertFalse(any(isnan(value) for row in correlation for value in row))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Tests targeting EWMA trackers
+"""
+
+import unittest
+from math import log, sqrt
+
+# initialize, load and import StockDB singleton
+# this provides a way to check valid stocks indexed in GBCE stock exchange
+from src.utilities import STOCKS, gen_k_random_trades  # pylint: disable=W0611
+
+from src.aggregates.ewma import EwmaTracker
+from src.models.trade import Trade, TransactionIndicator
+
+
+class TestEwmaTracker(unittest.TestCase):
+    """
+    Test incremental and batch EWMA paths
+    """
+
+    def test_single_half_life(self):
+        """
+        A half-life of one trade weights the latest price by one half
+        """
+        tracker = EwmaTracker(half_lives=(1,))
+        for price in (10., 20.):
+            tracker.update(Trade.from_fields('TEA', price, 1, TransactionIndicator.BUY))
+
+        self.assertAlmostEqual(tracker.price('TEA'), 15.)
+        self.assertAlmostEqual(tracker.volatility('TEA'), sqrt(log(2.) ** 2 / 2))
+        self.assertEqual(tracker.prices(), {'TEA': tracker.price('TEA', 1)})
+
+        with self.assertRaises(KeyError):
+            tracker.price('POP')
+        with self.assertRaises(ValueError):
+            tracker.price('TEA', 2)
+        with self.assertRaises(ValueError):
+            EwmaTracker(half_lives=())
+
+    def test_batch_matches_incremental(self):
+        """
+        Batch recompute is identical to the incremental path
+        """
+        trades = list(gen_k_random_trades(500))
+        incremental, batch = EwmaTracker(), EwmaTracker()
+        for trade in trades:
+            incremental.update(trade)
+        batch.recompute(trades)
+
+        for half_life in incremental.half_lives:
+            self.assertEqual(incremental.prices(half_life), batch.prices(half_life))
+            self.assertEqual(incremental.volatilities(half_life), batch.volatilities(half_life))
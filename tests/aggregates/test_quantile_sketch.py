@@ -0,0 +1,167 @@
+"""
+Tests targeting quantile sketches
+"""
+
+import tracemalloc
+import unittest
+from datetime import datetime, timedelta
+from random import Random
+
+# initialize, load and import StockDB singleton
+# this provides a way to check valid stocks indexed in GBCE stock exchange
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+from src.aggregates.quantile_sketch import KllSketch, PriceQuantileSketches
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+
+class TestKllSketch(unittest.TestCase):
+    """
+    Test KLL sketch accuracy and merging
+    """
+
+    def test_exact_below_capacity(self):
+        """
+        Sketch is exact while it holds fewer items than its capacity
+        """
+        sketch = KllSketch(k=200)
+        for value in range(1, 101):
+            sketch.update(float(value))
+
+        self.assertEqual(len(sketch), 100)
+        self.assertEqual(sketch.quantile(0.), 1.)
+        self.assertEqual(sketch.quantile(.5), 50.)
+        self.assertEqual(sketch.quantile(1.), 100.)
+
+    def test_rank_error_bound(self):
+        """
+        Quantiles of a large stream stay within the documented rank error
+        """
+        n = 100_000
+        values = list(range(n))
+        Random(7).shuffle(values)
+
+        sketch = KllSketch(k=200, seed=7)
+        for value in values:
+            sketch.update(float(value))
+
+        self.assertLess(len(sketch.weighted_items()), 3 * 200)
+        for q in (.05, .5, .95):
+            self.assertAlmostEqual(sketch.quantile(q) / n, q, delta=.0165)
+
+    def test_merge(self):
+        """
+        Merged sketches answer for the union of their streams
+        """
+        left, right = KllSketch(k=200, seed=1), KllSketch(k=200, seed=2)
+        for value in range(50_000):
+            left.update(float(value))
+            right.update(float(value + 50_000))
+
+        merged = KllSketch(k=200).merge(left).merge(right)
+
+        self.assertEqual(len(merged), 100_000)
+        self.assertAlmostEqual(merged.quantile(.5) / 100_000, .5, delta=.0165)
+        self.assertAlmostEqual(left.quantile(.5) / 50_000, .5, delta=.0165)
+
+    def test_small_sketch_memory(self):
+        """
+        Sketches of a few items stay small, they hold no random generator
+        """
+        tracemalloc.start()
+        try:
+            sketches = [KllSketch() for _ in range(1_000)]
+            for sketch in sketches:
+                sketch.update(1.)
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(size / len(sketches), 1_000)
+
+        seeded = [KllSketch(k=20, seed=3) for _ in range(2)]
+        for sketch in seeded:
+            for value in range(10_000):
+                sketch.update(float(value))
+        self.assertEqual(seeded[0].weighted_items(), seeded[1].weighted_items())
+        self.assertEqual(PriceQuantileSketches().retention, 24 * 60)
+
+    def test_invalid_queries(self):
+        """
+        Empty sketches and out of range quantiles raise
+        """
+        sketch = KllSketch()
+        with self.assertRaises(ValueError):
+            sketch.quantile(.5)
+
+        sketch.update(1.)
+        with self.assertRaises(ValueError):
+            sketch.quantile(1.5)
+
+
+class TestPriceQuantileSketches(unittest.TestCase):
+    """
+    Test per symbol and per bucket sketches
+    """
+
+    def setUp(self) -> None:
+        self.ts = datetime(2024, 3, 1, 12, 0, 30)
+        self.sketches = PriceQuantileSketches()
+        for minutes, symbol, price in (
+            (0, 'TEA', 10.), (0, 'TEA', 20.), (1, 'TEA', 30.),
+            (2, 'POP', 40.), (3, 'TEA', 50.),
+        ):
+            self.sketches.update(
+                TradeWithTimestamp(
+                    timestamp=self.ts + timedelta(minutes=minutes),
+                    symbol=symbol,
+                    price=price,
+                    quantity=1,
+                    indicator=TransactionIndicator.BUY
+                )
+            )
+
+    def test_merge_by_symbol_and_range(self):
+        """
+        Merging selects buckets by symbol and time range
+        """
+        self.assertEqual(len(self.sketches.merged()), 5)
+        self.assertEqual(len(self.sketches.merged(('TEA',))), 4)
+        self.assertEqual(len(self.sketches.merged(('POP',))), 1)
+        self.assertEqual(
+            len(self.sketches.merged(('TEA',), since=self.ts + timedelta(minutes=1))),
+            2
+        )
+        self.assertEqual(
+            len(self.sketches.merged(until=self.ts + timedelta(minutes=1))),
+            3
+        )
+        self.assertEqual(len(self.sketches.merged(('GIN',))), 0)
+
+    def test_retention(self):
+        """
+        Only the most recent buckets are retained per symbol
+        """
+        def update(sketches, minutes):
+            sketches.update(
+                TradeWithTimestamp(
+                    timestamp=self.ts + timedelta(minutes=minutes),
+                    symbol='TEA',
+                    price=10. + minutes,
+                    quantity=1,
+                    indicator=TransactionIndicator.BUY
+                )
+            )
+
+        sketches = PriceQuantileSketches(retention=1)
+        for minutes in range(3):
+            update(sketches, minutes)
+
+        self.assertEqual(len(sketches.merged()), 1)
+        self.assertEqual(sketches.merged().quantile(.5), 12.)
+
+        # buckets arriving out of order are dropped oldest first
+        sketches = PriceQuantileSketches(retention=2)
+        for minutes in (0, 5, 3, 1, 5):
+            update(sketches, minutes)
+        self.assertEqual(sketches.merged().quantiles((0., 1.)), [13., 15.])
+        self.assertEqual(len(sketches.merged()), 3)
@@ -0,0 +1,85 @@
+"""
+Tests targeting rolling aggregates
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+# initialize, load and import StockDB singleton
+# this provides a way to check valid stocks indexed in GBCE stock exchange
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+from src.aggregates.rolling import LogPriceIndex, RollingVwsp
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+
+def _trade(ts: datetime, symbol: str, price: float, quantity: int) -> TradeWithTimestamp:
+    return TradeWithTimestamp(
+        timestamp=ts,
+        symbol=symbol,
+        price=price,
+        quantity=quantity,
+        indicator=TransactionIndicator.BUY
+    )
+
+
+class TestRollingVwsp(unittest.TestCase):
+    """
+    Test the sliding window VWSP
+    """
+
+    def test_window(self):
+        """
+        Trades of other symbols are ignored and old trades leave the window
+        """
+        ts = datetime(2024, 3, 1, 12, 0, 0)
+        vwsp = RollingVwsp('TEA', n_minutes=15)
+        self.assertIsNone(vwsp.value)
+
+        vwsp.update(_trade(ts, 'TEA', 10., 10))
+        vwsp.update(_trade(ts, 'POP', 99., 10))
+        vwsp.update(_trade(ts + timedelta(minutes=5), 'TEA', 20., 30))
+        self.assertAlmostEqual(vwsp.value, 17.5)
+
+        vwsp.update(_trade(ts + timedelta(minutes=16), 'TEA', 40., 10))
+        self.assertEqual(len(vwsp), 2)
+        self.assertAlmostEqual(vwsp.value, 25.)
+
+        # late trade older than the window is dropped
+        vwsp.update(_trade(ts, 'TEA', 1., 10))
+        self.assertEqual(len(vwsp), 2)
+
+    def test_late_trade_expiry(self):
+        """
+        A late trade leaves the window by its timestamp, not its arrival
+        """
+        ts = datetime(2024, 3, 1, 12, 0, 0)
+        vwsp = RollingVwsp('TEA', n_minutes=15)
+        vwsp.update(_trade(ts + timedelta(minutes=10), 'TEA', 10., 10))
+        vwsp.update(_trade(ts, 'TEA', 100., 10))
+        self.assertAlmostEqual(vwsp.value, 55.)
+
+        # the late trade expires first although it arrived last
+        vwsp.update(_trade(ts + timedelta(minutes=20), 'TEA', 20., 10))
+        self.assertEqual(len(vwsp), 2)
+        self.assertAlmostEqual(vwsp.value, 15.)
+
+
+class TestLogPriceIndex(unittest.TestCase):
+    """
+    Test the running geometric mean
+    """
+
+    def test_value(self):
+        """
+        Index is the geometric mean of the added prices
+        """
+        index = LogPriceIndex()
+        self.assertIsNone(index.value)
+
+        for price in (2., 8.):
+            index.update(_trade(datetime.now(), 'TEA', price, 1))
+        self.assertAlmostEqual(index.value, 4.)
+
+        index.clear()
+        self.assertEqual(len(index), 0)
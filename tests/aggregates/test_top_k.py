@@ -0,0 +1,120 @@
+"""
+Tests targeting windowed top-K trackers
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+# initialize, load and import StockDB singleton
+# this provides a way to check valid stocks indexed in GBCE stock exchange
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+from src.aggregates.top_k import ApproximateWindowedTopK, ExactWindowedTopK, SpaceSaving
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+
+def _trade(ts: datetime, symbol: str, price: float, quantity: int) -> TradeWithTimestamp:
+    return TradeWithTimestamp(
+        timestamp=ts,
+        symbol=symbol,
+        price=price,
+        quantity=quantity,
+        indicator=TransactionIndicator.BUY
+    )
+
+
+class TestSpaceSaving(unittest.TestCase):
+    """
+    Test the space saving summary
+    """
+
+    def test_heavy_hitters_survive(self):
+        """
+        Keys heavier than total / capacity are always monitored
+        """
+        summary = SpaceSaving(capacity=3)
+        for i in range(1000):
+            summary.add('TEA', 5)
+            summary.add(f'K{i}', 1)
+
+        self.assertEqual(len(summary), 3)
+        self.assertEqual(summary.top(1)[0][0], 'TEA')
+        self.assertLessEqual(summary.top(1)[0][1] - summary.error('TEA'), 5000)
+        self.assertGreaterEqual(summary.top(1)[0][1], 5000)
+
+    def test_merge(self):
+        """
+        Merged summaries sum the counts of common keys
+        """
+        left, right = SpaceSaving(capacity=2), SpaceSaving(capacity=2)
+        left.add('TEA', 3)
+        left.add('POP', 1)
+        right.add('TEA', 2)
+        right.add('ALE', 4)
+
+        self.assertEqual(left.merge(right).top(2), [('TEA', 5), ('ALE', 4)])
+
+
+class TestWindowedTopK(unittest.TestCase):
+    """
+    Test exact and approximate windowed trackers
+    """
+
+    def setUp(self) -> None:
+        self.ts = datetime(2024, 3, 1, 12, 0, 0)
+        self.trades = (
+            _trade(self.ts - timedelta(minutes=20), 'GIN', 1., 100),
+            _trade(self.ts - timedelta(minutes=10), 'TEA', 10., 5),
+            _trade(self.ts - timedelta(minutes=5), 'POP', 1., 20),
+            _trade(self.ts - timedelta(minutes=1), 'TEA', 10., 10),
+        )
+
+    def test_exact(self):
+        """
+        Exact tracker ranks by quantity and notional and expires old buckets
+        """
+        tracker = ExactWindowedTopK(n_minutes=15)
+        for trade in self.trades:
+            tracker.update(trade)
+
+        self.assertEqual(tracker.top(2, 'quantity', self.ts), [('POP', 20), ('TEA', 15)])
+        self.assertEqual(tracker.top(1, 'notional', self.ts), [('TEA', 150.)])
+
+        later = self.ts + timedelta(minutes=8)
+        self.assertEqual(tracker.top(5, 'quantity', later), [('POP', 20), ('TEA', 10)])
+
+        # reads leave the tracker unchanged
+        self.assertEqual(tracker.top(2, 'quantity', self.ts), [('POP', 20), ('TEA', 15)])
+        tracker.update(_trade(self.ts - timedelta(minutes=12), 'GIN', 1., 30))
+        self.assertEqual(tracker.top(1, 'quantity', self.ts), [('GIN', 30)])
+
+        with self.assertRaises(ValueError):
+            tracker.top(5, 'quantity', self.ts - timedelta(minutes=10))
+        with self.assertRaises(ValueError):
+            tracker.top(5, 'price', later)
+
+    def test_expiry_on_ingestion(self):
+        """
+        Buckets leave the window as trades arrive, without any query
+        """
+        for tracker in (ExactWindowedTopK(n_minutes=15), ApproximateWindowedTopK(n_minutes=15)):
+            for minutes in range(120):
+                tracker.update(_trade(self.ts + timedelta(minutes=minutes), 'TEA', 1., 1))
+            tracker.update(_trade(self.ts, 'POP', 1., 100))
+
+            self.assertLessEqual(len(tracker._buckets), 16)  # pylint: disable=W0212
+            latest = self.ts + timedelta(minutes=119)
+            self.assertEqual(tracker.top(5, 'quantity', latest), [('TEA', 16)])
+
+    def test_approximate(self):
+        """
+        Approximate tracker matches the exact one while within capacity
+        """
+        tracker = ApproximateWindowedTopK(n_minutes=15, capacity=10)
+        for trade in self.trades:
+            tracker.update(trade)
+
+        self.assertEqual(tracker.top(2, 'quantity', self.ts), [('POP', 20), ('TEA', 15)])
+        later = self.ts + timedelta(minutes=8)
+        self.assertEqual(tracker.top(5, 'quantity', later), [('POP', 20), ('TEA', 10)])
+        self.assertEqual(tracker.top(2, 'quantity', self.ts), [('POP', 20), ('TEA', 15)])
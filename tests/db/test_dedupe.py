@@ -0,0 +1,56 @@
+"""
+Tests targeting duplicate trade detection
+"""
+
+import unittest
+
+from src.clock import NS_PER_SECOND
+from src.db.dedupe import DedupeIndex
+
+
+class TestDedupeIndex(unittest.TestCase):
+    """
+    Test detection and eviction of trade ids
+    """
+
+    def test_seen(self):
+        """
+        Ids are duplicates within the horizon only
+        """
+
+        index = DedupeIndex(horizon_seconds=60, partitions=6)
+        self.assertFalse(index.seen('a', 0))
+        self.assertTrue(index.seen('a', 30 * NS_PER_SECOND))
+        self.assertFalse(index.seen('b', 30 * NS_PER_SECOND))
+        # a's partition is evicted once the latest trade is a horizon ahead
+        self.assertFalse(index.seen('c', 61 * NS_PER_SECOND))
+        self.assertFalse(index.seen('a', 61 * NS_PER_SECOND))
+        self.assertTrue(index.seen('b', 62 * NS_PER_SECOND))
+
+    def test_late_trades(self):
+        """
+        Late ids within the horizon are recorded in place, older ones are counted
+        """
+
+        index = DedupeIndex(horizon_seconds=60, partitions=6)
+        index.seen('a', 100 * NS_PER_SECOND)
+        self.assertFalse(index.seen('b', 60 * NS_PER_SECOND))
+        self.assertTrue(index.seen('b', 100 * NS_PER_SECOND))
+        self.assertFalse(index.seen('c', 10 * NS_PER_SECOND))
+        self.assertEqual(index.beyond_horizon, 1)
+
+    def test_bounded_memory(self):
+        """
+        The number of remembered ids stays flat over a long session
+        """
+
+        index = DedupeIndex(horizon_seconds=10, partitions=5)
+        for i in range(10_000):
+            self.assertFalse(index.seen(str(i), i * NS_PER_SECOND // 10))
+        self.assertLessEqual(len(index), 100)
+        index.clear()
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
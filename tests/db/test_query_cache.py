@@ -0,0 +1,100 @@
+"""
+Tests targeting the formula result cache
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from src.db.query_cache import QueryCache
+from src.db.trade_db import TradeDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+
+def _trade(ts: datetime, symbol: str, price: float) -> TradeWithTimestamp:
+    return TradeWithTimestamp(
+        timestamp=ts,
+        symbol=symbol,
+        price=price,
+        quantity=10,
+        indicator=TransactionIndicator.BUY
+    )
+
+
+class TestQueryCache(unittest.TestCase):
+    """
+    Test cached VWSP and index queries on the trade db
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+        self.ts = datetime(2024, 3, 1, 12, 0, 30)
+        for minutes, symbol, price in ((-20, 'TEA', 10.), (-10, 'TEA', 20.), (-5, 'POP', 30.)):
+            TradeDB().add(_trade(self.ts + timedelta(minutes=minutes), symbol, price))  # pylint: disable=E1101
+
+    def tearDown(self) -> None:
+        TradeDB.reset()  # clear
+
+    def test_repeated_reads_hit(self):
+        """
+        Reads between trades are served from the cache, the index from its running sums
+        """
+        db = TradeDB()
+        for _ in range(3):
+            self.assertEqual(db.volume_weighted_stock_price('TEA', self.ts), 20.)  # pylint: disable=E1101
+            self.assertAlmostEqual(db.gbce_all_share_index(), 6000 ** (1 / 3))  # pylint: disable=E1101
+
+        self.assertEqual(db.query_cache.info()['hits'], 2)  # pylint: disable=E1101
+        self.assertEqual(db.query_cache.info()['misses'], 1)  # pylint: disable=E1101
+
+    def test_invalidation_per_symbol(self):
+        """
+        Adding a trade invalidates its symbol only
+        """
+        db = TradeDB()
+        db.volume_weighted_stock_price('TEA', self.ts)  # pylint: disable=E1101
+        db.volume_weighted_stock_price('POP', self.ts)  # pylint: disable=E1101
+
+        db.add(_trade(self.ts, 'TEA', 40.))  # pylint: disable=E1101
+        self.assertEqual(db.volume_weighted_stock_price('TEA', self.ts), 30.)  # pylint: disable=E1101
+        db.volume_weighted_stock_price('POP', self.ts)  # pylint: disable=E1101
+
+        self.assertEqual(db.query_cache.info()['hits'], 1)  # pylint: disable=E1101
+
+    def test_window_boundary(self):
+        """
+        Entries expire exactly when the window moves past a trade
+        """
+        db = TradeDB()
+        self.assertEqual(db.volume_weighted_stock_price('TEA', self.ts), 20.)  # pylint: disable=E1101
+
+        # the trade 10 minutes ago leaves the window 5 minutes later
+        before = self.ts + timedelta(minutes=4, seconds=59)
+        self.assertEqual(db.volume_weighted_stock_price('TEA', before), 20.)  # pylint: disable=E1101
+        self.assertEqual(db.query_cache.info()['hits'], 0)  # pylint: disable=E1101
+
+        self.assertEqual(db.volume_weighted_stock_price('TEA', self.ts + timedelta(seconds=10)), 20.)  # pylint: disable=E1101
+        self.assertEqual(db.query_cache.info()['hits'], 1)  # pylint: disable=E1101
+
+        with self.assertRaises(ValueError):
+            db.volume_weighted_stock_price('TEA', self.ts + timedelta(minutes=6))  # pylint: disable=E1101
+
+        # going back in time brings the older trade into the window
+        self.assertEqual(db.volume_weighted_stock_price('TEA', self.ts - timedelta(minutes=6)), 15.)  # pylint: disable=E1101
+
+    def test_lru_eviction(self):
+        """
+        Least recently used entries are evicted past the maximum size
+        """
+        cache = QueryCache(maxsize=2)
+        keys = [cache.key('f', symbol, None, None) for symbol in ('TEA', 'POP', 'ALE')]
+        cache.put(keys[0], 1)
+        cache.put(keys[1], 2)
+        cache.get(keys[0])
+        cache.put(keys[2], 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(keys[0]), (True, 1))
+        self.assertEqual(cache.get(keys[1]), (False, None))
+
+        cache.invalidate('ALE')
+        self.assertEqual(cache.get(keys[2]), (False, None))
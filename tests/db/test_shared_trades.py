@@ -0,0 +1,177 @@
+"""
+Tests targeting the shared memory trade store
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from src.clock import to_ns
+from src.db.shared_trades import SharedTradeStore, SharedTradeView
+from src.db.trade_db import TradeDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+from src.models.trade_batch import TradeBatch
+from src.utilities import STOCKS, gen_k_random_trades, gen_trade_batches  # pylint: disable=W0611
+
+
+class TestSharedTrades(unittest.TestCase):
+    """
+    Test publishing trades and reading them back from a view
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+        self.store = self.db.configure_shared_memory(capacity=10_000)  # pylint: disable=E1101
+        self.view = SharedTradeView(self.store.name)
+
+    def tearDown(self) -> None:
+        self.view.close()
+        self.db.configure_shared_memory(enabled=False)  # pylint: disable=E1101
+        TradeDB.reset()
+
+    def test_formulas(self):
+        """
+        The view answers the formulas of the trade db
+        """
+        for batch in gen_trade_batches(5_000, batch_size=1_000, seed=4):
+            self.db.add_batch(batch, validate=False)  # pylint: disable=E1101
+        self.assertEqual(len(self.view), 5_000)
+        self.assertCountEqual(self.view.symbols(), self.db.symbol_time_indexes)  # pylint: disable=E1101
+        reference = datetime.now()
+        for symbol in self.view.symbols():
+            for n_minutes in (1, 15):
+                self.assertAlmostEqual(
+                    self.view.volume_weighted_stock_price(symbol, reference, n_minutes),
+                    self.db.volume_weighted_stock_price(symbol, reference, n_minutes)  # pylint: disable=E1101
+                )
+        self.assertAlmostEqual(
+            self.view.gbce_all_share_index(), self.db.gbce_all_share_index()  # pylint: disable=E1101
+        )
+
+    def test_window_search(self):
+        """
+        Windows of trades in order are answered from the running sums of their first row
+        """
+        start = datetime(2024, 6, 3, 9)
+        trades = [
+            TradeWithTimestamp(
+                timestamp=start + timedelta(seconds=7 * n), symbol=('TEA', 'POP')[n % 5 == 0],
+                price=10. + n % 13, quantity=1 + n % 7, indicator=TransactionIndicator.BUY
+            )
+            for n in range(1_000)
+        ]
+        self.db.add_batch(TradeBatch.from_trades(trades))  # pylint: disable=E1101
+        for minutes in range(0, 130, 3):
+            reference = start + timedelta(minutes=minutes, seconds=30)
+            for n_minutes in (1, 2, 15, 120):
+                window = [
+                    trade for trade in trades
+                    if trade.symbol == 'TEA'
+                    and reference - timedelta(minutes=n_minutes) <= trade.timestamp
+                ]
+                if not window:
+                    with self.assertRaises(ValueError):
+                        self.view.volume_weighted_stock_price('TEA', reference, n_minutes)
+                    continue
+                self.assertAlmostEqual(
+                    self.view.volume_weighted_stock_price('TEA', reference, n_minutes),
+                    sum(t.price * t.quantity for t in window) / sum(t.quantity for t in window)
+                )
+
+    def test_random_arrivals(self):
+        """
+        Symbols whose trades arrive out of order are summed over their own rows
+        """
+        for trade in gen_k_random_trades(500):
+            self.db.add(trade)  # pylint: disable=E1101
+        reference = datetime.now()
+        for symbol in self.view.symbols():
+            for n_minutes in (1, 15, 60):
+                try:
+                    expected = self.db.volume_weighted_stock_price(symbol, reference, n_minutes)  # pylint: disable=E1101
+                except ValueError:
+                    with self.assertRaises(ValueError):
+                        self.view.volume_weighted_stock_price(symbol, reference, n_minutes)
+                    continue
+                self.assertAlmostEqual(
+                    self.view.volume_weighted_stock_price(symbol, reference, n_minutes), expected
+                )
+
+    def test_duplicates_enter_no_symbol(self):
+        """
+        Dropped redeliveries leave the symbol table untouched
+        """
+        self.db.configure_dedupe(timedelta(minutes=5))  # pylint: disable=E1101
+        for symbol in ('TEA', 'POP'):
+            self.db.add(TradeWithTimestamp(  # pylint: disable=E1101
+                timestamp=datetime.now(), symbol=symbol, price=10., quantity=1,
+                indicator=TransactionIndicator.BUY, trade_id='T1'
+            ))
+        self.assertEqual(self.db.duplicates, 1)  # pylint: disable=E1101
+        self.assertEqual(self.view.symbols(), ['TEA'])
+
+    def test_out_of_order_and_clear(self):
+        """
+        Out of order trades are scanned in full, cleared stores have no trade
+        """
+        start = datetime.now() - timedelta(minutes=20)
+        for minutes, price in ((10, 20.), (1, 10.), (12, 30.)):
+            self.db.add(TradeWithTimestamp(  # pylint: disable=E1101
+                timestamp=start + timedelta(minutes=minutes), symbol='TEA', price=price,
+                quantity=10, indicator=TransactionIndicator.SELL
+            ))
+        self.assertEqual(
+            self.view.volume_weighted_stock_price(
+                'TEA', reference=to_ns(start + timedelta(minutes=20))
+            ), 25.
+        )
+        self.db.clear()  # pylint: disable=E1101
+        self.assertEqual(len(self.view), 0)
+        with self.assertRaises(ValueError):
+            self.view.gbce_all_share_index()
+        with self.assertRaises(ValueError):
+            self.view.volume_weighted_stock_price('TEA')
+
+    def test_capacity(self):
+        """
+        Trades past the capacity are rejected
+        """
+        store = SharedTradeStore(capacity=1)
+        try:
+            batch = next(gen_trade_batches(2, seed=5))
+            trades = list(batch.trades())
+            store.update(trades[0])
+            with self.assertRaises(ValueError):
+                store.update(trades[1])
+        finally:
+            store.close()
+
+
+    def test_full_store_rejected_before_storing(self):
+        """
+        Trades which do not fit the store are not added to the db either
+        """
+        self.db.configure_shared_memory(capacity=3, max_symbols=2)  # pylint: disable=E1101
+        self.view.close()
+        self.view = SharedTradeView(self.db.shared.name)  # pylint: disable=E1101
+        trades = [
+            TradeWithTimestamp(
+                timestamp=datetime(2024, 6, 3, 9) + timedelta(seconds=n), symbol=symbol,
+                price=10., quantity=1, indicator=TransactionIndicator.BUY
+            )
+            for n, symbol in enumerate(('TEA', 'POP', 'GIN', 'TEA', 'TEA'))
+        ]
+        self.db.add(trades[0])  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            self.db.add_batch(TradeBatch.from_trades(trades[1:4]))  # pylint: disable=E1101
+        self.db.add(trades[2])  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            self.db.add_batch(TradeBatch.from_trades(trades[3:]))  # pylint: disable=E1101
+        self.db.add(trades[3])  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            self.db.add(trades[1])  # pylint: disable=E1101
+
+        self.assertEqual(len(self.db), 3)
+        self.assertEqual((len(self.db.shared), len(self.view)), (3, 3))  # pylint: disable=E1101
+
+if __name__ == '__main__':
+    unittest.main()
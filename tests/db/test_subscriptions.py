@@ -0,0 +1,130 @@
+"""
+Tests targeting trade db subscriptions
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+# initialize, load and import StockDB singleton
+# this provides a way to check valid stocks indexed in GBCE stock exchange
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+from src.db.subscriptions import Direction, IndexMove, VwspThreshold
+from src.db.trade_db import TradeDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+
+
+def _trade(ts: datetime, symbol: str, price: float) -> TradeWithTimestamp:
+    return TradeWithTimestamp(
+        timestamp=ts,
+        symbol=symbol,
+        price=price,
+        quantity=10,
+        indicator=TransactionIndicator.BUY
+    )
+
+
+class TestSubscriptions(unittest.TestCase):
+    """
+    Test threshold subscriptions on trade ingestion
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+        self.ts = datetime(2024, 3, 1, 12, 0, 0)
+
+    def tearDown(self) -> None:
+        TradeDB.reset()  # clear
+
+    def test_vwsp_crossing(self):
+        """
+        VWSP conditions notify once when crossing, only for their symbol
+        """
+        notifications = []
+        TradeDB().add(_trade(self.ts, 'TEA', 10.))  # pylint: disable=E1101
+        subscription_id = TradeDB().subscribe(  # pylint: disable=E1101
+            VwspThreshold(symbol='TEA', level=15.),
+            notifications.append
+        )
+
+        TradeDB().add(_trade(self.ts, 'POP', 100.))  # pylint: disable=E1101
+        self.assertEqual(notifications, [])
+
+        for price in (30., 40.):
+            TradeDB().add(_trade(self.ts, 'TEA', price))  # pylint: disable=E1101
+        self.assertEqual(len(notifications), 1)
+        self.assertAlmostEqual(notifications[0].value, 20.)
+        self.assertEqual(notifications[0].subscription_id, subscription_id)
+
+        TradeDB().unsubscribe(subscription_id)  # pylint: disable=E1101
+        with self.assertRaises(KeyError):
+            TradeDB().unsubscribe(subscription_id)  # pylint: disable=E1101
+
+    def test_vwsp_below(self):
+        """
+        Trades leaving the window may turn a condition true
+        """
+        notifications = []
+        TradeDB().subscribe(  # pylint: disable=E1101
+            VwspThreshold(symbol='TEA', level=15., direction=Direction.BELOW, n_minutes=5),
+            notifications.append
+        )
+        TradeDB().add(_trade(self.ts, 'TEA', 30.))  # pylint: disable=E1101
+        TradeDB().add(_trade(self.ts + timedelta(minutes=10), 'TEA', 10.))  # pylint: disable=E1101
+
+        self.assertEqual([n.value for n in notifications], [10.])
+
+    def test_index_move_queue(self):
+        """
+        Index conditions push to asyncio queues when the index moves enough
+        """
+        async def run():
+            queue = asyncio.Queue()
+            TradeDB().add(_trade(self.ts, 'TEA', 10.))  # pylint: disable=E1101
+            TradeDB().subscribe(IndexMove(percent=50.), queue=queue)  # pylint: disable=E1101
+
+            TradeDB().add(_trade(self.ts, 'POP', 12.))  # pylint: disable=E1101
+            self.assertTrue(queue.empty())
+
+            TradeDB().add(_trade(self.ts, 'ALE', 100.))  # pylint: disable=E1101
+            return await asyncio.wait_for(queue.get(), 1)
+
+        notification = asyncio.run(run())
+        self.assertAlmostEqual(notification.value, (10. * 12. * 100.) ** (1 / 3))
+
+        with self.assertRaises(ValueError):
+            TradeDB().subscribe(IndexMove(percent=1.))  # pylint: disable=E1101
+
+    def test_delivery_errors(self):
+        """
+        Raising callbacks and full queues are counted, trades are still fully ingested
+        """
+        class Counter:
+            "Aggregate registered after the subscriptions"
+            trades = 0
+
+            def update(self, _):
+                "Count a trade"
+                self.trades += 1
+
+            def clear(self):
+                "Reset the count"
+                self.trades = 0
+
+        def fail(_):
+            raise RuntimeError('subscriber failure')
+
+        counter = Counter()
+        TradeDB().register_aggregate(counter)  # pylint: disable=E1101
+        failing = TradeDB().subscribe(IndexMove(percent=1.), fail)  # pylint: disable=E1101
+        full = TradeDB().subscribe(IndexMove(percent=1.), queue=asyncio.Queue(1))  # pylint: disable=E1101
+        for price in (10., 20., 40., 80.):
+            TradeDB().add(_trade(self.ts, 'TEA', price))  # pylint: disable=E1101
+
+        self.assertEqual(counter.trades, 4)
+        self.assertEqual(len(TradeDB()), 4)  # pylint: disable=E1101
+        self.assertEqual(TradeDB().subscriptions.errors(failing), 3)  # pylint: disable=E1101
+        self.assertEqual(TradeDB().subscriptions.errors(full), 2)  # pylint: disable=E1101
+        with self.assertRaises(KeyError):
+            TradeDB().subscriptions.errors(0)  # pylint: disable=E1101
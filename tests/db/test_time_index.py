@@ -0,0 +1,70 @@
+"""
+Tests targeting the trade db time index
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from timeit import repeat
+
+from src.clock import to_ns
+from src.db.time_index import TimeIndex
+
+
+class TestTimeIndex(unittest.TestCase):
+    """
+    Test ordering and range lookups of the time index
+    """
+
+    def setUp(self) -> None:
+        self.start = datetime(2024, 1, 1)
+        self.index = TimeIndex()
+
+    def at(self, seconds: int) -> int:
+        "Epoch in nanoseconds seconds after the start"
+        return to_ns(self.start + timedelta(seconds=seconds))
+
+    def test_out_of_order_insert(self):
+        """
+        Out of order entries are inserted in place, ties keep insertion order
+        """
+
+        self.assertTrue(self.index.insert(self.at(0), 0))
+        self.assertTrue(self.index.insert(self.at(10), 1))
+        self.assertFalse(self.index.insert(self.at(5), 2))
+        self.assertFalse(self.index.insert(self.at(5), 3))
+
+        self.assertEqual(list(self.index.sequences()), [0, 2, 3, 1])
+        self.assertEqual(len(self.index), 4)
+
+    def test_range(self):
+        """
+        Range bounds are inclusive
+        """
+
+        for sequence in range(10):
+            self.index.insert(self.at(sequence), sequence)
+
+        self.assertEqual(list(self.index.sequences(self.at(3), self.at(5))), [3, 4, 5])
+        self.assertEqual(list(self.index.sequences(since=self.at(8))), [8, 9])
+        self.assertEqual(list(self.index.sequences(until=self.at(1))), [0, 1])
+        self.assertEqual(list(self.index.sequences(self.at(5), self.at(3))), [])
+
+        self.index.clear()
+        self.assertEqual(list(self.index.sequences()), [])
+
+    def test_tail_window_cost(self):
+        """
+        Reading a window at the end of a large index costs as much as at its start
+        """
+        for sequence in range(500_000):
+            self.index.insert(sequence, sequence)
+        head, tail = range(0, 10), range(len(self.index) - 10, len(self.index))
+
+        self.assertEqual(list(self.index.sequences_at(tail)), list(tail))
+        self.assertEqual(list(self.index.sequences_at(tail[::3])), list(tail[::3]))
+        head_time, tail_time = (
+            min(repeat(lambda positions=positions: list(self.index.sequences_at(positions)),
+                       number=100, repeat=5))
+            for positions in (head, tail)
+        )
+        self.assertLess(tail_time, 10 * head_time + 1e-3)
@@ -3,13 +3,15 @@ Tests targeting Trade DB
 """
 
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from src.aggregates.ewma import EwmaTracker
 from src.db.trade_db import TradeDB
 from src.models.trade import TradeWithTimestamp, TransactionIndicator
+from src.models.trade_batch import TradeBatch
 # initialize, load and import StockDB singleton
 # this provides a way to check valid stocks indexed in GBCE stock exchange
-from src.utilities import STOCKS, gen_k_random_trades  # pylint: disable=W0611
+from src.utilities import STOCKS, gen_k_random_trades, gen_trade_batches  # pylint: disable=W0611
 
 
 class TestTradeDB(unittest.TestCase):
@@ -51,3 +53,126 @@ class TestTradeDB(unittest.TestCase):
             TradeDB().add(trade)  # pylint: disable=E1101
 
         self.assertEqual(len(TradeDB()), 10)
+
+    def test_add_batch(self):
+        """
+        Bulk add a batch, invalid batches are rejected as a whole
+        """
+
+        batch = next(gen_trade_batches(100, seed=1))
+        TradeDB().add_batch(batch)  # pylint: disable=E1101
+
+        self.assertEqual(len(TradeDB()), 100)
+        self.assertEqual(list(TradeDB()), list(batch.trades()))
+
+        batch.symbols[-1] = 'DEW'
+        with self.assertRaises(ValueError):
+            TradeDB().add_batch(batch)  # pylint: disable=E1101
+        self.assertEqual(len(TradeDB()), 100)
+
+    def test_snapshot(self):
+        """
+        Snapshots are bounded to their sequence number while ingestion continues
+        """
+
+        for trade in gen_k_random_trades(10):
+            TradeDB().add(trade)  # pylint: disable=E1101
+
+        snapshot = TradeDB.snapshot()
+        older = TradeDB.snapshot(5)
+        index = snapshot.gbce_all_share_index()
+
+        for trade in gen_k_random_trades(10):
+            TradeDB().add(trade)  # pylint: disable=E1101
+
+        self.assertEqual(TradeDB().sequence, 20)  # pylint: disable=E1101
+        self.assertEqual(len(snapshot), 10)
+        self.assertEqual(list(older), list(TradeDB())[:5])
+        self.assertEqual(older[-1], TradeDB()[4])  # pylint: disable=E1136
+        self.assertEqual(older[1:], list(TradeDB())[1:5])
+        self.assertEqual(older[::-2], list(TradeDB())[4::-2])
+        self.assertEqual(older[3:100], list(TradeDB())[3:5])
+        self.assertEqual(snapshot.gbce_all_share_index(), index)
+
+        with self.assertRaises(IndexError):
+            older[5]  # pylint: disable=W0104
+        with self.assertRaises(ValueError):
+            TradeDB.snapshot(21)
+
+        TradeDB().clear()  # pylint: disable=E1101
+        self.assertEqual(len(list(snapshot)), 10)
+
+    def test_event_time(self):
+        """
+        Trades are reordered up to the watermark and late trades are inserted in place
+        """
+
+        db = TradeDB()
+        db.configure_event_time(timedelta(seconds=10))  # pylint: disable=E1101
+        start = datetime.now() - timedelta(minutes=5)
+
+        def trade(seconds, price):
+            return TradeWithTimestamp(
+                timestamp=start + timedelta(seconds=seconds),
+                symbol='TEA',
+                price=price,
+                quantity=10,
+                indicator=TransactionIndicator.BUY
+            )
+
+        for seconds, price in ((0, 10.), (5, 12.), (2, 11.)):
+            db.add(trade(seconds, price))  # pylint: disable=E1101
+        self.assertEqual(len(db), 0)
+        self.assertEqual(db.pending, 3)  # pylint: disable=E1101
+
+        db.add(trade(20, 13.))  # pylint: disable=E1101 # watermark at 10s
+        self.assertEqual([t.price for t in db], [10., 11., 12.])
+        self.assertEqual(db.pending, 1)  # pylint: disable=E1101
+
+        db.add(trade(1, 9.))  # pylint: disable=E1101 # behind the flushed trades
+        db.flush()  # pylint: disable=E1101
+        self.assertEqual(db.late_trades, 1)  # pylint: disable=E1101
+        self.assertEqual(
+            [t.price for t in db._trades_of('TEA')],  # pylint: disable=E1101,W0212
+            [10., 9., 11., 12., 13.]
+        )
+
+        # order sensitive aggregates follow timestamp order
+        expected = EwmaTracker()
+        expected.recompute(trade(s, p) for s, p in ((0, 10.), (1, 9.), (2, 11.), (5, 12.), (20, 13.)))
+        self.assertEqual(db.ewma_price('TEA'), expected.price('TEA'))  # pylint: disable=E1101
+
+        # batch rebuilds follow timestamp order too, not arrival order
+        db.recompute_ewma()  # pylint: disable=E1101
+        self.assertEqual(db.ewma_price('TEA'), expected.price('TEA'))  # pylint: disable=E1101
+        db.configure_ewma(expected.half_lives)  # pylint: disable=E1101
+        self.assertEqual(db.ewma_price('TEA'), expected.price('TEA'))  # pylint: disable=E1101
+
+    def test_dedupe(self):
+        """
+        Redelivered trades are dropped by trade id, trades without id are always added
+        """
+
+        db = TradeDB()
+        db.configure_dedupe(timedelta(minutes=5))  # pylint: disable=E1101
+        start = datetime.now() - timedelta(minutes=1)
+
+        def trade(trade_id, seconds=0):
+            return TradeWithTimestamp(
+                timestamp=start + timedelta(seconds=seconds),
+                symbol='TEA',
+                price=10.,
+                quantity=10,
+                indicator=TransactionIndicator.BUY,
+                trade_id=trade_id
+            )
+
+        for trade_id in ('a', 'b', 'a', None, None, 'b'):
+            db.add(trade(trade_id))  # pylint: disable=E1101
+        self.assertEqual([t.trade_id for t in db], ['a', 'b', None, None])
+        self.assertEqual(db.duplicates, 2)  # pylint: disable=E1101
+
+        batch = TradeBatch.from_trades([trade('a', 1), trade('c', 1), trade('c', 2)])
+        db.add_batch(batch)  # pylint: disable=E1101
+        self.assertEqual([t.trade_id for t in db][4:], ['c'])
+        self.assertEqual(db.duplicates, 4)  # pylint: disable=E1101
@@ -0,0 +1,87 @@
+"""
+Tests targeting ad-hoc trade queries
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from pydantic import ValidationError
+
+from src.db.trade_db import TradeDB
+from src.db.trade_query import Access
+from src.utilities import STOCKS, gen_trade_batches  # pylint: disable=W0611
+
+
+class TestTradeQuery(unittest.TestCase):
+    """
+    Test query results against plain filters and the planner choices
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+        self.start = datetime(2024, 5, 1, 9)
+        for batch in gen_trade_batches(5_000, batch_size=1_000, rate=10., start=self.start, seed=7):
+            self.db.add_batch(batch, validate=False)  # pylint: disable=E1101
+        self.trades = list(self.db)
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_results(self):
+        """
+        Every plan yields the trades matching all criteria
+        """
+        since, until = self.start + timedelta(minutes=1), self.start + timedelta(minutes=3)
+        cases = [
+            ({'symbol': 'TEA'}, lambda t: t.symbol == 'TEA'),
+            ({'since': since, 'until': until}, lambda t: since <= t.timestamp <= until),
+            ({'symbol': 'GIN', 'since': since, 'indicator': 'SELL', 'min_qty': 20},
+             lambda t: t.symbol == 'GIN' and t.timestamp >= since and t.indicator == 'SELL'
+             and t.quantity >= 20),
+            ({'price_range': (10., 50.)}, lambda t: 10. <= t.price <= 50.),
+            ({'symbol': 'XYZ'}, lambda t: False),
+        ]
+        for criteria, expected in cases:
+            for ordered in (False, True):
+                result = self.db.query(**criteria, ordered=ordered)  # pylint: disable=E1101
+                self.assertCountEqual(list(result), list(filter(expected, self.trades)), criteria)
+                if ordered:
+                    timestamps = [trade.timestamp for trade in result]
+                    self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_plans(self):
+        """
+        The planner picks the index visiting the fewest trades
+        """
+        minute = self.start + timedelta(minutes=1)
+        query = self.db.query  # pylint: disable=E1101
+        self.assertEqual(query().plan.access, Access.FULL_SCAN)
+        self.assertEqual(query(min_qty=10).plan.access, Access.FULL_SCAN)
+        self.assertEqual(query(symbol='TEA').plan.access, Access.SYMBOL_INDEX)
+        self.assertEqual(query(since=minute, until=minute).plan.access, Access.TIME_INDEX)
+
+        plan = query(symbol='TEA', since=minute, min_qty=10).plan
+        self.assertEqual(plan.access, Access.SYMBOL_INDEX)
+        self.assertEqual(plan.residual, ('min_qty',))
+        self.assertEqual(plan.rows, sum(
+            t.symbol == 'TEA' and t.timestamp >= minute for t in self.trades
+        ))
+
+    def test_batches_and_validation(self):
+        """
+        Results read as columnar batches, empty ranges are rejected
+        """
+        result = self.db.query(symbol='POP')  # pylint: disable=E1101
+        batches = list(result.batches(size=100))
+        self.assertEqual(sum(len(batch) for batch in batches), result.count())
+        self.assertTrue(all(len(batch) <= 100 for batch in batches))
+        self.assertEqual(set(symbol for batch in batches for symbol in batch.symbols), {'POP'})
+
+        with self.assertRaises(ValidationError):
+            self.db.query(price_range=(2., 1.))  # pylint: disable=E1101
+        with self.assertRaises(ValidationError):
+            self.db.query(since=self.start, until=self.start - timedelta(seconds=1))  # pylint: disable=E1101
+
+
+if __name__ == '__main__':
+    unittest.main()
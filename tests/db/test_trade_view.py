@@ -0,0 +1,144 @@
+"""
+Tests targeting zero-copy views of the trade db
+"""
+
+import io
+import unittest
+from datetime import datetime, timedelta
+from timeit import repeat
+
+from src.db.time_index import TimeIndex
+from src.db.trade_db import TradeDB
+from src.db.trade_view import TradeView
+from src.utilities import STOCKS, gen_trade_batches  # pylint: disable=W0611
+
+
+class TestTradeView(unittest.TestCase):
+    """
+    Test time range and symbol views, pagination and streaming
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+        self.start = datetime(2024, 6, 3, 9)
+        for batch in gen_trade_batches(2_000, batch_size=500, rate=10., start=self.start, seed=8):
+            self.db.add_batch(batch, validate=False)  # pylint: disable=E1101
+        self.trades = sorted(self.db, key=lambda trade: trade.timestamp)
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_between(self):
+        """
+        Views hold the trades of the range in timestamp order
+        """
+        since, until = self.start + timedelta(seconds=30), self.start + timedelta(seconds=90)
+        view = self.db.between(since, until)  # pylint: disable=E1101
+        expected = [trade for trade in self.trades if since <= trade.timestamp <= until]
+        self.assertEqual(list(view), expected)
+        self.assertEqual(len(view), len(expected))
+        self.assertEqual((view[0], view[-1]), (expected[0], expected[-1]))
+        self.assertEqual(list(view[10:20]), expected[10:20])
+        self.assertEqual(list(view[::7]), expected[::7])
+        self.assertEqual(view.summary()['first'], expected[0].timestamp)
+        self.assertEqual(len(self.db.between()), len(self.db))  # pylint: disable=E1101
+
+    def test_symbol_view(self):
+        """
+        Symbol views hold the trades of the stock and run formulas
+        """
+        view = self.db.symbol_view('TEA', since=self.start + timedelta(minutes=1))  # pylint: disable=E1101
+        expected = [
+            trade for trade in self.trades
+            if trade.symbol == 'TEA' and trade.timestamp >= self.start + timedelta(minutes=1)
+        ]
+        self.assertEqual(list(view), expected)
+        self.assertIn('TEA', view)
+        self.assertNotIn('GIN', view)
+        self.assertEqual(len(self.db.symbol_view('XYZ')), 0)  # pylint: disable=E1101
+        reference = self.trades[-1].timestamp
+        self.assertAlmostEqual(
+            view.volume_weighted_stock_price('TEA', reference, 1),
+            self.db.volume_weighted_stock_price('TEA', reference, 1)  # pylint: disable=E1101
+        )
+
+    def test_pages_and_repr(self):
+        """
+        Pages cover the view, reprs summarize instead of listing trades
+        """
+        view = self.db.between()  # pylint: disable=E1101
+        pages = list(view.pages(300))
+        self.assertEqual(len(pages), 7)
+        self.assertEqual([trade for page in pages for trade in page], self.trades)
+        self.assertEqual(len(view.page(100)), 0)
+        with self.assertRaises(ValueError):
+            view.page(-1)
+
+        self.assertLess(len(repr(self.db)), 200)
+        self.assertIn('trades=2000', repr(self.db))
+        stream = io.StringIO()
+        self.assertEqual(self.db.write(stream, limit=5), 5)  # pylint: disable=E1101
+        self.assertEqual(len(stream.getvalue().splitlines()), 5)
+
+    def test_late_inserts(self):
+        """
+        Views keep the trades they were taken with when late trades shift the index
+        """
+        since, until = self.start + timedelta(seconds=30), self.start + timedelta(seconds=90)
+        view = self.db.between(since, until)  # pylint: disable=E1101
+        page = view[10:20]
+        symbol_view = self.db.symbol_view('TEA', since, until)  # pylint: disable=E1101
+        expected = list(view)
+        expected_page, expected_symbol = list(page), list(symbol_view)
+
+        late = [
+            trade.model_copy(update={'timestamp': self.start + timedelta(seconds=seconds)})
+            for seconds, trade in zip((1, 2, 40, 60, 95), self.trades)
+        ]
+        for trade in late:
+            self.db.add(trade)  # pylint: disable=E1101
+
+        self.assertEqual(list(view), expected)
+        self.assertEqual((view[0], view[-1]), (expected[0], expected[-1]))
+        self.assertEqual(list(page), expected_page)
+        self.assertEqual(list(view[::7]), expected[::7])
+        self.assertEqual(list(symbol_view), expected_symbol)
+        self.assertEqual(view.summary()['last'], expected[-1].timestamp)
+        self.assertEqual(len(self.db.between(since, until)), len(expected) + 2)  # pylint: disable=E1101
+
+    def test_contains(self):
+        """
+        Membership is answered from the symbol indexes, slices and late trades included
+        """
+        view = self.db.between(self.start, self.start + timedelta(seconds=5))  # pylint: disable=E1101
+        for symbol in STOCKS.symbols():
+            self.assertEqual(symbol in view, any(trade.symbol == symbol for trade in view))
+            self.assertEqual(symbol in view[3:9], any(trade.symbol == symbol for trade in view[3:9]))
+
+        absent = next(symbol for symbol in STOCKS.symbols() if symbol not in view[:1])
+        self.db.add(  # pylint: disable=E1101
+            self.trades[0].model_copy(update={'symbol': absent, 'timestamp': view[0].timestamp})
+        )
+        self.assertNotIn(absent, view[:1])
+        self.assertNotIn('XYZ', view)
+
+
+    def test_late_page_cost(self):
+        """
+        The last page of a large view is read as fast as the first one
+        """
+        index = TimeIndex()
+        for sequence in range(500_000):
+            index.insert(sequence, sequence)
+        view = TradeView(list(range(len(index))), index, range(len(index)))
+        last = -(-len(view) // 50) - 1
+
+        self.assertEqual(list(view.page(last)), list(range(499_950, 500_000)))
+        first_time, last_time = (
+            min(repeat(lambda number=number: list(view.page(number)), number=100, repeat=5))
+            for number in (0, last)
+        )
+        self.assertLess(last_time, 10 * first_time + 1e-3)
+
+if __name__ == '__main__':
+    unittest.main()
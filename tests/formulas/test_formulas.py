@@ -12,7 +12,7 @@ from src.models.trade import TradeWithTimestamp, TransactionIndicator
 from src.date_utilities import timestamp_n_minutes_ago
 # initialize, load and import StockDB singleton
 # this provides a way to check valid sotcks indexed in GBCE stock exchange
-from src.utilities import STOCKS  # pylint: disable=W0611
+from src.utilities import STOCKS, gen_k_random_trades  # pylint: disable=W0611
 
 
 class TestSingleStockFormulas(unittest.TestCase):
@@ -132,3 +132,151 @@ class TestTradeFormulas(unittest.TestCase):
             30.29268293,
             delta=1e-4
         )
+
+
+class TestQuantileFormulas(unittest.TestCase):
+    """
+    Test price quantile formula mix-ins
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TradeDB()
+
+        cls.ts = datetime.now()  # mock test time
+
+        for minutes, price in enumerate((10., 20., 30., 40., 50.)):
+            TradeDB().add(  # pylint: disable=E1101
+                TradeWithTimestamp(
+                    timestamp=timestamp_n_minutes_ago(minutes * 5, mock_ts=cls.ts),
+                    symbol='TEA',
+                    price=price,
+                    quantity=1,
+                    indicator=TransactionIndicator.BUY
+                )
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        TradeDB.reset()
+
+    def test_price_quantiles(self):
+        """
+        Test quantiles over all recorded trades
+        """
+        self.assertEqual(
+            TradeDB().price_quantiles((0., .5, 1.)),  # pylint: disable=E1101
+            {0.: 10., .5: 30., 1.: 50.}
+        )
+
+        with self.assertRaises(ValueError):
+            TradeDB().price_quantiles(symbols=('GIN',))  # pylint: disable=E1101
+
+    def test_rolling_price_quantiles(self):
+        """
+        Test quantiles over the trades of the past 15 minutes
+        """
+        self.assertEqual(
+            TradeDB().rolling_price_quantiles('TEA', (0., 1.), self.ts),  # pylint: disable=E1101
+            {0.: 10., 1.: 40.}
+        )
+
+        with self.assertRaises(ValueError):
+            TradeDB().rolling_price_quantiles('POP', mock_ts=self.ts)  # pylint: disable=E1101
+
+
+class TestTopKFormulas(unittest.TestCase):
+    """
+    Test top traded symbols formula mix-ins
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        TradeDB()
+
+        cls.ts = datetime.now()  # mock test time
+
+        for minutes, symbol, quantity in ((1, 'TEA', 5), (2, 'POP', 3), (3, 'TEA', 1), (30, 'JOE', 50)):
+            TradeDB().add(  # pylint: disable=E1101
+                TradeWithTimestamp(
+                    timestamp=timestamp_n_minutes_ago(minutes, mock_ts=cls.ts),
+                    symbol=symbol,
+                    price=10.,
+                    quantity=quantity,
+                    indicator=TransactionIndicator.BUY
+                )
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        TradeDB.reset()
+
+    def test_top_traded_symbols(self):
+        """
+        Test ranking of the most traded symbols
+        """
+        self.assertEqual(
+            TradeDB().top_traded_symbols(2, mock_ts=self.ts),  # pylint: disable=E1101
+            [('TEA', 6), ('POP', 3)]
+        )
+        self.assertEqual(
+            TradeDB().top_traded_symbols(1, 'notional', 60, self.ts),  # pylint: disable=E1101
+            [('JOE', 500.)]
+        )
+
+
+class TestEwmaFormulas(unittest.TestCase):
+    """
+    Test EWMA formula mix-ins
+    """
+
+    def setUp(self) -> None:
+        TradeDB()
+        for price in (10., 20., 40.):
+            TradeDB().add(  # pylint: disable=E1101
+                TradeWithTimestamp(
+                    timestamp=datetime.now(),
+                    symbol='TEA',
+                    price=price,
+                    quantity=1,
+                    indicator=TransactionIndicator.BUY
+                )
+            )
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_ewma_price(self):
+        """
+        Test EWMA price and realized volatility lookups
+        """
+        TradeDB().configure_ewma((1,))  # pylint: disable=E1101
+
+        self.assertAlmostEqual(TradeDB().ewma_price('TEA'), 27.5)  # pylint: disable=E1101
+        self.assertGreater(TradeDB().realized_volatility('TEA'), 0.)  # pylint: disable=E1101
+        self.assertEqual(list(TradeDB().ewma_prices()), ['TEA'])  # pylint: disable=E1101
+
+        with self.assertRaises(ValueError):
+            TradeDB().ewma_price('POP')  # pylint: disable=E1101
+
+    def test_recompute_ewma(self):
+        """
+        Test batch recompute matches the incremental state
+        """
+        incremental = TradeDB().realized_volatilities()  # pylint: disable=E1101
+        TradeDB().recompute_ewma()  # pylint: disable=E1101
+
+        self.assertEqual(TradeDB().realized_volatilities(), incremental)  # pylint: disable=E1101
+
+    def test_recompute_ewma_out_of_order(self):
+        """
+        Test trades arriving out of timestamp order fold in the order batch recompute uses
+        """
+        for trade in gen_k_random_trades(200):
+            TradeDB().add(trade)  # pylint: disable=E1101
+        prices = TradeDB().ewma_prices()  # pylint: disable=E1101
+        volatilities = TradeDB().realized_volatilities()  # pylint: disable=E1101
+        TradeDB().recompute_ewma()  # pylint: disable=E1101
+
+        self.assertEqual(TradeDB().ewma_prices(), prices)  # pylint: disable=E1101
+        self.assertEqual(TradeDB().realized_volatilities(), volatilities)  # pylint: disable=E1101
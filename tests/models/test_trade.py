@@ -2,7 +2,7 @@
 Tests targeting Trade and TradeWithStamp models
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import unittest
 
 from pydantic import ValidationError
@@ -11,6 +11,7 @@ from pydantic import ValidationError
 # this provides a way to check valid sotcks indexed in GBCE stock exchange
 from src.utilities import STOCKS  # pylint: disable=W0611
 
+from src.clock import NS_PER_MINUTE, ManualClock, to_ns, use_clock
 from src.models.trade import Trade, TradeWithTimestamp, TransactionIndicator
 
 
@@ -185,3 +186,19 @@ class TetsTradeWithTimestampModelFixed(unittest.TestCase):
             )
         )
 
+
+    def test_timestamp_ns(self):
+        """
+        Tests the integer epoch kept next to the timestamp
+        """
+
+        with use_clock(ManualClock(1_700_000_000_123_456_789)):
+            trade = TradeWithTimestamp.from_trade(
+                Trade.from_fields('TEA', 10., 10, TransactionIndicator.BUY)
+            )
+        self.assertEqual(trade.timestamp_ns, 1_700_000_000_123_456_000)
+        self.assertEqual(to_ns(trade.timestamp), trade.timestamp_ns)
+
+        later = trade.model_copy(update={'timestamp': trade.timestamp + timedelta(minutes=1)})
+        self.assertEqual(later.timestamp_ns - trade.timestamp_ns, NS_PER_MINUTE)
+        self.assertEqual(trade.model_copy(update={'price': 11.}).timestamp_ns, trade.timestamp_ns)
@@ -0,0 +1,63 @@
+"""
+Tests targeting the columnar TradeBatch
+"""
+
+import unittest
+
+# initialize, load and import StockDB singleton
+from src.utilities import STOCKS, gen_k_random_trades  # pylint: disable=W0611
+
+from src.clock import now_ns, to_ns
+from src.models.trade_batch import TradeBatch
+
+
+class TestTradeBatch(unittest.TestCase):
+    """
+    Test batch validation and conversion to trade models
+    """
+
+    def test_round_trip(self):
+        """
+        Trades built from a batch equal the validated trades it was made of
+        """
+        trades = list(gen_k_random_trades(10))
+        batch = TradeBatch.from_trades(trades)
+
+        batch.validate()
+        self.assertEqual(len(batch), 10)
+        self.assertEqual(list(batch.trades()), trades)
+
+    def test_validate(self):
+        """
+        Invalid columns raise a ValueError
+        """
+        now = now_ns()
+        for symbols, prices, quantities, indicators in (
+            (['DEW'], [1.], [1], ['BUY']),
+            (['TEA'], [0.], [1], ['BUY']),
+            (['TEA'], [float('nan')], [1], ['BUY']),
+            (['TEA'], [float('inf')], [1], ['BUY']),
+            (['TEA', 'POP'], [1., float('nan')], [1, 1], ['BUY', 'BUY']),
+            (['TEA'], [1.], [-1], ['BUY']),
+            (['TEA'], [1.], [1], ['HOLD']),
+        ):
+            with self.assertRaises(ValueError):
+                TradeBatch(symbols, prices, quantities, indicators, [now] * len(symbols)).validate()
+
+        with self.assertRaises(ValueError):
+            TradeBatch(['TEA', 'POP'], [1.], [1], ['BUY'], [now])
+
+        for trade_ids in ([1], [b'id'], ['a', 'b']):
+            batch = TradeBatch(['TEA'], [1.], [1], ['BUY'], [now])
+            batch.trade_ids = trade_ids
+            with self.assertRaises(ValueError):
+                batch.validate()
+
+    def test_timestamp_resolution(self):
+        """
+        Timestamps are truncated to microseconds, the resolution of trade datetimes
+        """
+        batch = TradeBatch(['TEA'], [1.], [1], ['BUY'], [1_700_000_000_123_456_789])
+        trade = next(batch.trades())
+        self.assertEqual(batch.timestamps[0], 1_700_000_000_123_456_000)
+        self.assertEqual(trade.timestamp_ns, to_ns(trade.timestamp))
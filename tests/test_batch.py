@@ -0,0 +1,98 @@
+"""
+Tests targeting non-interactive batch queries
+"""
+
+import io
+import json
+import unittest
+from datetime import datetime
+
+from src.batch import evaluate, read_queries, write_results
+from src.db.trade_db import TradeDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+
+class TestBatchQueries(unittest.TestCase):
+    """
+    Test reading, evaluating and writing batch queries
+    """
+
+    def setUp(self) -> None:
+        for symbol, price in (('TEA', 10.), ('GIN', 40.)):
+            TradeDB().add(TradeWithTimestamp(  # pylint: disable=E1101
+                timestamp=datetime.now(),
+                symbol=symbol,
+                price=price,
+                quantity=10,
+                indicator=TransactionIndicator.BUY
+            ))
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_read_queries(self):
+        """
+        Queries are read from csv or ndjson
+        """
+        self.assertEqual(
+            list(read_queries(io.StringIO('symbol,price\nTEA, 10\nGIN,\n'))),
+            [('TEA', '10'), ('GIN', '')]
+        )
+        self.assertEqual(
+            list(read_queries(io.StringIO('{"symbol": "TEA", "price": 10}\n\n{"symbol": "GIN"}\n'))),
+            [('TEA', '10'), ('GIN', '')]
+        )
+
+    def test_malformed_lines(self):
+        """
+        Malformed lines are reported in place and the run goes on
+        """
+        queries = list(read_queries(io.StringIO(
+            '{"symbol": "TEA", "price": 10}\n{"symbol": \n{"price": 10}\n[1]\n{"symbol": "GIN"}\n'
+        )))
+        self.assertEqual([query for query in queries if isinstance(query, tuple)],
+                         [('TEA', '10'), ('GIN', '')])
+        results = list(evaluate(queries, TradeDB()))
+        self.assertEqual(len(results), 5)
+        self.assertEqual(
+            [result['error'] for result in results[1:4]],
+            ['Line 2 is not valid JSON', 'Line 3 has no symbol', 'Line 4 has no symbol']
+        )
+        self.assertEqual(results[4]['volume_weighted_stock_price'], 40.)
+
+        queries = list(read_queries(io.StringIO('symbol,price\nTEA,10\n,5\nGIN,20\n')))
+        self.assertEqual(str(queries[1]), 'Line 3 has no symbol')
+        self.assertEqual(queries[2], ('GIN', '20'))
+
+    def test_evaluate(self):
+        """
+        Every query yields a result, failures are reported per query
+        """
+        results = list(evaluate([('GIN', '20'), ('TEA', 'x'), ('DEW', '1')], TradeDB()))
+
+        self.assertEqual(results[0]['pe_ratio'], 2.5)
+        self.assertEqual(results[0]['volume_weighted_stock_price'], 40.)
+        self.assertAlmostEqual(results[0]['gbce_all_share_index'], 20.)
+        self.assertEqual(results[0]['error'], '')
+        self.assertIsNone(results[1]['dividend_yield'])
+        self.assertEqual(results[1]['volume_weighted_stock_price'], 10.)
+        self.assertIn('No such stock symbol DEW', results[2]['error'])
+
+        with self.assertRaises(ValueError):
+            next(evaluate([], TradeDB(), ['sharpe_ratio']))
+
+    def test_write_results(self):
+        """
+        Results are streamed as csv or ndjson
+        """
+        formulas = ['pe_ratio']
+        results = list(evaluate([('GIN', '20')], TradeDB(), formulas))
+
+        stream = io.StringIO()
+        self.assertEqual(write_results(results, stream, 'csv', formulas), 1)
+        self.assertEqual(stream.getvalue(), 'symbol,price,pe_ratio,error\nGIN,20.0,2.5,\n')
+
+        stream = io.StringIO()
+        write_results(results, stream, 'ndjson', formulas)
+        self.assertEqual(json.loads(stream.getvalue())['pe_ratio'], 2.5)
@@ -0,0 +1,64 @@
+"""
+Tests targeting the injectable clocks
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from time import sleep, time_ns
+
+from src.clock import CoarseClock, ManualClock, NS_PER_MINUTE, from_ns, to_ns, use_clock
+from src.date_utilities import timestamp_n_minutes_ago
+from src.db.trade_db import TradeDB
+from src.models.trade import Trade, TransactionIndicator
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+
+class TestClock(unittest.TestCase):
+    """
+    Test clocks, conversions and clock injection
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_conversions(self):
+        """
+        Conversions round trip to the microsecond
+        """
+        ts = datetime(2024, 3, 1, 9, 30, 15, 123456)
+        self.assertEqual(from_ns(to_ns(ts)), ts)
+        self.assertEqual(from_ns(to_ns(ts) + 999), ts)
+        self.assertEqual(to_ns(ts + timedelta(minutes=1)) - to_ns(ts), NS_PER_MINUTE)
+
+    def test_coarse_clock(self):
+        """
+        The coarse clock moves in steps of about its resolution
+        """
+        clock = CoarseClock(resolution_us=200_000)
+        first = clock.now_ns()
+        self.assertEqual(clock.now_ns(), first)
+        sleep(.25)
+        self.assertGreater(clock.now_ns(), first)
+        self.assertLess(time_ns() - clock.now_ns(), 200_000_000)
+
+    def test_injection(self):
+        """
+        Default timestamps and windows follow the process clock
+        """
+        ts = datetime(2024, 3, 1, 9, 30)
+        clock = ManualClock(to_ns(ts))
+        with use_clock(clock):
+            self.assertEqual(timestamp_n_minutes_ago(15), ts - timedelta(minutes=15))
+
+            TradeDB().add(Trade(  # pylint: disable=E1101
+                symbol='TEA', price=10., quantity=1, indicator=TransactionIndicator.BUY
+            ))
+            self.assertEqual(TradeDB()[0].timestamp, ts)  # pylint: disable=E1136
+            self.assertEqual(TradeDB().volume_weighted_stock_price('TEA'), 10.)  # pylint: disable=E1101
+
+            clock.advance(16 * NS_PER_MINUTE)
+            with self.assertRaises(ValueError):
+                TradeDB().volume_weighted_stock_price('TEA')  # pylint: disable=E1101
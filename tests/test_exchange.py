@@ -0,0 +1,116 @@
+"""
+Tests targeting independent exchange instances
+"""
+
+import asyncio
+import unittest
+from threading import Barrier, Thread
+
+from src.db.stock_db import StockDB, _StockDB
+from src.db.trade_db import TradeDB
+from src.exchange import Exchange
+from src.models.stock import Stock
+from src.models.stock_type import StockType
+from src.models.trade import Trade
+
+
+def listing(*symbols: str):
+    "Common stocks with the given symbols"
+    return [Stock.from_fields(symbol, StockType.COMMON, 1., None, 100.) for symbol in symbols]
+
+
+class TestExchange(unittest.TestCase):
+    """
+    Test isolation of exchange stock registries and trade dbs
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+        self.lse = Exchange('LSE', listing('TEA', 'AAA'))
+        self.nyse = Exchange('NYSE', listing('TEA', 'BBB'))
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_registries_are_isolated(self):
+        """
+        Stock dbs no longer share their data
+        """
+        first, second = _StockDB(), _StockDB()
+        first.add(listing('AAA')[0])
+        self.assertEqual(len(second), 0)
+        self.assertNotIn('AAA', StockDB())
+
+    def test_validation_and_storage(self):
+        """
+        Trades are validated against and stored in the active exchange
+        """
+        with self.lse:
+            self.assertIs(StockDB(), self.lse.stocks)
+            TradeDB().add(Trade(symbol='AAA', price=10., quantity=5, indicator='BUY'))  # pylint: disable=E1101
+            with self.assertRaises(ValueError):
+                Trade(symbol='BBB', price=10., quantity=5, indicator='BUY')
+            with self.nyse:
+                TradeDB().add(Trade(symbol='BBB', price=20., quantity=5, indicator='BUY'))  # pylint: disable=E1101
+            self.assertIs(TradeDB(), self.lse.trades)
+
+        self.assertEqual([trade.symbol for trade in self.lse.trades], ['AAA'])
+        self.assertEqual([trade.symbol for trade in self.nyse.trades], ['BBB'])
+        self.assertEqual(len(TradeDB()), 0)
+        with self.assertRaises(ValueError):
+            Trade(symbol='AAA', price=10., quantity=5, indicator='BUY')
+
+    def test_tasks(self):
+        """
+        Concurrent tasks each see the exchange they activated
+        """
+        async def trade(exchange: Exchange, price: float) -> float:
+            with exchange:
+                await asyncio.sleep(0)
+                TradeDB().add(Trade(symbol='TEA', price=price, quantity=1, indicator='SELL'))  # pylint: disable=E1101
+                await asyncio.sleep(0)
+                return TradeDB().volume_weighted_stock_price('TEA')  # pylint: disable=E1101
+
+        async def main():
+            return await asyncio.gather(trade(self.lse, 10.), trade(self.nyse, 30.))
+
+        self.assertEqual(asyncio.run(main()), [10., 30.])
+
+    def test_shared_exchange(self):
+        """
+        Tasks and threads entering the same exchange concurrently each restore their own context
+        """
+        async def trade(price: float) -> int:
+            with self.lse:
+                await asyncio.sleep(0)
+                TradeDB().add(Trade(symbol='TEA', price=price, quantity=1, indicator='SELL'))  # pylint: disable=E1101
+                await asyncio.sleep(0)
+            return len(TradeDB())
+
+        async def main():
+            return await asyncio.gather(trade(10.), trade(30.), trade(20.))
+
+        self.assertEqual(asyncio.run(main()), [0, 0, 0])
+        self.assertEqual(len(self.lse.trades), 3)
+
+        entered, errors = Barrier(4), []
+
+        def enter():
+            try:
+                with self.lse:
+                    entered.wait()
+                    entered.wait()
+                self.assertIsNot(TradeDB(), self.lse.trades)
+            except Exception as error:  # pylint: disable=W0718
+                errors.append(error)
+
+        threads = [Thread(target=enter) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Tests targeting the streaming trade exporters
+"""
+
+import bz2
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.trade_db import TradeDB
+from src.export import export, read_columnar
+from src.models.trade import TradeWithTimestamp
+from src.utilities import gen_trade_batches
+
+
+class TestExport(unittest.TestCase):
+    """
+    Test that exports read back to the exported trades
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+        for batch in gen_trade_batches(2_500, batch_size=1_000, seed=9):
+            self.db.add_batch(batch, validate=False)  # pylint: disable=E1101
+        self.trades = list(self.db)
+        self.tmp = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+        TradeDB.reset()
+
+    def test_csv(self):
+        """
+        CSV exports, compressed or not, load back with from_csv
+        """
+        for name in ('trades.csv', 'trades.csv.gz', 'trades.csv.xz'):
+            path = self.dir / name
+            self.assertEqual(export(self.db.snapshot(), path, chunk_size=700), 2_500)  # pylint: disable=E1101
+            self.assertEqual(list(TradeWithTimestamp.from_csv(path)), self.trades, name)
+
+    def test_ndjson(self):
+        """
+        NDJSON exports hold a trade per line
+        """
+        path = self.dir / 'tea.ndjson.bz2'
+        written = export(self.db.query(symbol='TEA'), path)  # pylint: disable=E1101
+        with bz2.open(path, 'rt') as stream:
+            lines = [json.loads(line) for line in stream]
+        self.assertEqual(len(lines), written)
+        self.assertEqual(
+            [TradeWithTimestamp(**line) for line in lines],
+            list(self.db.query(symbol='TEA'))  # pylint: disable=E1101
+        )
+
+    def test_columnar(self):
+        """
+        Columnar exports read back as batches of the exported chunks
+        """
+        path = self.dir / 'trades.col.gz'
+        export(self.db, path, chunk_size=1_000)
+        batches = list(read_columnar(path))
+        self.assertEqual([len(batch) for batch in batches], [1_000, 1_000, 500])
+        self.assertEqual([trade for batch in batches for trade in batch.trades()], self.trades)
+
+        empty = self.dir / 'empty.col'
+        self.assertEqual(export([], empty), 0)
+        self.assertEqual(list(read_columnar(empty)), [])
+        with self.assertRaises(ValueError):
+            export([], self.dir / 'trades.csv', fmt='parquet')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Tests targeting fixed-point price arithmetic
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from random import Random
+
+from src.aggregates.rolling import RollingVwsp
+from src.db.trade_db import TradeDB
+from src.fixed_point import TickSizes, to_ticks
+from src.models.trade_batch import TradeBatch
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+
+class TestFixedPoint(unittest.TestCase):
+    """
+    Test tick conversions and exact VWSP sums
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+        rng, ts = Random(5), datetime.now()
+        self.trades = [
+            TradeWithTimestamp(
+                timestamp=ts - timedelta(seconds=rng.randrange(600)),
+                symbol='TEA',
+                price=round(rng.uniform(.1, 1000.), 4),
+                quantity=rng.randrange(1, 10_000),
+                indicator=TransactionIndicator.BUY
+            )
+            for _ in range(500)
+        ]
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_ticks(self):
+        """
+        Prices convert to ticks only on the tick grid
+        """
+        self.assertEqual(to_ticks(12.3456, 1e-4), 123456)
+        self.assertEqual(to_ticks(.3, .1), 3)
+        with self.assertRaises(ValueError):
+            to_ticks(12.345, .01)
+
+        sizes = TickSizes.from_csv()
+        self.assertEqual(sizes['TEA'], 1e-4)
+        self.assertEqual(TickSizes({'TEA': .5})['POP'], 1e-4)
+
+    def test_order_independent(self):
+        """
+        VWSP is bit-identical whatever the order trades are added in,
+        and to the incrementally maintained rolling window
+        """
+        db = TradeDB()
+        db.configure_fixed_point()  # pylint: disable=E1101
+        window = RollingVwsp('TEA', 15, TickSizes()['TEA'])
+        for trade in sorted(self.trades, key=lambda trade: trade.timestamp):
+            db.add(trade)  # pylint: disable=E1101
+            window.update(trade)
+        value = db.volume_weighted_stock_price('TEA')  # pylint: disable=E1101
+        self.assertEqual(window.value, value)
+
+        TradeDB.reset()
+        db = TradeDB()
+        db.configure_fixed_point()  # pylint: disable=E1101
+        for trade in reversed(self.trades):
+            db.add(trade)  # pylint: disable=E1101
+        self.assertEqual(db.volume_weighted_stock_price('TEA'), value)  # pylint: disable=E1101
+
+    def test_off_grid(self):
+        """
+        Off grid prices are rejected and leave the db unchanged
+        """
+        db = TradeDB()
+        db.configure_fixed_point(tick_sizes=TickSizes({'TEA': .01}))  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            db.add(self.trades[0].model_copy(update={'price': 10.005}))  # pylint: disable=E1101
+        self.assertEqual(len(db), 0)
+
+        db.configure_fixed_point(False)  # pylint: disable=E1101
+        db.add(self.trades[0].model_copy(update={'price': 10.005}))  # pylint: disable=E1101
+        with self.assertRaises(ValueError):
+            db.configure_fixed_point(tick_sizes=TickSizes({'TEA': .01}))  # pylint: disable=E1101
+        self.assertIsNone(db.fixed_point)  # pylint: disable=E1101
+
+    def test_off_grid_batch(self):
+        """
+        A batch with an off grid price adds none of its trades and marks none of its ids
+        """
+        db = TradeDB()
+        db.configure_fixed_point(tick_sizes=TickSizes({'TEA': .01}))  # pylint: disable=E1101
+        db.configure_dedupe(timedelta(minutes=5))  # pylint: disable=E1101
+        trades = [
+            trade.model_copy(update={'price': price, 'trade_id': str(n)})
+            for n, (trade, price) in enumerate(zip(self.trades, (10., 10.01, 10.005)))
+        ]
+        for validate in (True, False):
+            with self.assertRaises(ValueError):
+                db.add_batch(TradeBatch.from_trades(trades), validate=validate)  # pylint: disable=E1101
+            self.assertEqual(len(db), 0)
+
+        with self.assertRaises(ValueError):
+            db.add(trades[2])  # pylint: disable=E1101
+        db.add(trades[2].model_copy(update={'price': 10.}))  # pylint: disable=E1101
+        db.add_batch(TradeBatch.from_trades(trades[:2]))  # pylint: disable=E1101
+        self.assertEqual((len(db), db.duplicates), (3, 0))  # pylint: disable=E1101
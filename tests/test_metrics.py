@@ -0,0 +1,107 @@
+"""
+Tests targeting hot path instrumentation
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.trade_db import TradeDB
+from src.metrics import METRICS, Histogram
+from src.models.trade import Trade, TransactionIndicator
+from src.utilities import STOCKS, gen_k_random_trades
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    Test latency histogram precision
+    """
+
+    def test_percentiles(self):
+        """
+        Percentiles stay within the relative precision of the buckets
+        """
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+
+        for value in range(1, 100_001):
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 100_000)
+        self.assertEqual(histogram.min, 1)
+        self.assertEqual(histogram.percentile(100), 100_000)
+        for q in (50, 90, 99, 99.9):
+            self.assertAlmostEqual(histogram.percentile(q) / (q * 1000), 1, delta=.035)
+
+    def test_exact_small_values(self):
+        """
+        Values below 64ns are recorded exactly
+        """
+        histogram = Histogram()
+        for value in (3, 3, 63):
+            histogram.record(value)
+
+        self.assertEqual(histogram.percentile(50), 3)
+        self.assertEqual(histogram.percentile(100), 63)
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test instrumentation of ingestion, validation, csv parsing and formulas
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+        METRICS.reset()
+
+    def tearDown(self) -> None:
+        METRICS.disable()
+        METRICS.reset()
+        TradeDB.reset()  # clear
+
+    def test_disabled(self):
+        """
+        Nothing is recorded while disabled
+        """
+        for trade in gen_k_random_trades(5):
+            TradeDB().add(trade)  # pylint: disable=E1101
+
+        self.assertEqual(METRICS.stats()['histograms'], {})
+
+    def test_enabled(self):
+        """
+        Hot paths are recorded along with db gauges
+        """
+        METRICS.enable()
+        for trade in gen_k_random_trades(5):
+            TradeDB().add(trade)  # pylint: disable=E1101
+        TradeDB().gbce_all_share_index()  # pylint: disable=E1101
+        STOCKS['POP'].dividend_yield(10.)  # pylint: disable=E1136
+        Trade.from_fields('TEA', 10., 10, TransactionIndicator.BUY)
+
+        stats = METRICS.stats()
+        self.assertEqual(stats['histograms']['trade_db.add']['count'], 5)
+        self.assertEqual(stats['histograms']['trade.validation']['count'], 6)
+        self.assertEqual(stats['histograms']['formulas.gbce_all_share_index']['count'], 1)
+        self.assertEqual(stats['histograms']['formulas.dividend_yield']['count'], 1)
+        self.assertEqual(stats['gauges']['trade_db.trades'], 5)
+
+    def test_csv_rows_and_dump(self):
+        """
+        Csv rows are counted and stats are dumped as JSON lines
+        """
+        METRICS.enable()
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / 'trades.csv'
+            csv_path.write_text('symbol,price,quantity,indicator\nTEA,1,1,BUY\nPOP,2,2,SELL\n')
+            self.assertEqual(len(list(Trade.from_csv(csv_path))), 2)
+
+            dump_path = Path(tmp) / 'metrics.ndjson'
+            METRICS.dump(dump_path)
+            METRICS.dump(dump_path)
+            lines = dump_path.read_text(encoding='utf-8').splitlines()
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['counters'], {'csv.rows': 2})
+        self.assertEqual(json.loads(lines[0])['histograms']['csv.row']['count'], 2)
@@ -0,0 +1,99 @@
+"""
+Tests targeting the historical replay engine
+"""
+
+import io
+import unittest
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from src.clock import get_clock
+from src.db.trade_db import TradeDB
+from src.replay import Replay, SimulatedClock, write_series
+from src.utilities import STOCKS, gen_trade_batches  # pylint: disable=W0611
+
+
+class TestReplay(unittest.TestCase):
+    """
+    Test replay sampling and pacing
+    """
+
+    def setUp(self) -> None:
+        TradeDB()  # init
+        self.start = datetime(2024, 3, 1, 9)
+        # about 10 trades per second over 10 simulated minutes
+        self.trades = list(next(gen_trade_batches(6_000, batch_size=6_000, rate=10.,
+                                                  start=self.start, seed=3)).trades())
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_samples(self):
+        """
+        Samples are taken every interval with the sample time as reference
+        """
+        replay = Replay(self.trades, interval=timedelta(minutes=1))
+        samples = list(replay.run())
+
+        session = self.trades[-1].timestamp - self.trades[0].timestamp
+        self.assertEqual(len(samples), int(session / timedelta(minutes=1)) + 1)
+        self.assertEqual(samples[-1]['trades'], len(self.trades))
+        self.assertAlmostEqual(
+            samples[-1]['gbce_all_share_index'], TradeDB().gbce_all_share_index()  # pylint: disable=E1101
+        )
+
+        first = datetime.fromisoformat(samples[0]['timestamp'])
+        self.assertEqual(
+            samples[0]['trades'], sum(trade.timestamp <= first for trade in self.trades)
+        )
+        for symbol, value in samples[0]['volume_weighted_stock_price'].items():
+            window = [
+                trade for trade in self.trades
+                if trade.symbol == symbol and trade.timestamp <= first
+            ]
+            self.assertAlmostEqual(
+                value, sum(t.price * t.quantity for t in window) / sum(t.quantity for t in window)
+            )
+
+    def test_clock_scope(self):
+        """
+        The process clock is the caller's between samples and after an abandoned replay
+        """
+        clock = get_clock()
+        replay = Replay(self.trades, interval=timedelta(minutes=1))
+        samples = replay.run()
+        next(samples)
+        self.assertIs(get_clock(), clock)
+        next(samples)
+        self.assertIs(get_clock(), clock)
+        del samples
+        self.assertIs(get_clock(), clock)
+
+    def test_write_series(self):
+        """
+        Series are written as ndjson lines or long csv rows
+        """
+        samples = list(Replay(self.trades[:100], interval=timedelta(seconds=5)).run())
+
+        stream = io.StringIO()
+        self.assertEqual(write_series(samples, stream), len(samples))
+        self.assertEqual(len(stream.getvalue().splitlines()), len(samples))
+
+        stream = io.StringIO()
+        write_series(samples, stream, 'csv')
+        self.assertEqual(stream.getvalue().splitlines()[0], 'timestamp,metric,symbol,value')
+
+    def test_paced_clock(self):
+        """
+        Paced clocks wait for the wall clock to catch up
+        """
+        clock = SimulatedClock(speed=10.)
+        start = perf_counter()
+        clock.advance_to(self.start)
+        clock.advance_to(self.start + timedelta(seconds=1))
+        clock.advance_to(self.start)
+
+        self.assertGreaterEqual(perf_counter() - start, .1)
+        self.assertEqual(clock.now(), self.start + timedelta(seconds=1))
+        with self.assertRaises(ValueError):
+            SimulatedClock(speed=0.)
@@ -0,0 +1,155 @@
+"""
+Tests targeting the HTTP/JSON query service
+"""
+
+import asyncio
+import json
+import unittest
+from datetime import datetime
+from http import HTTPStatus
+
+from src.db.trade_db import TradeDB
+from src.models.trade import TradeWithTimestamp, TransactionIndicator
+from src.service import HTTPError, QueryService
+from src.utilities import STOCKS  # pylint: disable=W0611
+
+
+class TestQueryService(unittest.IsolatedAsyncioTestCase):
+    """
+    Test routing and the connection handling of the service
+    """
+
+    def setUp(self) -> None:
+        for symbol, price in (('TEA', 10.), ('GIN', 40.)):
+            TradeDB().add(TradeWithTimestamp(  # pylint: disable=E1101
+                timestamp=datetime.now(),
+                symbol=symbol,
+                price=price,
+                quantity=10,
+                indicator=TransactionIndicator.BUY
+            ))
+        self.service = QueryService(max_connections=2)
+
+    def tearDown(self) -> None:
+        TradeDB.reset()
+
+    def test_route(self):
+        """
+        Endpoints answer from the dbs, errors map to statuses
+        """
+        self.assertEqual(len(self.service.route('GET', '/stocks')), 5)
+        self.assertEqual(
+            self.service.route('GET', '/stocks/GIN/pe_ratio?prices=10,20')['pe_ratio'], [1.25, 2.5]
+        )
+        self.assertEqual(
+            self.service.route('POST', '/stocks/GIN/pe_ratio', b'[10]')['pe_ratio'], [1.25]
+        )
+        self.assertEqual(self.service.route('GET', '/vwsp'), {'TEA': 10., 'GIN': 40.})
+        self.assertAlmostEqual(self.service.route('GET', '/index')['gbce_all_share_index'], 20.)
+
+        for method, target, status in (
+            ('GET', '/stocks/DEW/pe_ratio?prices=10', HTTPStatus.NOT_FOUND),
+            ('GET', '/stocks/GIN/pe_ratio?prices=x', HTTPStatus.BAD_REQUEST),
+            ('GET', '/stocks/TEA/dividend_yield?prices=0', HTTPStatus.BAD_REQUEST),
+            ('GET', '/stocks/TEA/dividend_yield?prices=-5', HTTPStatus.BAD_REQUEST),
+            ('GET', '/vwsp/TEA?n_minutes=0', HTTPStatus.BAD_REQUEST),
+            ('GET', '/sharpe', HTTPStatus.NOT_FOUND),
+            ('DELETE', '/index', HTTPStatus.METHOD_NOT_ALLOWED),
+        ):
+            with self.assertRaises(HTTPError) as ctx:
+                self.service.route(method, target)
+            self.assertEqual(ctx.exception.status, status)
+        for body in (b'[{"a": 1}]', b'[null]', b'{"prices": [1]}', b'[1'):
+            with self.assertRaises(HTTPError) as ctx:
+                self.service.route('POST', '/stocks/TEA/dividend_yield', body)
+            self.assertEqual(ctx.exception.status, HTTPStatus.BAD_REQUEST)
+
+    async def test_pipelining(self):
+        """
+        Pipelined requests are answered in order on a kept alive connection,
+        connections beyond the limit are refused
+        """
+        server = await self.service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b''.join(
+            f'GET /vwsp/{symbol} HTTP/1.1\r\nHost: test\r\n\r\n'.encode() for symbol in ('TEA', 'GIN')
+        ))
+        values = []
+        for _ in range(2):
+            self.assertIn(b'200 OK', await reader.readline())
+            length = 0
+            while (line := await reader.readline()) != b'\r\n':
+                if line.lower().startswith(b'content-length'):
+                    length = int(line.split(b':')[1])
+            values.append(json.loads(await reader.readexactly(length))['volume_weighted_stock_price'])
+        self.assertEqual(values, [10., 40.])
+
+        others = [await asyncio.open_connection('127.0.0.1', port) for _ in range(2)]
+        await asyncio.sleep(.05)
+        self.assertIn(b'503', await others[-1][0].readline())
+
+        for _, other in [(reader, writer), *others]:
+            other.close()
+        server.close()
+        await server.wait_closed()
+
+    async def test_internal_error(self):
+        """
+        Unexpected errors are answered with a 500, later pipelined requests are served
+        """
+        server = await self.service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        route = self.service.route
+
+        def failing_route(method, target, body=b''):
+            if target == '/index':
+                raise ZeroDivisionError()
+            return route(method, target, body)
+
+        self.service.route = failing_route
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /index HTTP/1.1\r\n\r\nGET /vwsp/TEA HTTP/1.1\r\n\r\n')
+        statuses = []
+        for _ in range(2):
+            statuses.append(await reader.readline())
+            length = 0
+            while (line := await reader.readline()) != b'\r\n':
+                if line.lower().startswith(b'content-length'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+        self.assertIn(b'500', statuses[0])
+        self.assertIn(b'200', statuses[1])
+
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    async def test_malformed_headers(self):
+        """
+        A malformed Content-Length or too many headers are answered before closing
+        """
+        self.service.max_headers = 4
+        server = await self.service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        for request, status in (
+            (b'POST /stocks/TEA/pe_ratio HTTP/1.1\r\nContent-Length: x\r\n\r\n[10]', b'400'),
+            (b'POST /stocks/TEA/pe_ratio HTTP/1.1\r\nContent-Length: -1\r\n\r\n', b'400'),
+            (b'GET /index HTTP/1.1\r\n' + b'X-Header: 1\r\n' * 5 + b'\r\n', b'431'),
+        ):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            self.assertIn(status, await reader.readline())
+            while await reader.readline() not in (b'\r\n', b''):
+                pass
+            writer.close()
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /index HTTP/1.1\r\n' + b'X-Header: 1\r\n' * 4 + b'\r\n')
+        self.assertIn(b'200', await reader.readline())
+        writer.close()
+
+        server.close()
+        await server.wait_closed()
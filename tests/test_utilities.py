@@ -0,0 +1,101 @@
+"""
+Tests targeting utilities and lazy db initialization
+"""
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from src.db.stock_db import StockDB
+from src.utilities import STOCKS, gen_trade_batches, parse_price
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _run(code: str, cwd: Path = ROOT) -> str:
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=cwd,
+        env={'PYTHONPATH': str(ROOT)},
+        capture_output=True,
+        check=True,
+        text=True
+    ).stdout.strip()
+
+
+class TestLazyInitialization(unittest.TestCase):
+    """
+    Test singletons are initialized on first use only
+    """
+
+    def test_import_is_lazy(self):
+        """
+        Importing utilities neither loads stocks nor imports the trade db
+        """
+        self.assertEqual(
+            _run(
+                'import sys, src.utilities;'
+                'print(sorted(m for m in ("pydantic", "src.db.stock_db", "src.db.trade_db")'
+                ' if m in sys.modules))'
+            ),
+            '[]'
+        )
+
+    def test_independent_of_working_directory(self):
+        """
+        Stocks load from the project csv whatever the working directory
+        """
+        self.assertEqual(
+            _run('from src.utilities import STOCKS; print(len(STOCKS))', cwd=ROOT / 'tests'),
+            '5'
+        )
+
+    def test_singleton(self):
+        """
+        Lazy names resolve to the singletons which can not be reconfigured
+        """
+        self.assertIs(STOCKS, StockDB())
+        with self.assertRaises(AssertionError):
+            StockDB.configure(None)
+
+    def test_parse_price(self):
+        """
+        Test price parsing
+        """
+        self.assertEqual(parse_price('10.5'), 10.5)
+        for value in ('ten', '0', '-1', 'nan', 'inf', None, {'a': 1}):
+            with self.assertRaises(ValueError):
+                parse_price(value)
+
+
+class TestTradeBatchGeneration(unittest.TestCase):
+    """
+    Test the columnar random trades generator
+    """
+
+    def test_reproducible(self):
+        """
+        Batches are sized, ordered in time and reproducible for a given seed
+        """
+        batches = list(gen_trade_batches(2_500, batch_size=1_000, seed=7))
+        again = list(gen_trade_batches(2_500, batch_size=1_000, seed=7))
+
+        self.assertEqual([len(batch) for batch in batches], [1_000, 1_000, 500])
+        self.assertEqual([b.prices for b in batches], [b.prices for b in again])
+        timestamps = [ts for batch in batches for ts in batch.timestamps]
+        self.assertEqual(timestamps, sorted(timestamps))
+        for batch in batches:
+            batch.validate()
+
+    def test_zipf(self):
+        """
+        Zipf draws favour the first symbols
+        """
+        batch = next(gen_trade_batches(5_000, symbols=['TEA', 'POP', 'ALE'], distribution='zipf',
+                                       zipf_exponent=2., seed=1))
+        counts = [batch.symbols.count(symbol) for symbol in ('TEA', 'POP', 'ALE')]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+        with self.assertRaises(ValueError):
+            next(gen_trade_batches(10, distribution='pareto'))
@@ -0,0 +1,60 @@
+"""
+Tests targeting the multi-process query workers
+"""
+
+import unittest
+
+from src.batch import evaluate
+from src.db.trade_db import TradeDB
+from src.utilities import STOCKS, gen_trade_batches  # pylint: disable=W0611
+from src.workers import QueryWorkers
+
+
+class TestQueryWorkers(unittest.TestCase):
+    """
+    Test queries answered by worker processes from shared memory
+    """
+
+    def setUp(self) -> None:
+        self.db = TradeDB()
+        store = self.db.configure_shared_memory(capacity=10_000)  # pylint: disable=E1101
+        for batch in gen_trade_batches(3_000, batch_size=1_000, seed=6):
+            self.db.add_batch(batch, validate=False)  # pylint: disable=E1101
+        self.workers = QueryWorkers(store.name, processes=2)
+
+    def tearDown(self) -> None:
+        self.workers.close()
+        self.db.configure_shared_memory(enabled=False)  # pylint: disable=E1101
+        TradeDB.reset()
+
+    def test_formulas(self):
+        """
+        Workers answer the formulas of the trade db
+        """
+        symbols = list(self.db.symbol_time_indexes) + ['XYZ']  # pylint: disable=E1101
+        prices = self.workers.volume_weighted_stock_prices(symbols)
+        self.assertIsNone(prices.pop('XYZ'))
+        for symbol, price in prices.items():
+            self.assertAlmostEqual(price, self.db.volume_weighted_stock_price(symbol))  # pylint: disable=E1101
+        self.assertAlmostEqual(
+            self.workers.gbce_all_share_index(), self.db.gbce_all_share_index()  # pylint: disable=E1101
+        )
+
+    def test_evaluate(self):
+        """
+        Batch queries in parallel chunks give the results of a local run, in order
+        """
+        queries = [(symbol, str(price)) for price in range(1, 50) for symbol in ('TEA', 'GIN', 'ABC')]
+        results = list(self.workers.evaluate(queries, chunk_size=20))
+        expected = list(evaluate(queries, self.db))
+        self.assertEqual([r['symbol'] for r in results], [r['symbol'] for r in expected])
+        for result, local in zip(results, expected):
+            self.assertEqual(result['dividend_yield'], local['dividend_yield'])
+            self.assertEqual(result['error'], local['error'])
+            self.assertAlmostEqual(
+                result['volume_weighted_stock_price'] or 0., local['volume_weighted_stock_price'] or 0.
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()